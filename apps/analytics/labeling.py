@@ -0,0 +1,186 @@
+"""
+Work queue behind the manual sentiment labeler.
+
+Unlabeled review ids are kept in Redis as a pre-shuffled list, so serving the
+next review is a single `LPOP` instead of a `COUNT(*)` plus an `OFFSET` scan.
+Served ids are leased to the labeler in a sorted set scored by lease expiry:
+two labelers never get the same review, and a review abandoned mid-session
+is handed out again once its lease runs out. The queue is rebuilt by
+`apps.analytics.tasks.refill_labeling_queue` whenever it runs low.
+"""
+
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django_redis import get_redis_connection
+
+from apps.web.models import Review
+
+QUEUE_KEY = "analytics:labeling:queue"
+LEASES_KEY = "analytics:labeling:leases"
+LABELED_KEY = "analytics:labeling:labeled"
+REFILL_LOCK_KEY = "analytics:labeling:refilling"
+SESSION_KEY_FMT = "analytics:labeling:session:{}"
+
+COURSE_PICKER_USERNAME = "CoursePicker"
+COURSE_PICKER_CACHE_KEY = "analytics:course_picker_id"
+
+LEASE_SECONDS = 10 * 60
+# A labeling session ends after this long without a submitted label.
+SESSION_IDLE_SECONDS = 30 * 60
+# Ask for a background refill once fewer ids than this are queued.
+REFILL_THRESHOLD = 100
+REFILL_LOCK_SECONDS = 5 * 60
+REFILL_CHUNK_SIZE = 1000
+# Stale ids (leased elsewhere, labeled since the last refill) skipped per call.
+MAX_SKIPPED = 20
+
+# KEYS: queue, leases. ARGV: now, lease expiry, max skipped.
+# Expired leases are reclaimed first, then ids are popped until one that is
+# not currently leased is found.
+NEXT_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1], 'LIMIT', 0, 1)
+if expired[1] then
+    redis.call('ZADD', KEYS[2], ARGV[2], expired[1])
+    return expired[1]
+end
+for i = 1, tonumber(ARGV[3]) do
+    local id = redis.call('LPOP', KEYS[1])
+    if not id then
+        return false
+    end
+    if not redis.call('ZSCORE', KEYS[2], id) then
+        redis.call('ZADD', KEYS[2], ARGV[2], id)
+        return id
+    end
+end
+return false
+"""
+
+
+def _redis():
+    return get_redis_connection("default")
+
+
+def course_picker_id():
+    """Id of the bulk-import account whose reviews need labels, cached."""
+    user_id = cache.get(COURSE_PICKER_CACHE_KEY)
+    if user_id is None:
+        user_id = (
+            User.objects.filter(username=COURSE_PICKER_USERNAME)
+            .values_list("id", flat=True)
+            .first()
+        )
+        if user_id is not None:
+            cache.set(COURSE_PICKER_CACHE_KEY, user_id, timeout=None)
+    return user_id
+
+
+def unlabeled_reviews():
+    return Review.objects.filter(user_id=course_picker_id()).exclude(
+        sentiment_labeler=Review.MANUAL_SENTIMENT_LABELER
+    )
+
+
+def refill():
+    """
+    Rebuild the queue from the database as a fresh shuffle.
+
+    The new list is written under a temporary key and swapped in with
+    `RENAME`, so labelers never observe a partially written queue. Ids that
+    are currently leased are left out.
+    """
+    r = _redis()
+    leased = {int(review_id) for review_id in r.zrange(LEASES_KEY, 0, -1)}
+    review_ids = [
+        review_id
+        for review_id in unlabeled_reviews().values_list("id", flat=True)
+        if review_id not in leased
+    ]
+    random.shuffle(review_ids)
+    labeled_count = Review.objects.filter(
+        sentiment_labeler=Review.MANUAL_SENTIMENT_LABELER
+    ).count()
+
+    staging_key = f"{QUEUE_KEY}:staging"
+    pipe = r.pipeline()
+    pipe.delete(staging_key)
+    for i in range(0, len(review_ids), REFILL_CHUNK_SIZE):
+        pipe.rpush(staging_key, *review_ids[i : i + REFILL_CHUNK_SIZE])
+    if review_ids:
+        pipe.rename(staging_key, QUEUE_KEY)
+    else:
+        pipe.delete(QUEUE_KEY)
+    pipe.set(LABELED_KEY, labeled_count)
+    pipe.delete(REFILL_LOCK_KEY)
+    pipe.execute()
+    return len(review_ids)
+
+
+def claim_refill():
+    """Whether the caller should schedule a refill (at most one at a time)."""
+    return bool(_redis().set(REFILL_LOCK_KEY, 1, nx=True, ex=REFILL_LOCK_SECONDS))
+
+
+def needs_refill():
+    return _redis().llen(QUEUE_KEY) < REFILL_THRESHOLD
+
+
+def next_review_id():
+    """Lease the next review id, or None if the queue is empty."""
+    now = time.time()
+    review_id = _redis().eval(
+        NEXT_SCRIPT, 2, QUEUE_KEY, LEASES_KEY, now, now + LEASE_SECONDS, MAX_SKIPPED
+    )
+    return int(review_id) if review_id is not None else None
+
+
+def release(review_id):
+    """Drop a lease without counting a label, e.g. for an already labeled id."""
+    _redis().zrem(LEASES_KEY, review_id)
+
+
+def complete(review_id, labeler_id):
+    """Record a submitted label: drop the lease and update session stats."""
+    now = time.time()
+    session_key = SESSION_KEY_FMT.format(labeler_id)
+    pipe = _redis().pipeline()
+    pipe.zrem(LEASES_KEY, review_id)
+    pipe.incr(LABELED_KEY)
+    pipe.hsetnx(session_key, "started", now)
+    pipe.hincrby(session_key, "labeled", 1)
+    pipe.hset(session_key, "last", now)
+    pipe.expire(session_key, SESSION_IDLE_SECONDS)
+    pipe.execute()
+
+
+def progress(labeler_id):
+    """
+    Queue sizes and the labeler's session throughput, in one round trip.
+
+    `remaining` counts queued plus leased ids, so it can include a few ids
+    that were labeled since the last refill.
+    """
+    pipe = _redis().pipeline()
+    pipe.llen(QUEUE_KEY)
+    pipe.zcard(LEASES_KEY)
+    pipe.get(LABELED_KEY)
+    pipe.hgetall(SESSION_KEY_FMT.format(labeler_id))
+    queued, leased, labeled, session = pipe.execute()
+
+    session_labeled = int(session.get(b"labeled", 0))
+    elapsed = 0.0
+    if session:
+        elapsed = time.time() - float(session[b"started"])
+    per_hour = session_labeled / elapsed * 60 * 60 if elapsed > 0 else None
+    return {
+        "remaining": queued + leased,
+        "labeled_count": int(labeled or 0),
+        "session": {
+            "labeled": session_labeled,
+            "elapsed_minutes": round(elapsed / 60, 1),
+            "per_hour": round(per_hour, 1) if per_hour is not None else None,
+        },
+    }
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyActivity",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(unique=True)),
+                ("new_users", models.IntegerField(default=0)),
+                ("quality_votes", models.IntegerField(default=0)),
+                ("difficulty_votes", models.IntegerField(default=0)),
+                ("unvotes", models.IntegerField(default=0)),
+                ("reviews", models.IntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name_plural": "Daily activities",
+                "ordering": ("date",),
+            },
+        ),
+    ]
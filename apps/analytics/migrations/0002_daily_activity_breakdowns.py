@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("analytics", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dailyactivity",
+            name="logins",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="dailyactivity",
+            name="reviews_by_department",
+            field=models.JSONField(default=dict),
+        ),
+        migrations.AddField(
+            model_name="dailyactivity",
+            name="votes_by_value",
+            field=models.JSONField(default=dict),
+        ),
+    ]
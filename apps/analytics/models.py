@@ -0,0 +1,37 @@
+from __future__ import unicode_literals
+
+from django.db import models
+
+
+class DailyActivity(models.Model):
+    """
+    Pre-aggregated site activity for one (local) calendar day.
+
+    Rows are written by `apps.analytics.rollups.rollup_days`; windows such as
+    "last month" are sums over these rows instead of scans over the vote,
+    review and user tables.
+    """
+
+    date = models.DateField(unique=True)
+
+    new_users = models.IntegerField(default=0)
+    logins = models.IntegerField(default=0)  # unique users who logged in
+    quality_votes = models.IntegerField(default=0)
+    difficulty_votes = models.IntegerField(default=0)
+    unvotes = models.IntegerField(default=0)
+    reviews = models.IntegerField(default=0)
+
+    # {"quality": {"5": 3, ...}, "difficulty": {...}} -- votes cast per value
+    votes_by_value = models.JSONField(default=dict)
+    # {"ECE": 2, ...} -- reviews written per course department
+    reviews_by_department = models.JSONField(default=dict)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ("date",)
+        verbose_name_plural = "Daily activities"
+
+    def __unicode__(self):
+        return "Activity on {}".format(self.date)
@@ -0,0 +1,414 @@
+"""
+Rollup engine behind the analytics dashboard.
+
+Per-day activity is aggregated once into `DailyActivity` rows; dashboard
+windows ("Month", "Week") are sums over those rows plus a live aggregate for
+the days not rolled up yet, including the current day. Live totals use
+conditional aggregation, so every table is scanned at most once per dashboard
+build instead of once per metric.
+"""
+
+import datetime
+import logging
+import uuid
+from collections import defaultdict
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.db.models.functions import Right, TruncDate
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+from apps.analytics.models import DailyActivity
+from apps.web.models import Review, Vote
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_FIELDS = (
+    "new_users",
+    "logins",
+    "quality_votes",
+    "difficulty_votes",
+    "unvotes",
+    "reviews",
+)
+BREAKDOWN_FIELDS = ("votes_by_value", "reviews_by_department")
+
+# Days before the last rollup that are re-aggregated on every run, so votes
+# and reviews edited or deleted shortly after the fact are picked up.
+ROLLUP_LOOKBACK_DAYS = 2
+
+# Logins are not recoverable from the user table (only the latest
+# `last_login` is kept), so each day's unique logins are collected in a Redis
+# set as they happen and folded into the rollup by the nightly task. Unique
+# users over a window are the union of its days' sets, so the sets are kept
+# for the longest dashboard window.
+LOGINS_KEY_FMT = "analytics:logins:{}"
+LOGINS_UNION_KEY_FMT = "analytics:logins:union:{}"
+LOGINS_KEY_TIMEOUT = (ROLLUP_LOOKBACK_DAYS + 32) * 24 * 60 * 60
+
+QUALITY_VOTE = Q(category=Vote.CATEGORIES.QUALITY) & ~Q(value=0)
+DIFFICULTY_VOTE = Q(category=Vote.CATEGORIES.DIFFICULTY) & ~Q(value=0)
+UNVOTE = Q(value=0)
+
+
+def day_start(date):
+    """Aware datetime of local midnight at the start of `date`."""
+    return timezone.make_aware(datetime.datetime.combine(date, datetime.time.min))
+
+
+def _empty_day():
+    day = dict.fromkeys(ROLLUP_FIELDS, 0)
+    day["votes_by_value"] = {category: {} for category, _ in Vote.CATEGORIES.CHOICES}
+    day["reviews_by_department"] = {}
+    return day
+
+
+def record_login(user_id):
+    """Add a user to today's set of unique logins."""
+    key = LOGINS_KEY_FMT.format(timezone.localdate().isoformat())
+    try:
+        pipe = get_redis_connection("default").pipeline()
+        pipe.sadd(key, user_id)
+        pipe.expire(key, LOGINS_KEY_TIMEOUT)
+        pipe.execute()
+    except Exception:
+        logger.warning("Failed to record login for analytics")
+
+
+def daily_logins(dates):
+    """
+    Unique login counts for the given dates, in one pipelined round trip.
+
+    Dates whose set has already expired map to None.
+    """
+    dates = list(dates)
+    r = get_redis_connection("default")
+    pipe = r.pipeline()
+    for date in dates:
+        key = LOGINS_KEY_FMT.format(date.isoformat())
+        pipe.exists(key)
+        pipe.scard(key)
+    results = pipe.execute()
+    return {
+        date: count if exists else None
+        for date, exists, count in zip(dates, results[::2], results[1::2])
+    }
+
+
+def unique_logins(ranges):
+    """
+    Users who logged in on any day of each `(first, last)` range of dates,
+    `{name: (first, last)}` -> `{name: count}`, in one pipelined round trip.
+    Days whose set has expired are not counted.
+    """
+    pipe = get_redis_connection("default").pipeline()
+    for first, last in ranges.values():
+        key = LOGINS_UNION_KEY_FMT.format(uuid.uuid4().hex)
+        days = [
+            LOGINS_KEY_FMT.format((first + datetime.timedelta(days=i)).isoformat())
+            for i in range((last - first).days + 1)
+        ]
+        pipe.sunionstore(key, days)
+        pipe.delete(key)
+    return dict(zip(ranges, pipe.execute()[::2]))
+
+
+def aggregate_days(start, end):
+    """
+    Compute rollup metrics for local dates in [start, end).
+
+    Returns a dict mapping each date with activity to its metrics, built from
+    one grouped query per source table plus one Redis round trip for logins.
+    Days whose login set has expired have `logins` set to None.
+    """
+    since, until = day_start(start), day_start(end)
+    days = defaultdict(_empty_day)
+
+    users = (
+        User.objects.filter(date_joined__gte=since, date_joined__lt=until)
+        .annotate(day=TruncDate("date_joined"))
+        .values_list("day")
+        .annotate(count=Count("id"))
+    )
+    for day, count in users:
+        days[day]["new_users"] = count
+
+    votes = (
+        Vote.objects.filter(created_at__gte=since, created_at__lt=until)
+        .annotate(day=TruncDate("created_at"))
+        .values_list("day", "category", "value")
+        .annotate(count=Count("id"))
+    )
+    for day, category, value, count in votes:
+        metrics = days[day]
+        if value == 0:
+            metrics["unvotes"] += count
+            continue
+        metrics[f"{category}_votes"] += count
+        metrics["votes_by_value"].setdefault(category, {})[str(value)] = count
+
+    reviews = (
+        Review.objects.filter(created_at__gte=since, created_at__lt=until)
+        .annotate(day=TruncDate("created_at"))
+        .values_list("day", "course__department")
+        .annotate(count=Count("id"))
+    )
+    for day, department, count in reviews:
+        metrics = days[day]
+        metrics["reviews"] += count
+        metrics["reviews_by_department"][department] = count
+
+    num_days = (end - start).days
+    logins = daily_logins(start + datetime.timedelta(days=i) for i in range(num_days))
+    for day, count in logins.items():
+        if count:
+            days[day]["logins"] = count
+        elif count is None and day in days:
+            days[day]["logins"] = None
+
+    return dict(days)
+
+
+@transaction.atomic
+def rollup_days(start, end):
+    """(Re)write the `DailyActivity` rows for local dates in [start, end)."""
+    metrics = aggregate_days(start, end)
+    existing = DailyActivity.objects.filter(date__gte=start, date__lt=end)
+    # Keep previously rolled-up login counts whose Redis set has expired.
+    previous_logins = dict(existing.values_list("date", "logins"))
+    for date, values in metrics.items():
+        if values["logins"] is None:
+            values["logins"] = previous_logins.get(date, 0)
+    for date, logins in previous_logins.items():
+        if date not in metrics and logins:
+            metrics[date] = _empty_day()
+            metrics[date]["logins"] = logins
+
+    existing.delete()
+    DailyActivity.objects.bulk_create(
+        [DailyActivity(date=date, **values) for date, values in sorted(metrics.items())]
+    )
+    return len(metrics)
+
+
+def _first_activity_date():
+    candidates = [
+        User.objects.aggregate(first=Min("date_joined"))["first"],
+        Vote.objects.aggregate(first=Min("created_at"))["first"],
+        Review.objects.aggregate(first=Min("created_at"))["first"],
+    ]
+    candidates = [c for c in candidates if c is not None]
+    return timezone.localdate(min(candidates)) if candidates else None
+
+
+def rollup_pending():
+    """
+    Bring `DailyActivity` up to date through yesterday.
+
+    Only the days since the last rollup (plus a short lookback) are
+    aggregated; the first run backfills from the earliest recorded activity.
+    """
+    today = timezone.localdate()
+    last = DailyActivity.objects.aggregate(last=Max("date"))["last"]
+    if last is not None:
+        start = last - datetime.timedelta(days=ROLLUP_LOOKBACK_DAYS)
+    else:
+        start = _first_activity_date()
+    if start is None or start >= today:
+        return 0
+    return rollup_days(start, today)
+
+
+def activity_summary(since):
+    """
+    Totals and recent activity for the weekly email, read from rollups only.
+
+    Scalar metrics are summed in the database, except for unique logins,
+    which are counted from the per-day login sets; the per-value and
+    per-department breakdowns are merged from the JSON columns of the rows
+    since `since` (a date), which is at most a few dozen rows.
+    """
+    sums = DailyActivity.objects.aggregate(
+        **{f"all__{field}": Sum(field) for field in ROLLUP_FIELDS},
+        **{
+            f"new__{field}": Sum(field, filter=Q(date__gte=since))
+            for field in ROLLUP_FIELDS
+        },
+    )
+    summary = {
+        scope: {field: sums[f"{scope}__{field}"] or 0 for field in ROLLUP_FIELDS}
+        for scope in ("all", "new")
+    }
+    # Daily unique logins don't add up to unique users over a period.
+    del summary["all"]["logins"]
+    today = timezone.localdate()
+    summary["new"]["logins"] = unique_logins({"new": (since, today)})["new"]
+
+    votes_by_value = defaultdict(lambda: defaultdict(int))
+    reviews_by_department = defaultdict(int)
+    for row in DailyActivity.objects.filter(date__gte=since).values(*BREAKDOWN_FIELDS):
+        for category, counts in row["votes_by_value"].items():
+            for value, count in counts.items():
+                votes_by_value[category][value] += count
+        for department, count in row["reviews_by_department"].items():
+            reviews_by_department[department] += count
+
+    summary["new"]["votes_by_value"] = {
+        category: dict(sorted(counts.items()))
+        for category, counts in votes_by_value.items()
+    }
+    summary["new"]["reviews_by_department"] = sorted(
+        reviews_by_department.items(), key=lambda item: (-item[1], item[0])
+    )
+    return summary
+
+
+def _window_sums(windows, today):
+    """
+    Metric sums for each `(name, start)` window over the days before `today`:
+    the rolled-up days, plus a live aggregate of the days not rolled up yet
+    (before the nightly rollup has run, or after it failed).
+    """
+    sums = DailyActivity.objects.aggregate(
+        last=Max("date"),
+        **{
+            f"{name}__{field}": Sum(field, filter=Q(date__gte=start))
+            for name, start in windows
+            for field in ROLLUP_FIELDS
+        },
+    )
+    totals = {
+        name: {field: sums[f"{name}__{field}"] or 0 for field in ROLLUP_FIELDS}
+        for name, _ in windows
+    }
+
+    pending_start = min(start for _, start in windows)
+    if sums["last"] is not None:
+        pending_start = max(pending_start, sums["last"] + datetime.timedelta(days=1))
+    if pending_start < today:
+        for date, metrics in aggregate_days(pending_start, today).items():
+            for name, start in windows:
+                if date >= start:
+                    for field in ROLLUP_FIELDS:
+                        totals[name][field] += metrics[field] or 0
+    return totals
+
+
+def dashboard_metrics(excluded_user_id=None):
+    """
+    Build the dashboard tables.
+
+    `excluded_user_id` is the bulk-import account whose reviews are reported
+    separately (the "exclusive" review count and the reviewer count).
+    """
+    today = timezone.localdate()
+    since_today = day_start(today)
+    not_excluded = ~Q(user_id=excluded_user_id)
+
+    users = User.objects.aggregate(
+        total=Count("id"),
+        active=Count("id", filter=Q(is_active=True)),
+        today=Count("id", filter=Q(date_joined__gte=since_today)),
+    )
+    votes = Vote.objects.aggregate(
+        quality=Count("id", filter=QUALITY_VOTE),
+        difficulty=Count("id", filter=DIFFICULTY_VOTE),
+        unvotes=Count("id", filter=UNVOTE),
+        quality_today=Count("id", filter=QUALITY_VOTE & Q(created_at__gte=since_today)),
+        difficulty_today=Count(
+            "id", filter=DIFFICULTY_VOTE & Q(created_at__gte=since_today)
+        ),
+        unvotes_today=Count("id", filter=UNVOTE & Q(created_at__gte=since_today)),
+        voters=Count("user", filter=~UNVOTE, distinct=True),
+        quality_voters=Count("user", filter=QUALITY_VOTE, distinct=True),
+        difficulty_voters=Count("user", filter=DIFFICULTY_VOTE, distinct=True),
+    )
+    reviews = Review.objects.aggregate(
+        total=Count("id"),
+        exclusive=Count("id", filter=not_excluded),
+        today=Count("id", filter=Q(created_at__gte=since_today)),
+        reviewers=Count("user", filter=not_excluded, distinct=True),
+    )
+
+    live_today = {
+        "new_users": users["today"],
+        "logins": daily_logins([today])[today] or 0,
+        "quality_votes": votes["quality_today"],
+        "difficulty_votes": votes["difficulty_today"],
+        "unvotes": votes["unvotes_today"],
+        "reviews": reviews["today"],
+    }
+    windows = [
+        ("Month", today - datetime.timedelta(days=31)),
+        ("Week", today - datetime.timedelta(weeks=1)),
+    ]
+    window_metrics = {
+        name: {field: total + live_today[field] for field, total in sums.items()}
+        for name, sums in _window_sums(windows, today).items()
+    }
+    # Unique users over the window, not the sum of each day's unique users.
+    logins = unique_logins({name: (start, today) for name, start in windows})
+    for name, count in logins.items():
+        window_metrics[name]["logins"] = count
+    window_metrics["Today"] = live_today
+
+    overall_table = [
+        (
+            "Total",
+            users["total"],
+            votes["quality"],
+            votes["difficulty"],
+            "{} ({} exclusive)".format(reviews["total"], reviews["exclusive"]),
+        )
+    ]
+    vote_table = [
+        ("Total", votes["quality"], votes["difficulty"], votes["unvotes"]),
+    ]
+    for name, metrics in window_metrics.items():
+        overall_table.append(
+            (
+                name,
+                metrics["new_users"],
+                metrics["quality_votes"],
+                metrics["difficulty_votes"],
+                metrics["reviews"],
+            )
+        )
+        vote_table.append(
+            (
+                name,
+                metrics["quality_votes"],
+                metrics["difficulty_votes"],
+                metrics["unvotes"],
+            )
+        )
+
+    return {
+        "overall_table": overall_table,
+        "vote_table": vote_table,
+        "num_voters": votes["voters"],
+        "num_quality_voters": votes["quality_voters"],
+        "num_difficulty_voters": votes["difficulty_voters"],
+        "num_reviewers": reviews["reviewers"],
+        "activated_accounts": users["active"],
+        "class_breakdown": class_breakdown(excluded_user_id),
+    }
+
+
+def class_breakdown(excluded_user_id=None):
+    """
+    Count users per class year, taken from usernames ending in ".YY".
+
+    Grouped in the database rather than by loading every username.
+    """
+    return list(
+        User.objects.exclude(id=excluded_user_id)
+        .filter(username__regex=r"(^|\.)[^.]{2}$")
+        .annotate(year=Right("username", 2))
+        .values("year")
+        .annotate(count=Count("id"))
+        .order_by("year")
+        .values_list("year", "count")
+    )
@@ -0,0 +1,162 @@
+"""
+Batch sentiment classifier for reviews.
+
+A ridge regression over hashed word/bigram features is trained on the
+reviews labeled through the sentiment labeler and predicts both the
+difficulty and the quality sentiment of every other review. Hashing keeps
+the vectorizer stateless, so scoring streams the review table in fixed-size
+batches and memory stays bounded by the batch size, not the table size.
+
+Scoring is incremental: a `(updated_at, id)` watermark records the last
+review scored, and only reviews created or edited after it are re-scored.
+Retraining resets the watermark so every review is scored by the new model.
+Results are written with `bulk_update`, which leaves `updated_at` untouched.
+"""
+
+import logging
+import time
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import Ridge
+
+from apps.web.models import Review
+
+logger = logging.getLogger(__name__)
+
+MODEL_CACHE_KEY = "analytics:sentiment:model"
+WATERMARK_CACHE_KEY = "analytics:sentiment:watermark"
+
+N_FEATURES = 2**16
+MIN_TRAINING_REVIEWS = 20
+BATCH_SIZE = 1000
+
+SCORED_FIELDS = ["sentiment_labeler", "difficulty_sentiment", "quality_sentiment"]
+
+VECTORIZER = HashingVectorizer(
+    n_features=N_FEATURES,
+    ngram_range=(1, 2),
+    alternate_sign=False,
+    norm="l2",
+)
+
+
+def train(min_reviews=MIN_TRAINING_REVIEWS):
+    """
+    Fit a model on the manually labeled reviews and store it in the cache.
+
+    Returns the number of training reviews, or None if there were too few.
+    """
+    labeled = Review.objects.filter(
+        sentiment_labeler=Review.MANUAL_SENTIMENT_LABELER,
+        difficulty_sentiment__isnull=False,
+        quality_sentiment__isnull=False,
+    ).values_list("comments", "difficulty_sentiment", "quality_sentiment")
+    comments, targets = [], []
+    for text, difficulty, quality in labeled.iterator(chunk_size=BATCH_SIZE):
+        comments.append(text)
+        targets.append((difficulty, quality))
+    if len(comments) < min_reviews:
+        logger.warning(
+            "Not training sentiment classifier: %d labeled reviews", len(comments)
+        )
+        return None
+
+    model = Ridge(alpha=1.0)
+    model.fit(VECTORIZER.transform(comments), np.array(targets))
+    cache.set(
+        MODEL_CACHE_KEY,
+        {
+            "model": model,
+            "trained_at": timezone.now(),
+            "training_size": len(comments),
+        },
+        timeout=None,
+    )
+    cache.delete(WATERMARK_CACHE_KEY)
+    logger.info("Trained sentiment classifier on %d reviews", len(comments))
+    return len(comments)
+
+
+def predict(model, comments):
+    """(difficulty, quality) sentiment per comment, clipped to [-1, 1]."""
+    return np.clip(model.predict(VECTORIZER.transform(comments)), -1.0, 1.0)
+
+
+def pending_reviews(watermark=None):
+    """Reviews the classifier should (re-)score, in watermark order."""
+    reviews = Review.objects.exclude(sentiment_labeler=Review.MANUAL_SENTIMENT_LABELER)
+    if watermark is not None:
+        updated_at, review_id = watermark
+        reviews = reviews.filter(
+            Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=review_id)
+        )
+    return reviews.order_by("updated_at", "id")
+
+
+def _score_batch(model, batch):
+    started = time.perf_counter()
+    scores = predict(model, [comments for _, comments, _ in batch])
+    predicted = time.perf_counter()
+    Review.objects.bulk_update(
+        [
+            Review(
+                id=review_id,
+                sentiment_labeler=Review.AUTOMATED_SENTIMENT_LABELER,
+                difficulty_sentiment=float(difficulty),
+                quality_sentiment=float(quality),
+            )
+            for (review_id, _, _), (difficulty, quality) in zip(batch, scores)
+        ],
+        SCORED_FIELDS,
+    )
+    written = time.perf_counter()
+    return predicted - started, written - predicted
+
+
+def score_pending(batch_size=BATCH_SIZE):
+    """
+    Score every review created or edited since the last run.
+
+    Reviews are streamed with `iterator(chunk_size=batch_size)` and written
+    back one batch at a time; the watermark advances after each batch, so an
+    interrupted run resumes where it stopped. Returns the per-batch timings.
+    """
+    stored = cache.get(MODEL_CACHE_KEY)
+    if stored is None:
+        logger.warning("No sentiment classifier trained yet; nothing scored")
+        return []
+    model = stored["model"]
+
+    reviews = pending_reviews(cache.get(WATERMARK_CACHE_KEY)).values_list(
+        "id", "comments", "updated_at"
+    )
+    metrics = []
+
+    def flush(batch, fetch_seconds):
+        predict_seconds, write_seconds = _score_batch(model, batch)
+        review_id, _, updated_at = batch[-1]
+        cache.set(WATERMARK_CACHE_KEY, (updated_at, review_id), timeout=None)
+        timing = {
+            "size": len(batch),
+            "fetch_ms": round(fetch_seconds * 1000, 1),
+            "predict_ms": round(predict_seconds * 1000, 1),
+            "write_ms": round(write_seconds * 1000, 1),
+        }
+        logger.info("Scored sentiment batch %d: %s", len(metrics) + 1, timing)
+        metrics.append(timing)
+
+    batch = []
+    fetch_started = time.perf_counter()
+    for row in reviews.iterator(chunk_size=batch_size):
+        batch.append(row)
+        if len(batch) == batch_size:
+            flush(batch, time.perf_counter() - fetch_started)
+            batch = []
+            fetch_started = time.perf_counter()
+    if batch:
+        flush(batch, time.perf_counter() - fetch_started)
+    return metrics
@@ -0,0 +1,9 @@
+from django.contrib.auth.signals import user_logged_in
+from django.dispatch import receiver
+
+from apps.analytics import rollups
+
+
+@receiver(user_logged_in)
+def login_recorded(sender, request, user, **kwargs):
+    rollups.record_login(user.pk)
@@ -1,14 +1,13 @@
-from datetime import datetime, timedelta
+from datetime import timedelta
 
 from celery import shared_task
 from django.conf import settings
-from django.contrib.auth.models import User
 from django.core.mail import send_mail
-from django.db.models import Q
-from django.template import Context
 from django.template.loader import get_template
+from django.utils import timezone
 
-from apps.web.models import CourseOffering, Review, Vote
+from apps.analytics import labeling, rollups
+from apps.web.models import CourseOffering
 from lib import constants, task_utils, terms
 
 
@@ -16,7 +15,7 @@ from lib import constants, task_utils, terms
 @task_utils.email_if_fails
 def send_analytics_email_update(lookback=timedelta(days=7)):
     context = _get_analytics_email_context(lookback)
-    content = get_template("analytics_email.txt").render(Context(context))
+    content = get_template("analytics_email.txt").render(context)
     send_mail(
         "Layup List Weekly Update",
         content,
@@ -27,35 +26,46 @@ def send_analytics_email_update(lookback=timedelta(days=7)):
 
 
 def _get_analytics_email_context(lookback):
-    changes_since = datetime.now() - lookback
-    new_query = Q(created_at__gte=changes_since)
-    users = User.objects.all()
-    quality_votes = Vote.objects.filter(category=Vote.CATEGORIES.QUALITY)
-    quality_upvotes = quality_votes.filter(value=1)
-    quality_downvotes = quality_votes.filter(value=-1)
-    difficulty_votes = Vote.objects.filter(category=Vote.CATEGORIES.DIFFICULTY)
-    difficulty_upvotes = difficulty_votes.filter(value=1)
-    difficulty_downvotes = difficulty_votes.filter(value=-1)
+    # Read from the daily rollups only; bring them up to yesterday first.
+    rollups.rollup_pending()
+    since = timezone.localdate() - lookback
+    return rollups.activity_summary(since)
+
+
+@shared_task
+@task_utils.email_if_fails
+def rollup_daily_activity():
+    return rollups.rollup_pending()
+
+
+@shared_task
+@task_utils.email_if_fails
+def refill_labeling_queue():
+    return labeling.refill()
+
+
+@shared_task
+@task_utils.email_if_fails
+def train_sentiment_classifier():
+    # Imported here so the web process does not need scikit-learn.
+    from apps.analytics import sentiment
+
+    return sentiment.train()
+
+
+@shared_task
+@task_utils.email_if_fails
+def score_review_sentiments():
+    from apps.analytics import sentiment
+
+    metrics = sentiment.score_pending()
     return {
-        "users": {
-            "all": users,
-            "new": users.filter(date_joined__gte=changes_since),
-            "unique_recent_logins": users.filter(last_login__gte=changes_since),
-        },
-        "votes": {
-            "all_quality_upvotes": quality_upvotes,
-            "all_quality_downvotes": quality_downvotes,
-            "all_difficulty_upvotes": difficulty_upvotes,
-            "all_difficulty_downvotes": difficulty_downvotes,
-            "new_quality_upvotes": quality_upvotes.filter(new_query),
-            "new_quality_downvotes": quality_downvotes.filter(new_query),
-            "new_difficulty_upvotes": difficulty_upvotes.filter(new_query),
-            "new_difficulty_downvotes": difficulty_downvotes.filter(new_query),
-        },
-        "reviews": {
-            "all": Review.objects.all(),
-            "new": Review.objects.filter(new_query),
-        },
+        "batches": len(metrics),
+        "reviews": sum(batch["size"] for batch in metrics),
+        "slowest_batch_ms": max(
+            (batch["predict_ms"] + batch["write_ms"] for batch in metrics),
+            default=0,
+        ),
     }
 
 
@@ -0,0 +1,68 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django_redis import get_redis_connection
+
+from apps.analytics import labeling
+from apps.web.models import Review
+from apps.web.tests import factories
+
+
+class LabelingQueueTestCase(TestCase):
+    def setUp(self):
+        get_redis_connection("default").flushdb()
+        cache.clear()
+        self.picker = factories.UserFactory(username="CoursePicker")
+        self.reviews = factories.ReviewFactory.create_batch(5, user=self.picker)
+        factories.ReviewFactory()  # written by a student, never queued
+        labeled = self.reviews.pop()
+        labeled.sentiment_labeler = Review.MANUAL_SENTIMENT_LABELER
+        labeled.save()
+
+    def test_refill_queues_only_unlabeled_reviews(self):
+        self.assertEqual(labeling.refill(), 4)
+
+        progress = labeling.progress(self.picker.id)
+        self.assertEqual(progress["remaining"], 4)
+        self.assertEqual(progress["labeled_count"], 1)
+
+    def test_labelers_never_get_the_same_review(self):
+        labeling.refill()
+
+        with self.assertNumQueries(0):
+            served = [labeling.next_review_id() for _ in range(5)]
+
+        self.assertCountEqual(served[:4], [review.id for review in self.reviews])
+        self.assertIsNone(served[4])
+
+    def test_refill_skips_leased_reviews(self):
+        labeling.refill()
+        leased = labeling.next_review_id()
+
+        self.assertEqual(labeling.refill(), 3)
+        served = {labeling.next_review_id() for _ in range(3)}
+        self.assertNotIn(leased, served)
+
+    def test_expired_lease_is_served_again(self):
+        labeling.refill()
+        abandoned = labeling.next_review_id()
+
+        with mock.patch("time.time", return_value=10**12):
+            self.assertEqual(labeling.next_review_id(), abandoned)
+
+    def test_complete_tracks_session_throughput(self):
+        labeling.refill()
+        for _ in range(2):
+            labeling.complete(labeling.next_review_id(), self.picker.id)
+
+        progress = labeling.progress(self.picker.id)
+        self.assertEqual(progress["remaining"], 2)
+        self.assertEqual(progress["labeled_count"], 3)
+        self.assertEqual(progress["session"]["labeled"], 2)
+
+    def test_course_picker_lookup_is_cached(self):
+        labeling.course_picker_id()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(labeling.course_picker_id(), self.picker.id)
@@ -0,0 +1,172 @@
+import datetime
+
+from django.test import TestCase
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+from apps.analytics import rollups, tasks
+from apps.analytics.models import DailyActivity
+from apps.web.models import Vote
+from apps.web.tests import factories
+
+
+class RollupTestCase(TestCase):
+    def setUp(self):
+        get_redis_connection("default").flushdb()
+        self.today = timezone.localdate()
+        self.course = factories.CourseFactory(department="COSC")
+
+    def _backdate(self, obj, days, field="created_at"):
+        moment = rollups.day_start(self.today - datetime.timedelta(days=days))
+        type(obj).objects.filter(pk=obj.pk).update(
+            **{field: moment + datetime.timedelta(hours=12)}
+        )
+
+    def test_rollup_pending_aggregates_past_days_only(self):
+        old_vote = factories.VoteFactory(course=self.course, value=4)
+        self._backdate(old_vote, 3)
+        old_review = factories.ReviewFactory(course=self.course)
+        self._backdate(old_review, 3)
+        factories.VoteFactory(
+            course=self.course, value=2, category=Vote.CATEGORIES.DIFFICULTY
+        )
+
+        rollups.rollup_pending()
+
+        row = DailyActivity.objects.get(date=self.today - datetime.timedelta(days=3))
+        self.assertEqual(row.quality_votes, 1)
+        self.assertEqual(row.reviews, 1)
+        self.assertFalse(DailyActivity.objects.filter(date=self.today).exists())
+
+    def test_rerun_is_idempotent(self):
+        review = factories.ReviewFactory(course=self.course)
+        self._backdate(review, 1)
+
+        rollups.rollup_pending()
+        rollups.rollup_pending()
+
+        self.assertEqual(
+            DailyActivity.objects.get(
+                date=self.today - datetime.timedelta(days=1)
+            ).reviews,
+            1,
+        )
+
+    def test_dashboard_windows_combine_rollups_and_today(self):
+        picker = factories.UserFactory(username="CoursePicker")
+        for days in (0, 5, 20, 60):
+            review = factories.ReviewFactory(course=self.course)
+            self._backdate(review, days)
+        factories.ReviewFactory(course=self.course, user=picker)
+        rollups.rollup_pending()
+
+        metrics = rollups.dashboard_metrics(excluded_user_id=picker.id)
+        reviews_by_window = {row[0]: row[4] for row in metrics["overall_table"]}
+
+        self.assertEqual(reviews_by_window["Total"], "5 (4 exclusive)")
+        self.assertEqual(reviews_by_window["Month"], 4)
+        self.assertEqual(reviews_by_window["Week"], 3)
+        self.assertEqual(reviews_by_window["Today"], 2)
+        self.assertEqual(metrics["num_reviewers"], 4)
+
+    def test_dashboard_windows_include_days_not_rolled_up_yet(self):
+        for days in (1, 3, 10):
+            self._backdate(factories.ReviewFactory(course=self.course), days)
+        rollups.rollup_days(
+            self.today - datetime.timedelta(days=10),
+            self.today - datetime.timedelta(days=9),
+        )
+
+        metrics = rollups.dashboard_metrics()
+        reviews_by_window = {row[0]: row[4] for row in metrics["overall_table"]}
+
+        self.assertEqual(reviews_by_window["Month"], 3)
+        self.assertEqual(reviews_by_window["Week"], 2)
+
+    def test_dashboard_uses_a_bounded_number_of_queries(self):
+        for _ in range(5):
+            factories.VoteFactory(value=3)
+            factories.ReviewFactory()
+        # Rolled up through yesterday, so only today is aggregated live.
+        DailyActivity.objects.create(date=self.today - datetime.timedelta(days=1))
+
+        with self.assertNumQueries(5):
+            rollups.dashboard_metrics()
+
+    def test_class_breakdown_groups_usernames_by_year(self):
+        for username in ("a.smith.24", "b.lee.24", "c.wu.25", "nodot", "x.y.2025"):
+            factories.UserFactory(username=username)
+
+        self.assertEqual(rollups.class_breakdown(), [("24", 2), ("25", 1)])
+
+    def test_rollup_breaks_down_votes_and_reviews(self):
+        for value in (5, 5, 2):
+            self._backdate(factories.VoteFactory(course=self.course, value=value), 1)
+        self._backdate(
+            factories.VoteFactory(
+                course=self.course, value=3, category=Vote.CATEGORIES.DIFFICULTY
+            ),
+            1,
+        )
+        self._backdate(factories.ReviewFactory(course=self.course), 1)
+        other = factories.CourseFactory(department="MATH")
+        self._backdate(factories.ReviewFactory(course=other), 1)
+
+        rollups.rollup_pending()
+
+        row = DailyActivity.objects.get(date=self.today - datetime.timedelta(days=1))
+        self.assertEqual(
+            row.votes_by_value,
+            {"quality": {"5": 2, "2": 1}, "difficulty": {"3": 1}},
+        )
+        self.assertEqual(row.reviews_by_department, {"COSC": 1, "MATH": 1})
+        self.assertEqual(row.reviews, 2)
+
+    def test_logins_are_counted_once_per_user_and_day(self):
+        user, other = factories.UserFactory(), factories.UserFactory()
+        self.client.force_login(user)
+        self.client.force_login(user)
+        self.client.force_login(other)
+        yesterday = self.today - datetime.timedelta(days=1)
+        # Move today's set to yesterday so the rollup picks it up.
+        get_redis_connection("default").rename(
+            rollups.LOGINS_KEY_FMT.format(self.today.isoformat()),
+            rollups.LOGINS_KEY_FMT.format(yesterday.isoformat()),
+        )
+
+        rollups.rollup_days(yesterday, self.today)
+
+        self.assertEqual(DailyActivity.objects.get(date=yesterday).logins, 2)
+
+    def test_period_logins_count_unique_users(self):
+        r = get_redis_connection("default")
+        for days, user_ids in ((0, [1, 2]), (1, [1]), (3, [1, 3])):
+            date = self.today - datetime.timedelta(days=days)
+            r.sadd(rollups.LOGINS_KEY_FMT.format(date.isoformat()), *user_ids)
+
+        summary = rollups.activity_summary(self.today - datetime.timedelta(days=7))
+
+        self.assertEqual(summary["new"]["logins"], 3)
+        self.assertNotIn("logins", summary["all"])
+
+    def test_rerun_keeps_logins_after_redis_set_expired(self):
+        yesterday = self.today - datetime.timedelta(days=1)
+        DailyActivity.objects.create(date=yesterday, logins=7)
+
+        rollups.rollup_days(yesterday, self.today)
+
+        self.assertEqual(DailyActivity.objects.get(date=yesterday).logins, 7)
+
+    def test_email_context_reads_rollups(self):
+        self._backdate(factories.ReviewFactory(course=self.course), 2)
+        self._backdate(factories.ReviewFactory(course=self.course), 30)
+        self._backdate(factories.VoteFactory(course=self.course, value=4), 2)
+
+        context = tasks._get_analytics_email_context(datetime.timedelta(days=7))
+        with self.assertNumQueries(2):
+            rollups.activity_summary(self.today - datetime.timedelta(days=7))
+
+        self.assertEqual(context["all"]["reviews"], 2)
+        self.assertEqual(context["new"]["reviews"], 1)
+        self.assertEqual(context["new"]["reviews_by_department"], [("COSC", 1)])
+        self.assertEqual(context["new"]["votes_by_value"]["quality"], {"4": 1})
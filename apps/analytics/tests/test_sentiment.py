@@ -0,0 +1,74 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from apps.analytics import sentiment
+from apps.web.models import Review
+from apps.web.tests import factories
+
+POSITIVE = "great professor, easy and fun lectures"
+NEGATIVE = "terrible course, brutal problem sets and boring lectures"
+
+
+class SentimentPipelineTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        for i in range(10):
+            for comments, score in ((POSITIVE, 1.0), (NEGATIVE, -1.0)):
+                factories.ReviewFactory(
+                    comments=f"{comments} {i}",
+                    sentiment_labeler=Review.MANUAL_SENTIMENT_LABELER,
+                    difficulty_sentiment=score,
+                    quality_sentiment=score,
+                )
+        self.good = factories.ReviewFactory(comments=POSITIVE)
+        self.bad = factories.ReviewFactory(comments=NEGATIVE)
+        factories.ReviewFactory.create_batch(3)
+
+    def test_train_needs_enough_labels(self):
+        self.assertIsNone(sentiment.train(min_reviews=21))
+        self.assertEqual(sentiment.train(min_reviews=20), 20)
+
+    def test_scores_unlabeled_reviews_in_batches(self):
+        sentiment.train()
+
+        metrics = sentiment.score_pending(batch_size=2)
+
+        self.assertEqual([batch["size"] for batch in metrics], [2, 2, 1])
+        self.assertEqual(
+            Review.objects.filter(
+                sentiment_labeler=Review.AUTOMATED_SENTIMENT_LABELER
+            ).count(),
+            5,
+        )
+        self.good.refresh_from_db()
+        self.bad.refresh_from_db()
+        self.assertGreater(self.good.quality_sentiment, 0)
+        self.assertLess(self.bad.quality_sentiment, 0)
+        self.assertEqual(
+            Review.objects.filter(
+                sentiment_labeler=Review.MANUAL_SENTIMENT_LABELER, quality_sentiment=1.0
+            ).count(),
+            10,
+        )
+
+    def test_rescores_only_new_or_edited_reviews(self):
+        sentiment.train()
+        sentiment.score_pending()
+        self.assertEqual(sentiment.score_pending(), [])
+
+        self.good.comments = NEGATIVE
+        self.good.save()
+        factories.ReviewFactory()
+        metrics = sentiment.score_pending()
+
+        self.assertEqual(sum(batch["size"] for batch in metrics), 2)
+        self.good.refresh_from_db()
+        self.assertLess(self.good.quality_sentiment, 0)
+
+    def test_retraining_rescores_everything(self):
+        sentiment.train()
+        sentiment.score_pending()
+
+        sentiment.train()
+
+        self.assertEqual(sum(batch["size"] for batch in sentiment.score_pending()), 5)
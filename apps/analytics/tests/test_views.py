@@ -0,0 +1,74 @@
+import datetime
+
+from django.http import Http404
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.analytics import views
+from apps.analytics.models import DailyActivity
+from apps.web.tests import factories
+
+
+class ActivityTimeseriesTestCase(TestCase):
+    def setUp(self):
+        self.url = reverse("analytics_activity_api")
+        self.admin = factories.UserFactory(is_staff=True)
+        self.yesterday = timezone.localdate() - datetime.timedelta(days=1)
+        for days, reviews in ((0, 3), (1, 2), (40, 5)):
+            DailyActivity.objects.create(
+                date=self.yesterday - datetime.timedelta(days=days),
+                reviews=reviews,
+                reviews_by_department={"COSC": reviews},
+            )
+
+    def test_requires_staff(self):
+        self.client.force_login(factories.UserFactory())
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_defaults_to_last_thirty_days(self):
+        self.client.force_login(self.admin)
+
+        with self.assertNumQueries(2):  # user, rollups
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["end"], self.yesterday.isoformat())
+        self.assertEqual(len(data["days"]), 2)
+        self.assertEqual(data["days"][-1]["reviews_by_department"], {"COSC": 3})
+        self.assertEqual(data["totals"]["reviews"], 5)
+
+    def test_explicit_range(self):
+        self.client.force_login(self.admin)
+        start = self.yesterday - datetime.timedelta(days=60)
+
+        data = self.client.get(
+            self.url, {"start": start.isoformat(), "end": self.yesterday.isoformat()}
+        ).json()
+
+        self.assertEqual(data["totals"]["reviews"], 10)
+
+    def test_rejects_bad_ranges(self):
+        self.client.force_login(self.admin)
+        too_early = self.yesterday - datetime.timedelta(days=400)
+
+        for params in (
+            {"start": "yesterday"},
+            {"start": self.yesterday.isoformat(), "end": too_early.isoformat()},
+            {"start": too_early.isoformat(), "end": self.yesterday.isoformat()},
+        ):
+            self.assertEqual(self.client.get(self.url, params).status_code, 400)
+
+
+class SentimentLabelerTestCase(TestCase):
+    def setUp(self):
+        self.admin = factories.UserFactory(is_staff=True, is_superuser=True)
+
+    def test_invalid_post_without_a_review_is_not_found(self):
+        for data in ({}, {"review_id": "x"}, {"review_id": "999999"}):
+            with self.subTest(data=data):
+                request = RequestFactory().post("/", data)
+                request.user = self.admin
+                with self.assertRaises(Http404):
+                    views.sentiment_labeler(request)
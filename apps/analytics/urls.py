@@ -0,0 +1,7 @@
+from django.urls import re_path
+
+from apps.analytics import views
+
+urlpatterns = [
+    re_path(r"^activity/$", views.activity_timeseries, name="analytics_activity_api"),
+]
@@ -1,159 +1,138 @@
 import datetime
-from collections import Counter
-from random import randint
 
-import pytz
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import user_passes_test
-from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.db.models import Count
-from django.shortcuts import render
+from django.shortcuts import get_object_or_404, render
+from django.utils import timezone
 from django.views.decorators.http import require_safe
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
 
+from apps.analytics import labeling, rollups, tasks
 from apps.analytics.forms import ManualSentimentForm
-from apps.recommendations.models import Recommendation
+from apps.analytics.models import DailyActivity
 from apps.web import models
 from lib import constants
 
 LIMIT = 15
 
+DASHBOARD_CACHE_KEY = "analytics:dashboard"
+DASHBOARD_CACHE_TIMEOUT = 10 * 60
+
+DEFAULT_TIMESERIES_DAYS = 30
+MAX_TIMESERIES_DAYS = 366
+
 
 @require_safe
 @staff_member_required
 def home(request):
-    course_picker = User.objects.get(username="CoursePicker")
-
-    non_zero_votes = models.Vote.objects.exclude(value=0)
-    num_voters = non_zero_votes.values_list("user").distinct().count()
-    num_quality_voters = (
-        non_zero_votes.filter(category=models.Vote.CATEGORIES.QUALITY)
-        .values_list("user")
-        .distinct()
-        .count()
-    )
-    num_difficulty_voters = (
-        non_zero_votes.filter(category=models.Vote.CATEGORIES.DIFFICULTY)
-        .values_list("user")
-        .distinct()
-        .count()
-    )
-    num_reviewers = (
-        models.Review.objects.exclude(user=course_picker)
-        .values_list("user")
-        .distinct()
-        .count()
-    )
+    # apps.recommendations is not always installed; only the dashboard needs it.
+    from apps.recommendations.models import Recommendation
 
-    now = datetime.datetime.now(tz=pytz.timezone("US/Eastern"))
-    month_ago = ("Month", now - datetime.timedelta(days=31))
-    week_ago = ("Week", now - datetime.timedelta(weeks=1))
-    today = ("Today", now - datetime.timedelta(hours=24))
-
-    overall_table = [
-        (
-            "Total",
-            User.objects.count(),
-            models.Vote.objects.exclude(value=0)
-            .filter(category=models.Vote.CATEGORIES.QUALITY)
-            .count(),
-            models.Vote.objects.exclude(value=0)
-            .filter(category=models.Vote.CATEGORIES.DIFFICULTY)
-            .count(),
-            "{} ({} exclusive)".format(
-                models.Review.objects.count(),
-                models.Review.objects.exclude(user=course_picker).count(),
-            ),
-        )
-    ]
-    for name, earliest_date in [month_ago, week_ago, today]:
-        non_zero_votes_since = non_zero_votes.filter(created_at__gte=earliest_date)
-        overall_table.append(
-            (
-                name,
-                User.objects.filter(date_joined__gte=earliest_date).count(),
-                non_zero_votes_since.filter(
-                    category=models.Vote.CATEGORIES.QUALITY
-                ).count(),
-                non_zero_votes_since.filter(
-                    category=models.Vote.CATEGORIES.DIFFICULTY
-                ).count(),
-                models.Review.objects.filter(created_at__gte=earliest_date).count(),
-            )
+    context = cache.get(DASHBOARD_CACHE_KEY)
+    if context is None:
+        context = rollups.dashboard_metrics(
+            excluded_user_id=labeling.course_picker_id()
         )
 
-    vote_table = [
-        (
-            "Total",
-            models.Vote.objects.filter(
-                value__gte=1, category=models.Vote.CATEGORIES.QUALITY
-            ).count(),
-            models.Vote.objects.filter(
-                value__gte=1, category=models.Vote.CATEGORIES.DIFFICULTY
-            ).count(),
-            models.Vote.objects.filter(value=0).count(),
+        recommendations_last_updated = []
+        for creator, description in Recommendation.CREATORS:
+            rec = Recommendation.objects.filter(creator=creator).order_by("created_at")[
+                :1
+            ]
+            if rec:
+                recommendations_last_updated.append((description, rec[0].created_at))
+            else:
+                recommendations_last_updated.append((description, "never"))
+        context["recommendations_last_updated"] = recommendations_last_updated
+        context["generated_at"] = timezone.now()
+
+        cache.set(DASHBOARD_CACHE_KEY, context, DASHBOARD_CACHE_TIMEOUT)
+
+    return render(request, "dashboard.html", context)
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def activity_timeseries(request):
+    """
+    Per-day site activity, read from the daily rollups.
+
+    Input:
+        - start: first day, YYYY-MM-DD (default: 30 days before end)
+        - end: last day, YYYY-MM-DD, inclusive (default: yesterday)
+
+    Output:
+        Success (200):
+        {
+            "start": "YYYY-MM-DD",
+            "end": "YYYY-MM-DD",
+            "days": [
+                {
+                    "date": "YYYY-MM-DD",
+                    "new_users": int,
+                    "logins": int,
+                    "quality_votes": int,
+                    "difficulty_votes": int,
+                    "unvotes": int,
+                    "reviews": int,
+                    "votes_by_value": {"quality": {"5": int, ...}, ...},
+                    "reviews_by_department": {"COSC": int, ...}
+                }, ...
+            ],
+            "totals": {"new_users": int, ..., "login_days": int}
+        }
+        Error (400): {"detail": "..."}
+    """
+    try:
+        end = _parse_date(request.query_params.get("end"))
+        start = _parse_date(request.query_params.get("start"))
+    except ValueError:
+        return Response(
+            {"detail": "Dates must be formatted as YYYY-MM-DD"},
+            status=status.HTTP_400_BAD_REQUEST,
         )
-    ]
-    for name, earliest_date in [month_ago, week_ago, today]:
-        vote_table.append(
-            (
-                name,
-                models.Vote.objects.filter(
-                    value__gte=1,
-                    category=models.Vote.CATEGORIES.QUALITY,
-                    created_at__gte=earliest_date,
-                ).count(),
-                models.Vote.objects.filter(
-                    value__gte=1,
-                    category=models.Vote.CATEGORIES.DIFFICULTY,
-                    created_at__gte=earliest_date,
-                ).count(),
-                models.Vote.objects.filter(
-                    value=0, created_at__gte=earliest_date
-                ).count(),
-            )
+    if end is None:
+        end = timezone.localdate() - datetime.timedelta(days=1)
+    if start is None:
+        start = end - datetime.timedelta(days=DEFAULT_TIMESERIES_DAYS - 1)
+    if start > end:
+        return Response(
+            {"detail": "start must not be after end"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if (end - start).days >= MAX_TIMESERIES_DAYS:
+        return Response(
+            {"detail": f"At most {MAX_TIMESERIES_DAYS} days can be requested"},
+            status=status.HTTP_400_BAD_REQUEST,
         )
 
-    usernames = User.objects.exclude(id=course_picker.id).values_list(
-        "username", flat=True
+    fields = rollups.ROLLUP_FIELDS + rollups.BREAKDOWN_FIELDS
+    rows = DailyActivity.objects.filter(date__gte=start, date__lte=end).values(
+        "date", *fields
     )
-    c = Counter()
-    for username in usernames:
-        year_string = username.split(".")[-1]
-        c[year_string] += 1
-    class_breakdown = sorted(
-        [
-            (
-                year,
-                count,
-            )
-            for year, count in c.items()
-            if len(year) == 2
-        ]
+    days = [{**row, "date": row["date"].isoformat()} for row in rows]
+    totals = {field: sum(day[field] for day in days) for field in rollups.ROLLUP_FIELDS}
+    # The sum of each day's unique logins: a user counts once per day.
+    totals["login_days"] = totals.pop("logins")
+    return Response(
+        {
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "days": days,
+            "totals": totals,
+        }
     )
 
-    recommendations_last_updated = []
-    for creator, description in Recommendation.CREATORS:
-        rec = Recommendation.objects.filter(creator=creator).order_by("created_at")[:1]
-        if rec:
-            recommendations_last_updated.append((description, rec[0].created_at))
-        else:
-            recommendations_last_updated.append((description, "never"))
 
-    return render(
-        request,
-        "dashboard.html",
-        {
-            "overall_table": overall_table,
-            "vote_table": vote_table,
-            "num_voters": num_voters,
-            "num_quality_voters": num_quality_voters,
-            "num_difficulty_voters": num_difficulty_voters,
-            "num_reviewers": num_reviewers,
-            "recommendations_last_updated": recommendations_last_updated,
-            "activated_accounts": User.objects.filter(is_active=True).count(),
-            "class_breakdown": class_breakdown,
-        },
-    )
+def _parse_date(value):
+    if not value:
+        return None
+    return datetime.date.fromisoformat(value)
 
 
 @require_safe
@@ -184,33 +163,45 @@ def sentiment_labeler(request):
         form = ManualSentimentForm(request.POST)
         if form.is_valid():
             form.save_sentiment()
+            labeling.complete(form.cleaned_data["review_id"], request.user.id)
         else:
+            # A missing or malformed review_id is absent from cleaned_data.
+            review = get_object_or_404(
+                models.Review, id=form.cleaned_data.get("review_id")
+            )
             return render(
                 request,
                 "sentiment_labeler.html",
                 {
-                    "review": models.Review.objects.get(id=form.review_id),
+                    "review": review,
                     "form": form,
+                    **labeling.progress(request.user.id),
                 },
             )
-    unlabeled_reviews = models.Review.objects.filter(
-        user=User.objects.get(username="CoursePicker"),
-    ).exclude(
-        sentiment_labeler=models.Review.MANUAL_SENTIMENT_LABELER,
-    )
-    count = unlabeled_reviews.count()
-    random_index = randint(0, count - 1)
-    review = unlabeled_reviews[random_index]
-    form = ManualSentimentForm(initial={"review_id": review.id})
+
+    if labeling.needs_refill() and labeling.claim_refill():
+        tasks.refill_labeling_queue.delay()
+
+    review = None
+    for _ in range(labeling.MAX_SKIPPED):
+        review_id = labeling.next_review_id()
+        if review_id is None:
+            break
+        review = (
+            labeling.unlabeled_reviews().select_related("course").filter(id=review_id)
+        ).first()
+        if review is not None:
+            break
+        # Labeled or deleted since the queue was filled.
+        labeling.release(review_id)
+
+    form = ManualSentimentForm(initial={"review_id": review.id}) if review else None
     return render(
         request,
         "sentiment_labeler.html",
         {
-            "count": count,
-            "labeled_count": models.Review.objects.filter(
-                sentiment_labeler=models.Review.MANUAL_SENTIMENT_LABELER
-            ).count(),
             "form": form,
             "review": review,
+            **labeling.progress(request.user.id),
         },
     )
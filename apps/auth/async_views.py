@@ -0,0 +1,299 @@
+"""
+Native async versions of the auth endpoints that wait on external services.
+
+`auth_initiate_api`, `verify_callback_api` and `auth_login_api` spend most of
+their time waiting on Cloudflare Turnstile or the WJ questionnaire API. The
+sync views in `apps.auth.views` hold a worker thread for that whole round
+trip. Under ASGI these views await it on the server's event loop instead,
+reusing the pooled clients of `lib.http_client` and one asyncio Redis client
+per process (`utils.get_async_redis`).
+
+They share the auth state store (`apps.auth.state`) with the sync views and
+return the same payloads, so either implementation can serve any step of a
+flow. Which one is routed is controlled by the `AUTH.ASYNC_VIEWS` setting.
+Like the DRF views (`SessionAuthentication`), they check CSRF only for
+requests from an authenticated session: the anonymous first steps of a flow
+come before the client has a `csrftoken` cookie.
+"""
+
+import functools
+import json
+import logging
+import secrets
+import time
+
+import dateutil.parser
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import aauthenticate, alogin
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt, ensure_csrf_cookie
+from django.views.decorators.http import require_POST
+from rest_framework.authentication import CSRFCheck
+
+from apps.auth import state, utils
+from apps.auth.state import AsyncAuthStateStore
+from apps.web.models import Student
+from lib.rate_limit import rate_limit, turnstile_ip
+
+logger = logging.getLogger(__name__)
+
+
+AUTH_SETTINGS = settings.AUTH
+OTP_TIMEOUT = AUTH_SETTINGS["OTP_TIMEOUT"]
+TEMP_TOKEN_TIMEOUT = AUTH_SETTINGS["TEMP_TOKEN_TIMEOUT"]
+ACTION_LIST = AUTH_SETTINGS["ACTION_LIST"]
+TOKEN_RATE_LIMIT = AUTH_SETTINGS["TOKEN_RATE_LIMIT"]
+TOKEN_RATE_LIMIT_TIME = AUTH_SETTINGS["TOKEN_RATE_LIMIT_TIME"]
+
+
+def _request_data(request):
+    """JSON or form body, like DRF's `request.data`; None if malformed."""
+    if request.content_type == "application/json":
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    return request.POST
+
+
+def _error(message, status):
+    return JsonResponse({"error": message}, status=status)
+
+
+def _outcome_error(outcome):
+    return _error(*state.OUTCOME_ERRORS[outcome])
+
+
+def _as_json_response(response):
+    """Convert an error `Response` returned by `apps.auth.utils`."""
+    return JsonResponse(response.data, status=response.status_code)
+
+
+def session_csrf(view):
+    """
+    Enforce CSRF the way DRF's `SessionAuthentication` does: only for
+    requests from an active, authenticated session.
+    """
+
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await request.auser()
+        if user.is_authenticated and user.is_active:
+            check = CSRFCheck(lambda request: None)
+            check.process_request(request)
+            reason = check.process_view(request, None, (), {})
+            if reason:
+                return JsonResponse({"detail": f"CSRF Failed: {reason}"}, status=403)
+        return await view(request, *args, **kwargs)
+
+    return csrf_exempt(wrapper)
+
+
+@session_csrf
+@require_POST
+async def auth_initiate_api(request):
+    """Step 1: Authentication Initiation (/api/auth/init)
+
+    Async counterpart of `apps.auth.views.auth_initiate_api`.
+    """
+    data = _request_data(request)
+    if data is None:
+        return _error("Malformed request body", 400)
+    action = data.get("action")
+    turnstile_token = data.get("turnstile_token")
+
+    if not action or not turnstile_token:
+        logger.warning("Missing action or turnstile_token in auth_initiate_api")
+        return _error("Missing action or turnstile_token", 400)
+
+    if action not in ACTION_LIST:
+        logger.warning("Invalid action '%s' in auth_initiate_api", action)
+        return _error("Invalid action", 400)
+
+    success, error_response = await utils.verify_turnstile_token(
+        turnstile_token, turnstile_ip(request)
+    )
+    if not success:
+        logger.warning(
+            "verify_turnstile_token failed in auth_initiate_api:%s",
+            error_response.data,
+        )
+        return _as_json_response(error_response)
+
+    details = utils.get_survey_details(action)
+    if not details:
+        logger.error("Invalid action '%s' when fetching survey details", action)
+        return _error("Invalid action", 400)
+    survey_url = details.get("url")
+    if not survey_url:
+        logger.error("Survey URL missing for %s", action)
+        return _error("Something went wrong when fetching the survey URL", 500)
+
+    otp = "".join([str(secrets.randbelow(10)) for _ in range(8)])
+    temp_token = secrets.token_urlsafe(32)
+    await AsyncAuthStateStore(utils.get_async_redis()).initiate(
+        otp, temp_token, action, previous_temp_token=request.COOKIES.get("temp_token")
+    )
+
+    logger.info("Created auth intent for action %s with OTP and temp_token", action)
+
+    response = JsonResponse({"otp": otp, "redirect_url": survey_url}, status=200)
+    response.set_cookie(
+        "temp_token",
+        temp_token,
+        max_age=TEMP_TOKEN_TIMEOUT,
+        httponly=True,
+        secure=getattr(settings, "SECURE_COOKIES", True),
+        samesite="Lax",
+    )
+    return response
+
+
+@ensure_csrf_cookie
+@session_csrf
+@require_POST
+async def verify_callback_api(request):
+    """Callback Verification (/api/auth/verify)
+
+    Async counterpart of `apps.auth.views.verify_callback_api`.
+    """
+    data = _request_data(request)
+    if data is None:
+        return _error("Malformed request body", 400)
+    account = data.get("account")
+    answer_id = data.get("answer_id")
+    action = data.get("action")
+    logger.info("verify_callback_api called for account=%s, action=%s", account, action)
+
+    if not account or not answer_id or not action:
+        logger.warning("Missing account, answer_id, or action in verify_callback_api")
+        return _error("Missing account, answer_id, or action", 400)
+
+    if action not in ACTION_LIST:
+        logger.warning("Invalid action '%s' in verify_callback_api", action)
+        return _error("Invalid action", 400)
+
+    temp_token = request.COOKIES.get("temp_token")
+    if not temp_token:
+        logger.warning("No temp_token found in verify_callback_api")
+        return _error("No temp_token found", 401)
+
+    store = AsyncAuthStateStore(utils.get_async_redis())
+
+    outcome = await store.begin_verification(temp_token, action)
+    if outcome != state.OK:
+        logger.warning("Verification rejected in verify_callback_api: %s", outcome)
+        return _outcome_error(outcome)
+
+    latest_answer, error_response = await utils.get_latest_answer(
+        action=action, account=account
+    )
+    if error_response:
+        return _as_json_response(error_response)
+
+    if latest_answer is None:
+        logger.warning("No questionnaire submission found in verify_callback_api")
+        return _error("No questionnaire submission found", 404)
+
+    if str(latest_answer.get("id")) != str(answer_id):
+        logger.warning("Answer ID mismatch in verify_callback_api")
+        return _error("Answer ID mismatch", 403)
+
+    submitted_at_str = latest_answer.get("submitted_at")
+    if submitted_at_str is None:
+        return _error("Missing submission timestamp", 400)
+    try:
+        submitted_at = dateutil.parser.parse(submitted_at_str).timestamp()
+    except (ValueError, TypeError):
+        logger.error("Error parsing submission timestamp")
+        return _error("Invalid submission timestamp", 401)
+
+    outcome = await store.consume_otp(
+        latest_answer.get("otp"), temp_token, submitted_at, account
+    )
+    if outcome != state.OK:
+        logger.warning("OTP rejected in verify_callback_api: %s", outcome)
+        return _outcome_error(outcome)
+    expires_at = int(time.time() + TEMP_TOKEN_TIMEOUT)
+
+    logger.info(
+        "Successfully verified temp_token for user %s with action %s",
+        account,
+        action,
+    )
+
+    is_logged_in = False
+    if action == "login":
+        user, error_response = await sync_to_async(utils.create_user_session)(
+            request, account
+        )
+        if user is None:
+            if error_response:
+                logger.error(
+                    "Failed to create session for login: %s",
+                    getattr(error_response, "data", {}).get("error", "Unknown error"),
+                )
+                return _as_json_response(error_response)
+            logger.error("Failed to create user session in verify_callback_api")
+            return _error("Failed to create user session", 500)
+        if not user.is_active:
+            logger.warning("Inactive user attempted OAuth login: %s", account)
+            return _error("User account is inactive", 403)
+        try:
+            await alogin(request, user)
+            is_logged_in = True
+            await store.finish(temp_token)
+        except Exception:
+            logger.exception(
+                "Error during login session creation or cleanup for user %s", account
+            )
+            return _error("Failed to finalize login process", 500)
+
+    response = JsonResponse(
+        {"action": action, "expires_at": expires_at, "is_logged_in": is_logged_in},
+        status=200,
+    )
+    if is_logged_in:
+        response.delete_cookie("temp_token")
+    return response
+
+
+@session_csrf
+@require_POST
+@rate_limit("auth_login")
+async def auth_login_api(request):
+    """Password login (/api/auth/login)
+
+    Async counterpart of `apps.auth.views.auth_login_api`.
+    """
+    data = _request_data(request)
+    if data is None:
+        return _error("Malformed request body", 400)
+    account = data.get("account", "").strip()
+    password = data.get("password", "")
+    turnstile_token = data.get("turnstile_token", "")
+
+    if not account or not password or not turnstile_token:
+        logger.warning(
+            "Account, password, and Turnstile token are missing in auth_login_api"
+        )
+        return _error("Account, password, and Turnstile token are missing", 400)
+
+    success, error_response = await utils.verify_turnstile_token(
+        turnstile_token, turnstile_ip(request)
+    )
+    if not success:
+        if error_response:
+            return _as_json_response(error_response)
+        return _error("Turnstile verification failed", 502)
+
+    user = await aauthenticate(request, username=account, password=password)
+    if user is None or not user.is_active:
+        return _error("Invalid account or password", 401)
+
+    await alogin(request, user)
+    await Student.objects.aget_or_create(user=user)
+
+    return JsonResponse({"message": "Login successfully"}, status=200)
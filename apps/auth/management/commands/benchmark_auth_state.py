@@ -0,0 +1,147 @@
+import json
+import secrets
+import time
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand, CommandError
+from django_redis import get_redis_connection
+from redis.connection import AbstractConnection
+
+from apps.auth import state
+from apps.auth.state import AuthStateStore
+
+FLOWS = ("login", "signup")
+
+
+@contextmanager
+def count_round_trips():
+    """Count the requests written to any Redis connection (one per round trip)."""
+    counter = {"round_trips": 0}
+    send = AbstractConnection.send_packed_command
+
+    def counting_send(self, *args, **kwargs):
+        counter["round_trips"] += 1
+        return send(self, *args, **kwargs)
+
+    AbstractConnection.send_packed_command = counting_send
+    try:
+        yield counter
+    finally:
+        AbstractConnection.send_packed_command = send
+
+
+def _new_tokens():
+    otp = "".join(str(secrets.randbelow(10)) for _ in range(8))
+    return otp, secrets.token_urlsafe(32)
+
+
+def legacy_flow(r, action, previous_temp_token):
+    """The command sequence the auth views issued before the state store."""
+    otp, temp_token = _new_tokens()
+    token_hash = state.token_hash(temp_token)
+    state_key = f"temp_token_state:{token_hash}"
+    attempts_key = f"verify_attempts:{token_hash}"
+
+    # auth_initiate_api
+    previous_key = state.state_key(previous_temp_token)
+    if r.get(previous_key):
+        r.delete(previous_key)
+    initiated_at = time.time()
+    r.setex(
+        f"otp:{otp}",
+        state.OTP_TIMEOUT,
+        json.dumps({"temp_token": temp_token, "initiated_at": initiated_at}),
+    )
+    r.setex(
+        state_key,
+        state.TEMP_TOKEN_TIMEOUT,
+        json.dumps({"status": "pending", "action": action}),
+    )
+
+    # verify_callback_api
+    state_data = json.loads(r.get(state_key))
+    if r.incr(attempts_key) == 1:
+        r.expire(attempts_key, state.TOKEN_RATE_LIMIT_TIME)
+    json.loads(r.getdel(f"otp:{otp}"))
+    state_data.update({"status": "verified", "account": "bench"})
+    r.setex(state_key, state.TEMP_TOKEN_TIMEOUT, json.dumps(state_data))
+    r.delete(attempts_key)
+
+    # login finishes in verify_callback_api; signup reads the state back
+    if action == "signup":
+        json.loads(r.get(state_key))
+    r.delete(state_key)
+    return temp_token
+
+
+def store_flow(store, action, previous_temp_token):
+    otp, temp_token = _new_tokens()
+    store.initiate(otp, temp_token, action, previous_temp_token=previous_temp_token)
+    assert store.begin_verification(temp_token, action) == state.OK
+    assert store.consume_otp(otp, temp_token, time.time(), "bench") == state.OK
+    if action == "signup":
+        store.get_state(temp_token)
+    store.finish(temp_token)
+    return temp_token
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the Redis side of the login and signup OTP flows: the "
+        "auth state store against the previous one-command-per-call sequence."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=1000)
+        parser.add_argument(
+            "--fakeredis",
+            action="store_true",
+            help="Run against an in-process fakeredis server instead of REDIS.URL.",
+        )
+        parser.add_argument("--json", action="store_true", help="Print JSON results.")
+
+    def handle(self, *args, **options):
+        if options["fakeredis"]:
+            try:
+                import fakeredis
+            except ImportError:
+                raise CommandError("--fakeredis needs the fakeredis package")
+            r = fakeredis.FakeRedis()
+        else:
+            r = get_redis_connection("default")
+        store = AuthStateStore(r)
+        iterations = options["iterations"]
+
+        results = []
+        for action in FLOWS:
+            for name, run_flow in (
+                ("legacy", lambda prev: legacy_flow(r, action, prev)),
+                ("store", lambda prev: store_flow(store, action, prev)),
+            ):
+                previous = run_flow(secrets.token_urlsafe(32))  # warm up
+                with count_round_trips() as counter:
+                    started = time.perf_counter()
+                    for _ in range(iterations):
+                        previous = run_flow(previous)
+                    elapsed = time.perf_counter() - started
+                results.append(
+                    {
+                        "flow": action,
+                        "implementation": name,
+                        "iterations": iterations,
+                        "round_trips_per_flow": counter["round_trips"] / iterations,
+                        "mean_ms": round(elapsed / iterations * 1000, 3),
+                    }
+                )
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(
+            f"{'flow':<8}{'implementation':<16}{'round trips':>12}{'mean ms':>10}"
+        )
+        for row in results:
+            self.stdout.write(
+                f"{row['flow']:<8}{row['implementation']:<16}"
+                f"{row['round_trips_per_flow']:>12.1f}{row['mean_ms']:>10.3f}"
+            )
@@ -0,0 +1,114 @@
+import json
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.utils.module_loading import import_string
+
+# (name, SESSION_ENGINE, SESSION_SAVE_EVERY_REQUEST)
+CONFIGURATIONS = (
+    ("save_every_request", "django.contrib.sessions.backends.cache", True),
+    ("lazy_touch", "apps.auth.sessions.cache", False),
+    ("lazy_touch_cached_db", "apps.auth.sessions.cached_db", False),
+)
+
+CACHE_WRITES = ("set", "add", "delete", "touch", "set_many", "delete_many")
+
+
+@contextmanager
+def count_writes():
+    """Count writes to the session cache and to the database."""
+    counter = {"cache": 0, "db": 0}
+    cache = caches[settings.SESSION_CACHE_ALIAS]
+
+    def counting(method):
+        def wrapper(*args, **kwargs):
+            counter["cache"] += 1
+            return method(*args, **kwargs)
+
+        return wrapper
+
+    def count_db_writes(execute, sql, params, many, context):
+        if sql.lstrip().split(" ", 1)[0].upper() in ("INSERT", "UPDATE", "DELETE"):
+            counter["db"] += 1
+        return execute(sql, params, many, context)
+
+    for name in CACHE_WRITES:
+        setattr(cache, name, counting(getattr(cache, name)))
+    try:
+        with connection.execute_wrapper(count_db_writes):
+            yield counter
+    finally:
+        for name in CACHE_WRITES:
+            delattr(cache, name)
+
+
+def _view(request):
+    # What AuthenticationMiddleware does on every request.
+    request.session.get(SESSION_KEY)
+    return HttpResponse()
+
+
+class Command(BaseCommand):
+    help = (
+        "Count the session writes per request of authenticated and anonymous "
+        "reads, saving every request vs. the lazy-touch session stores."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=100)
+        parser.add_argument("--json", action="store_true", help="Print JSON results.")
+
+    def handle(self, *args, **options):
+        requests = options["requests"]
+        factory = RequestFactory()
+        results = []
+        for name, engine, save_every_request in CONFIGURATIONS:
+            with override_settings(
+                SESSION_ENGINE=engine, SESSION_SAVE_EVERY_REQUEST=save_every_request
+            ):
+                store = import_string(f"{engine}.SessionStore")()
+                store[SESSION_KEY] = "0"
+                store.create()
+                middleware = SessionMiddleware(_view)
+                for visitor, cookies in (
+                    (
+                        "authenticated",
+                        {settings.SESSION_COOKIE_NAME: store.session_key},
+                    ),
+                    ("anonymous", {}),
+                ):
+                    with count_writes() as counter:
+                        for _ in range(requests):
+                            request = factory.get("/api/courses/")
+                            request.COOKIES.update(cookies)
+                            middleware(request)
+                    results.append(
+                        {
+                            "configuration": name,
+                            "visitor": visitor,
+                            "requests": requests,
+                            "cache_writes_per_request": counter["cache"] / requests,
+                            "db_writes_per_request": counter["db"] / requests,
+                        }
+                    )
+                store.delete()
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(
+            f"{'configuration':<24}{'visitor':<16}{'cache writes':>14}{'db writes':>11}"
+        )
+        for row in results:
+            self.stdout.write(
+                f"{row['configuration']:<24}{row['visitor']:<16}"
+                f"{row['cache_writes_per_request']:>14.2f}"
+                f"{row['db_writes_per_request']:>11.2f}"
+            )
@@ -0,0 +1,36 @@
+"""
+Session stores that refresh their expiry lazily.
+
+Django's stores only write a session back when it was modified, unless
+`SESSION_SAVE_EVERY_REQUEST` is on - which is what keeps a sliding 30-day
+session alive, at the cost of one Redis write per authenticated request.
+These stores record when a session was last saved and mark it modified
+once that is more than `SESSION_TOUCH_INTERVAL` seconds ago, so an idle
+session still slides forward while an active one is written at most once
+per interval. The save also re-sends the cookie, keeping its expiry in step.
+
+Empty sessions (anonymous visitors) are never saved by the session
+middleware, so anonymous reads cost no writes at all.
+"""
+
+import time
+
+from django.conf import settings
+
+TOUCHED_AT_KEY = "_touched_at"
+
+
+class LazyTouchSessionMixin:
+    def load(self):
+        data = super().load()
+        touched_at = data.get(TOUCHED_AT_KEY)
+        if data and (
+            touched_at is None
+            or time.time() - touched_at >= settings.SESSION_TOUCH_INTERVAL
+        ):
+            self.modified = True
+        return data
+
+    def save(self, must_create=False):
+        self._get_session(no_load=must_create)[TOUCHED_AT_KEY] = int(time.time())
+        super().save(must_create=must_create)
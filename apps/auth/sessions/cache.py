@@ -0,0 +1,7 @@
+from django.contrib.sessions.backends import cache
+
+from apps.auth.sessions.base import LazyTouchSessionMixin
+
+
+class SessionStore(LazyTouchSessionMixin, cache.SessionStore):
+    """Sessions in Redis only; a Redis flush logs everyone out."""
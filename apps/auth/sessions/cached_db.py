@@ -0,0 +1,10 @@
+from django.contrib.sessions.backends import cached_db
+
+from apps.auth.sessions.base import LazyTouchSessionMixin
+
+
+class SessionStore(LazyTouchSessionMixin, cached_db.SessionStore):
+    """
+    Sessions read from Redis and written through to the database, so they
+    survive a Redis flush. Expired rows are removed by `manage.py clearsessions`.
+    """
@@ -0,0 +1,208 @@
+"""
+Redis-backed state of the OTP authentication flow.
+
+Each logical step of the flow is one Redis round trip: initiation is a
+single MULTI pipeline, and the checks of the verification step run as
+server-side Lua scripts, so checking and consuming a temp_token state or an
+OTP is atomic - two concurrent callbacks can never both consume the same
+OTP. States and OTP records are Redis hashes, so the scripts can inspect
+them without decoding JSON.
+
+`AuthStateStore` wraps the sync django-redis connection used by the WSGI
+views; `AsyncAuthStateStore` wraps the asyncio client of the async views.
+Both use the same keys and scripts, so a flow can hop between them.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+
+AUTH_SETTINGS = settings.AUTH
+OTP_TIMEOUT = AUTH_SETTINGS["OTP_TIMEOUT"]
+TEMP_TOKEN_TIMEOUT = AUTH_SETTINGS["TEMP_TOKEN_TIMEOUT"]
+TOKEN_RATE_LIMIT = AUTH_SETTINGS["TOKEN_RATE_LIMIT"]
+TOKEN_RATE_LIMIT_TIME = AUTH_SETTINGS["TOKEN_RATE_LIMIT_TIME"]
+
+# Outcomes of the verification scripts.
+OK = "ok"
+STATE_MISSING = "state_missing"
+STATE_NOT_PENDING = "state_not_pending"
+ACTION_MISMATCH = "action_mismatch"
+TOO_MANY_ATTEMPTS = "too_many_attempts"
+OTP_INVALID = "otp_invalid"
+TEMP_TOKEN_MISMATCH = "temp_token_mismatch"
+OUTSIDE_WINDOW = "outside_window"
+
+# Error payload and status for every failed outcome.
+OUTCOME_ERRORS = {
+    STATE_MISSING: ("Temp token state not found or expired", 401),
+    STATE_NOT_PENDING: ("Invalid temp token state", 401),
+    ACTION_MISMATCH: ("Action mismatch", 403),
+    TOO_MANY_ATTEMPTS: ("Too many verification attempts", 429),
+    OTP_INVALID: ("Invalid or expired OTP", 401),
+    TEMP_TOKEN_MISMATCH: ("Invalid temp_token", 401),
+    OUTSIDE_WINDOW: ("Submission timestamp outside validity window", 401),
+}
+
+# KEYS: state, attempts. ARGV: action, attempt limit, attempt window.
+BEGIN_VERIFICATION_SCRIPT = """
+local state = redis.call('HMGET', KEYS[1], 'status', 'action')
+if not state[1] then
+    return 'state_missing'
+end
+if state[1] ~= 'pending' then
+    return 'state_not_pending'
+end
+if state[2] ~= ARGV[1] then
+    return 'action_mismatch'
+end
+local attempts = redis.call('INCR', KEYS[2])
+if attempts == 1 then
+    redis.call('EXPIRE', KEYS[2], ARGV[3])
+end
+if attempts > tonumber(ARGV[2]) then
+    return 'too_many_attempts'
+end
+return 'ok'
+"""
+
+# KEYS: otp, state, attempts.
+# ARGV: temp_token hash, submitted_at, OTP window, account, state TTL.
+# The OTP is consumed whatever the outcome, so it can never be replayed.
+CONSUME_OTP_SCRIPT = """
+local otp = redis.call('HMGET', KEYS[1], 'temp_token', 'initiated_at')
+redis.call('DEL', KEYS[1])
+if not otp[1] then
+    return 'otp_invalid'
+end
+if otp[1] ~= ARGV[1] then
+    return 'temp_token_mismatch'
+end
+local initiated_at = tonumber(otp[2])
+local submitted_at = tonumber(ARGV[2])
+if submitted_at < initiated_at or submitted_at - initiated_at > tonumber(ARGV[3]) then
+    return 'outside_window'
+end
+if redis.call('EXISTS', KEYS[2]) == 0 then
+    return 'state_missing'
+end
+redis.call('HSET', KEYS[2], 'status', 'verified', 'account', ARGV[4])
+redis.call('EXPIRE', KEYS[2], ARGV[5])
+redis.call('DEL', KEYS[3])
+return 'ok'
+"""
+
+
+def token_hash(temp_token):
+    return hashlib.sha256(temp_token.encode()).hexdigest()
+
+
+def state_key(temp_token):
+    return f"temp_token_state:{token_hash(temp_token)}"
+
+
+def attempts_key(temp_token):
+    return f"verify_attempts:{token_hash(temp_token)}"
+
+
+def otp_key(otp):
+    return f"otp:{otp}"
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _decode_state(raw):
+    return {_decode(key): _decode(value) for key, value in raw.items()}
+
+
+class _BaseStore:
+    def __init__(self, redis):
+        self.redis = redis
+        self._begin_verification = redis.register_script(BEGIN_VERIFICATION_SCRIPT)
+        self._consume_otp = redis.register_script(CONSUME_OTP_SCRIPT)
+
+    def _queue_initiation(self, pipe, otp, temp_token, action, previous_temp_token):
+        if previous_temp_token:
+            pipe.delete(state_key(previous_temp_token))
+        pipe.hset(
+            otp_key(otp),
+            mapping={"temp_token": token_hash(temp_token), "initiated_at": time.time()},
+        )
+        pipe.expire(otp_key(otp), OTP_TIMEOUT)
+        pipe.hset(
+            state_key(temp_token), mapping={"status": "pending", "action": action}
+        )
+        pipe.expire(state_key(temp_token), TEMP_TOKEN_TIMEOUT)
+
+    @staticmethod
+    def _verification_args(temp_token, action):
+        return (
+            [state_key(temp_token), attempts_key(temp_token)],
+            [action, TOKEN_RATE_LIMIT, TOKEN_RATE_LIMIT_TIME],
+        )
+
+    @staticmethod
+    def _consume_args(otp, temp_token, submitted_at, account):
+        return (
+            [otp_key(otp), state_key(temp_token), attempts_key(temp_token)],
+            [
+                token_hash(temp_token),
+                submitted_at,
+                OTP_TIMEOUT,
+                account,
+                TEMP_TOKEN_TIMEOUT,
+            ],
+        )
+
+
+class AuthStateStore(_BaseStore):
+    """Auth flow state on a sync Redis client."""
+
+    def initiate(self, otp, temp_token, action, previous_temp_token=None):
+        """Store a new OTP and pending state, dropping the client's old state."""
+        with self.redis.pipeline(transaction=True) as pipe:
+            self._queue_initiation(pipe, otp, temp_token, action, previous_temp_token)
+            pipe.execute()
+
+    def begin_verification(self, temp_token, action):
+        """Check the state is pending for `action` and count the attempt."""
+        keys, args = self._verification_args(temp_token, action)
+        return _decode(self._begin_verification(keys=keys, args=args))
+
+    def consume_otp(self, otp, temp_token, submitted_at, account):
+        """Consume the OTP and mark the state verified for `account`."""
+        keys, args = self._consume_args(otp, temp_token, submitted_at, account)
+        return _decode(self._consume_otp(keys=keys, args=args))
+
+    def get_state(self, temp_token):
+        """The state as a dict ({} if missing or expired)."""
+        return _decode_state(self.redis.hgetall(state_key(temp_token)))
+
+    def finish(self, temp_token):
+        self.redis.delete(state_key(temp_token))
+
+
+class AsyncAuthStateStore(_BaseStore):
+    """Auth flow state on an asyncio Redis client."""
+
+    async def initiate(self, otp, temp_token, action, previous_temp_token=None):
+        async with self.redis.pipeline(transaction=True) as pipe:
+            self._queue_initiation(pipe, otp, temp_token, action, previous_temp_token)
+            await pipe.execute()
+
+    async def begin_verification(self, temp_token, action):
+        keys, args = self._verification_args(temp_token, action)
+        return _decode(await self._begin_verification(keys=keys, args=args))
+
+    async def consume_otp(self, otp, temp_token, submitted_at, account):
+        keys, args = self._consume_args(otp, temp_token, submitted_at, account)
+        return _decode(await self._consume_otp(keys=keys, args=args))
+
+    async def get_state(self, temp_token):
+        return _decode_state(await self.redis.hgetall(state_key(temp_token)))
+
+    async def finish(self, temp_token):
+        await self.redis.delete(state_key(temp_token))
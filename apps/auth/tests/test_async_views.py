@@ -0,0 +1,179 @@
+import datetime
+import json
+from unittest import mock
+
+import fakeredis
+import httpx
+from django.contrib.auth.models import User
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import re_path
+
+from apps.auth import async_views, utils
+from apps.web.models import Student
+from lib import http_client
+
+urlpatterns = [
+    re_path(r"^init/$", async_views.auth_initiate_api),
+    re_path(r"^verify/$", async_views.verify_callback_api),
+    re_path(r"^login/$", async_views.auth_login_api),
+]
+
+QUESTION_ID = 10000001
+LOGIN_SURVEY = {
+    "URL": "https://wj.example/q/login",
+    "API_KEY": "key",
+    "QUESTIONID": QUESTION_ID,
+}
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncAuthViewsTestCase(TestCase):
+    def setUp(self):
+        self.turnstile_ok = True
+        self.answer = None
+        self.http_client = httpx.AsyncClient(transport=httpx.MockTransport(self._serve))
+        self.redis = fakeredis.aioredis.FakeRedis()
+        for patcher in (
+            mock.patch.object(
+                http_client, "get_async_client", lambda host: self.http_client
+            ),
+            mock.patch.object(utils, "get_async_redis", lambda: self.redis),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.dict(utils.QUEST_SETTINGS, {"LOGIN": LOGIN_SURVEY})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _serve(self, request):
+        if request.url.host == "challenges.cloudflare.com":
+            return httpx.Response(200, json={"success": self.turnstile_ok})
+        rows = [self.answer] if self.answer else []
+        return httpx.Response(200, json={"success": True, "data": {"rows": rows}})
+
+    async def _post(self, path, data):
+        return await self.async_client.post(
+            path, json.dumps(data), content_type="application/json"
+        )
+
+    async def test_password_login(self):
+        user = await User.objects.acreate_user(
+            username="alice", password="correct horse battery"
+        )
+
+        response = await self._post(
+            "/login/",
+            {
+                "account": "alice",
+                "password": "correct horse battery",
+                "turnstile_token": "token",
+            },
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            str(user.pk), await self.async_client.session.aget("_auth_user_id")
+        )
+        self.assertTrue(await Student.objects.filter(user=user).aexists())
+
+    async def test_failed_turnstile_is_rejected(self):
+        self.turnstile_ok = False
+
+        response = await self._post(
+            "/login/",
+            {"account": "alice", "password": "secret", "turnstile_token": "token"},
+        )
+
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json(), {"error": "Turnstile verification failed"})
+
+    async def test_initiate_and_verify_login(self):
+        response = await self._post(
+            "/init/", {"action": "login", "turnstile_token": "token"}
+        )
+        self.assertEqual(response.status_code, 200)
+        otp = response.json()["otp"]
+        self.assertEqual(response.json()["redirect_url"], LOGIN_SURVEY["URL"])
+
+        self.answer = {
+            "id": 42,
+            "submitted_at": datetime.datetime.now(datetime.UTC).isoformat(),
+            "user": {"account": "bob"},
+            "answers": [{"question": {"id": QUESTION_ID}, "answer": otp}],
+        }
+        response = await self._post(
+            "/verify/", {"account": "bob", "answer_id": 42, "action": "login"}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["is_logged_in"])
+        self.assertIsNone(await self.redis.get(f"otp:{otp}"))
+        self.assertTrue(await Student.objects.filter(user__username="bob").aexists())
+
+    async def test_verify_rejects_mismatched_answer(self):
+        await self._post("/init/", {"action": "login", "turnstile_token": "token"})
+        self.answer = {
+            "id": 7,
+            "submitted_at": datetime.datetime.now(datetime.UTC).isoformat(),
+            "user": {"account": "bob"},
+            "answers": [{"question": {"id": QUESTION_ID}, "answer": "00000000"}],
+        }
+
+        response = await self._post(
+            "/verify/", {"account": "bob", "answer_id": 8, "action": "login"}
+        )
+
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json(), {"error": "Answer ID mismatch"})
+
+    def test_malformed_body_is_rejected(self):
+        response = self.client.post(
+            "/login/", "not json", content_type="application/json"
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+    async def test_anonymous_flow_passes_csrf_checks(self):
+        client = AsyncClient(enforce_csrf_checks=True)
+        await User.objects.acreate_user(username="alice", password="secret")
+
+        async def post(path, data, **headers):
+            return await client.post(
+                path, json.dumps(data), content_type="application/json", **headers
+            )
+
+        response = await post("/init/", {"action": "login", "turnstile_token": "t"})
+        self.assertEqual(response.status_code, 200)
+        self.answer = {
+            "id": 42,
+            "submitted_at": datetime.datetime.now(datetime.UTC).isoformat(),
+            "user": {"account": "bob"},
+            "answers": [
+                {"question": {"id": QUESTION_ID}, "answer": response.json()["otp"]}
+            ],
+        }
+        response = await post(
+            "/verify/", {"account": "bob", "answer_id": 42, "action": "login"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["is_logged_in"])
+
+        # The session is authenticated now, so CSRF is enforced.
+        login = {"account": "alice", "password": "secret", "turnstile_token": "t"}
+        self.assertEqual((await post("/login/", login)).status_code, 403)
+        token = client.cookies["csrftoken"].value
+        response = await post("/login/", login, headers={"X-CSRFToken": token})
+        self.assertEqual(response.status_code, 200)
+
+
+class SharedClientsTestCase(TestCase):
+    @override_settings(
+        CACHES={
+            "default": {
+                "BACKEND": "django_redis.cache.RedisCache",
+                "LOCATION": "redis://localhost:6379/0",
+            }
+        }
+    )
+    async def test_redis_client_is_reused_within_an_event_loop(self):
+        self.assertIs(utils.get_async_redis(), utils.get_async_redis())
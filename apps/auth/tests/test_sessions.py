@@ -0,0 +1,100 @@
+import io
+import json
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from apps.auth.sessions import base
+from apps.auth.sessions.cache import SessionStore as CacheSessionStore
+from apps.auth.sessions.cached_db import SessionStore as CachedDBSessionStore
+
+
+def _view(request):
+    request.session.get("_auth_user_id")
+    return HttpResponse()
+
+
+@override_settings(
+    SESSION_ENGINE="apps.auth.sessions.cache",
+    SESSION_SAVE_EVERY_REQUEST=False,
+    SESSION_TOUCH_INTERVAL=3600,
+)
+class LazyTouchSessionTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.middleware = SessionMiddleware(_view)
+        self.store = CacheSessionStore()
+        self.store["_auth_user_id"] = "1"
+        self.store.create()
+
+    def _get(self, cookies):
+        request = RequestFactory().get("/")
+        request.COOKIES.update(cookies)
+        return self.middleware(request)
+
+    def _authenticated_get(self):
+        return self._get({settings.SESSION_COOKIE_NAME: self.store.session_key})
+
+    def test_fresh_session_is_not_rewritten(self):
+        with mock.patch.object(CacheSessionStore, "save") as save:
+            response = self._authenticated_get()
+
+        save.assert_not_called()
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+
+    def test_session_is_touched_after_the_interval(self):
+        later = time.time() + 3601
+        with mock.patch.object(base.time, "time", return_value=later):
+            response = self._authenticated_get()
+
+        self.assertIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        touched_at = CacheSessionStore(self.store.session_key).load()[
+            base.TOUCHED_AT_KEY
+        ]
+        self.assertEqual(touched_at, int(later))
+
+    def test_anonymous_read_creates_no_session(self):
+        with mock.patch.object(CacheSessionStore, "save") as save:
+            response = self._get({})
+
+        save.assert_not_called()
+        self.assertFalse(response.cookies)
+
+
+class CachedDBSessionTestCase(TestCase):
+    def test_session_survives_a_cache_flush(self):
+        store = CachedDBSessionStore()
+        store["_auth_user_id"] = "1"
+        store.create()
+
+        cache.clear()
+
+        self.assertEqual(
+            CachedDBSessionStore(store.session_key).load()["_auth_user_id"], "1"
+        )
+
+
+class BenchmarkSessionsTestCase(TestCase):
+    def test_lazy_touch_skips_writes(self):
+        out = io.StringIO()
+
+        call_command("benchmark_sessions", requests=5, json=True, stdout=out)
+
+        rows = {
+            (row["configuration"], row["visitor"]): row
+            for row in json.loads(out.getvalue())
+        }
+        self.assertEqual(
+            rows["save_every_request", "authenticated"]["cache_writes_per_request"], 1
+        )
+        for configuration in ("lazy_touch", "lazy_touch_cached_db"):
+            for visitor in ("authenticated", "anonymous"):
+                row = rows[configuration, visitor]
+                self.assertEqual(row["cache_writes_per_request"], 0)
+                self.assertEqual(row["db_writes_per_request"], 0)
@@ -0,0 +1,124 @@
+import io
+import json
+import time
+
+import fakeredis
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from apps.auth import state
+from apps.auth.management.commands.benchmark_auth_state import count_round_trips
+from apps.auth.state import AuthStateStore
+
+
+class AuthStateStoreTestCase(SimpleTestCase):
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis()
+        self.store = AuthStateStore(self.redis)
+
+    def _initiate(self, otp="12345678", temp_token="temp", action="login", **kwargs):
+        self.store.initiate(otp, temp_token, action, **kwargs)
+        return otp, temp_token
+
+    def test_verified_flow(self):
+        otp, temp_token = self._initiate(action="signup")
+
+        self.assertEqual(self.store.begin_verification(temp_token, "signup"), state.OK)
+        self.assertEqual(
+            self.store.consume_otp(otp, temp_token, time.time(), "alice"), state.OK
+        )
+
+        self.assertEqual(
+            self.store.get_state(temp_token),
+            {"status": "verified", "action": "signup", "account": "alice"},
+        )
+        self.assertFalse(self.redis.exists(state.attempts_key(temp_token)))
+        self.store.finish(temp_token)
+        self.assertEqual(self.store.get_state(temp_token), {})
+
+    def test_otp_is_consumed_once(self):
+        otp, temp_token = self._initiate()
+        now = time.time()
+
+        self.assertEqual(self.store.consume_otp(otp, temp_token, now, "a"), state.OK)
+        self.assertEqual(
+            self.store.consume_otp(otp, temp_token, now, "a"), state.OTP_INVALID
+        )
+
+    def test_otp_of_another_temp_token_is_rejected_and_burned(self):
+        otp, _ = self._initiate()
+
+        self.assertEqual(
+            self.store.consume_otp(otp, "other", time.time(), "a"),
+            state.TEMP_TOKEN_MISMATCH,
+        )
+        self.assertFalse(self.redis.exists(state.otp_key(otp)))
+
+    def test_submission_outside_window(self):
+        otp, temp_token = self._initiate()
+
+        self.assertEqual(
+            self.store.consume_otp(
+                otp, temp_token, time.time() + state.OTP_TIMEOUT + 5, "a"
+            ),
+            state.OUTSIDE_WINDOW,
+        )
+
+    def test_action_mismatch(self):
+        _, temp_token = self._initiate(action="login")
+
+        self.assertEqual(
+            self.store.begin_verification(temp_token, "signup"), state.ACTION_MISMATCH
+        )
+
+    def test_attempts_are_rate_limited(self):
+        _, temp_token = self._initiate()
+
+        outcomes = [
+            self.store.begin_verification(temp_token, "login")
+            for _ in range(state.TOKEN_RATE_LIMIT + 1)
+        ]
+
+        self.assertEqual(outcomes[:-1], [state.OK] * state.TOKEN_RATE_LIMIT)
+        self.assertEqual(outcomes[-1], state.TOO_MANY_ATTEMPTS)
+        self.assertGreater(self.redis.ttl(state.attempts_key(temp_token)), 0)
+
+    def test_initiate_drops_previous_state(self):
+        _, old_token = self._initiate(otp="11111111", temp_token="old")
+        self._initiate(otp="22222222", temp_token="new", previous_temp_token=old_token)
+
+        self.assertEqual(
+            self.store.begin_verification(old_token, "login"), state.STATE_MISSING
+        )
+        self.assertEqual(self.store.get_state("new")["status"], "pending")
+
+    def test_each_step_is_one_round_trip(self):
+        otp, temp_token = self._initiate()  # warm up: connection and scripts
+        self.store.begin_verification(temp_token, "login")
+        self.store.consume_otp(otp, temp_token, time.time(), "a")
+
+        with count_round_trips() as counter:
+            otp, temp_token = self._initiate(otp="87654321", temp_token="second")
+            self.store.begin_verification(temp_token, "login")
+            self.store.consume_otp(otp, temp_token, time.time(), "a")
+
+        self.assertEqual(counter["round_trips"], 3)
+
+
+class BenchmarkAuthStateTestCase(SimpleTestCase):
+    def test_store_needs_fewer_round_trips(self):
+        out = io.StringIO()
+
+        call_command(
+            "benchmark_auth_state", iterations=5, fakeredis=True, json=True, stdout=out
+        )
+
+        rows = {
+            (row["flow"], row["implementation"]): row
+            for row in json.loads(out.getvalue())
+        }
+        for flow in ("login", "signup"):
+            self.assertLess(
+                rows[flow, "store"]["round_trips_per_flow"],
+                rows[flow, "legacy"]["round_trips_per_flow"],
+            )
@@ -1,16 +1,24 @@
+from django.conf import settings
 from django.urls import re_path
 
+from apps.auth import async_views
 from apps.auth import views as auth_views
 
+# Under ASGI, the endpoints that wait on Turnstile / the questionnaire API are
+# served by their native async versions.
+external_views = async_views if settings.AUTH["ASYNC_VIEWS"] else auth_views
+
 urlpatterns = [
-    re_path(r"^init/$", auth_views.auth_initiate_api, name="auth_initiate_api"),
-    re_path(r"^verify/$", auth_views.verify_callback_api, name="verify_callback_api"),
+    re_path(r"^init/$", external_views.auth_initiate_api, name="auth_initiate_api"),
+    re_path(
+        r"^verify/$", external_views.verify_callback_api, name="verify_callback_api"
+    ),
     re_path(
         r"^password/$",
         auth_views.auth_reset_password_api,
         name="auth_reset_password_api",
     ),
     re_path(r"^signup/$", auth_views.auth_signup_api, name="auth_signup_api"),
-    re_path(r"^login/$", auth_views.auth_login_api, name="auth_login_api"),
+    re_path(r"^login/$", external_views.auth_login_api, name="auth_login_api"),
     re_path(r"^logout/?$", auth_views.auth_logout_api, name="auth_logout_api"),
 ]
@@ -1,9 +1,12 @@
+import asyncio
 import json
 import logging
 import re
+import weakref
 from typing import Any
 
 import httpx
+import redis.asyncio
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AbstractUser
@@ -13,6 +16,7 @@ from rest_framework.authentication import SessionAuthentication
 from rest_framework.response import Response
 
 from apps.web.models import Student
+from lib import http_client
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +29,12 @@ EMAIL_DOMAIN_NAME = AUTH_SETTINGS["EMAIL_DOMAIN_NAME"]
 QUEST_SETTINGS = settings.QUEST
 QUEST_BASE_URL = QUEST_SETTINGS["BASE_URL"]
 
+TURNSTILE_VERIFY_URL = "https://challenges.cloudflare.com/turnstile/v0/siteverify"
+
+# Long-lived Redis clients for the async views, one per event loop: under
+# ASGI that is one pooled client per process, reused by every request.
+_async_redis_clients = weakref.WeakKeyDictionary()
+
 
 class CSRFCheckSessionAuthentication(SessionAuthentication):
     def authenticate(self, request):
@@ -59,21 +69,31 @@ def get_survey_details(action: str) -> dict[str, Any] | None:
     }
 
 
+def get_async_redis() -> redis.asyncio.Redis:
+    """Shared asyncio Redis client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_redis_clients.get(loop)
+    if client is None:
+        cache_settings = settings.CACHES["default"]
+        pool_kwargs = cache_settings.get("OPTIONS", {}).get(
+            "CONNECTION_POOL_KWARGS", {}
+        )
+        client = redis.asyncio.Redis.from_url(cache_settings["LOCATION"], **pool_kwargs)
+        _async_redis_clients[loop] = client
+    return client
+
+
 async def verify_turnstile_token(
     turnstile_token, client_ip
 ) -> tuple[bool, Response | None]:
-    """Helper function to verify Turnstile token with Cloudflare's API"""
+    """Helper function to verify Turnstile token with Cloudflare's API.
+    `client_ip` is optional; None leaves `remoteip` out of the check."""
 
+    data = {"secret": settings.TURNSTILE_SECRET_KEY, "response": turnstile_token}
+    if client_ip:
+        data["remoteip"] = client_ip
     try:
-        async with httpx.AsyncClient(timeout=OTP_TIMEOUT) as client:
-            response = await client.post(
-                "https://challenges.cloudflare.com/turnstile/v0/siteverify",
-                data={
-                    "secret": settings.TURNSTILE_SECRET_KEY,
-                    "response": turnstile_token,
-                    "remoteip": client_ip,
-                },
-            )
+        response = await http_client.request("POST", TURNSTILE_VERIFY_URL, data=data)
         if not response.json().get("success"):
             logger.warning("Turnstile verification failed: %s", response.json())
             return False, Response(
@@ -133,13 +153,13 @@ async def get_latest_answer(
     full_url_path = f"{QUEST_BASE_URL}/{quest_api}/json"
 
     try:
-        async with httpx.AsyncClient(timeout=OTP_TIMEOUT) as client:
-            response = await client.get(
-                full_url_path,
-                params=final_query_params,
-            )
-            response.raise_for_status()  # Raise an exception for bad status codes
-            full_data = response.json()
+        response = await http_client.request(
+            "GET",
+            full_url_path,
+            params=final_query_params,
+        )
+        response.raise_for_status()  # Raise an exception for bad status codes
+        full_data = response.json()
     except httpx.TimeoutException:
         logger.error("Questionnaire API query timed out")
         return None, Response(
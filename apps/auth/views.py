@@ -1,6 +1,3 @@
-import asyncio
-import hashlib
-import json
 import logging
 import secrets
 import time
@@ -18,8 +15,11 @@ from rest_framework.decorators import (
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 
-from apps.auth import utils
+from apps.auth import state, utils
+from apps.auth.state import AuthStateStore
 from apps.web.models import Student
+from lib import http_client
+from lib.rate_limit import rate_limit, turnstile_ip
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +32,11 @@ TOKEN_RATE_LIMIT = AUTH_SETTINGS["TOKEN_RATE_LIMIT"]
 TOKEN_RATE_LIMIT_TIME = AUTH_SETTINGS["TOKEN_RATE_LIMIT_TIME"]
 
 
+def _outcome_error(outcome):
+    message, status = state.OUTCOME_ERRORS[outcome]
+    return Response({"error": message}, status=status)
+
+
 @api_view(["POST"])
 @permission_classes([AllowAny])
 def auth_initiate_api(request):
@@ -55,15 +60,9 @@ def auth_initiate_api(request):
         logger.warning("Invalid action '%s' in auth_initiate_api", action)
         return Response({"error": "Invalid action"}, status=400)
 
-    client_ip = (
-        request.META.get("HTTP_CF_CONNECTING_IP")
-        or request.META.get("HTTP_X_FORWARDED_FOR", "").split(",")[0].strip()
-        or request.META.get("REMOTE_ADDR")
-    )
-
     # Verify Turnstile token
-    success, error_response = asyncio.run(
-        utils.verify_turnstile_token(turnstile_token, client_ip)
+    success, error_response = http_client.run(
+        utils.verify_turnstile_token(turnstile_token, turnstile_ip(request))
     )
     if not success:
         logger.warning(
@@ -72,46 +71,6 @@ def auth_initiate_api(request):
         )
         return error_response
 
-    # Generate cryptographically secure OTP and temp_token
-    otp = "".join([str(secrets.randbelow(10)) for _ in range(8)])
-    temp_token = secrets.token_urlsafe(32)
-
-    # Create Redis storage and clean up existing tokens
-    r = get_redis_connection("default")
-
-    # Clean up any existing temp_token for this client to prevent memory leaks
-    existing_temp_token = request.COOKIES.get("temp_token")
-    if existing_temp_token:
-        try:
-            existing_hash = hashlib.sha256(existing_temp_token.encode()).hexdigest()
-            existing_state_key = f"temp_token_state:{existing_hash}"
-            existing_state_data = r.get(existing_state_key)
-            if existing_state_data:
-                existing_state = json.loads(existing_state_data)
-                r.delete(existing_state_key)
-                logger.info(
-                    "Cleaned up existing temp_token_state for action %s",
-                    existing_state.get("action", "unknown"),
-                )
-        except Exception:
-            logger.warning("Error cleaning up existing temp_token")
-
-    # Store OTP -> temp_token mapping with initiated_at timestamp
-    current_time = time.time()
-    otp_data = {"temp_token": temp_token, "initiated_at": current_time}
-    r.setex(f"otp:{otp}", OTP_TIMEOUT, json.dumps(otp_data))
-
-    # Store temp_token with SHA256 hash as key, and status of pending as well as action
-    temp_token_hash = hashlib.sha256(temp_token.encode()).hexdigest()
-    temp_token_state = {"status": "pending", "action": action}
-    r.setex(
-        f"temp_token_state:{temp_token_hash}",
-        TEMP_TOKEN_TIMEOUT,
-        json.dumps(temp_token_state),
-    )
-
-    logger.info("Created auth intent for action %s with OTP and temp_token", action)
-
     details = utils.get_survey_details(action)
     if not details:
         logger.error("Invalid action '%s' when fetching survey details", action)
@@ -124,6 +83,18 @@ def auth_initiate_api(request):
             status=500,
         )
 
+    # Generate cryptographically secure OTP and temp_token
+    otp = "".join([str(secrets.randbelow(10)) for _ in range(8)])
+    temp_token = secrets.token_urlsafe(32)
+
+    # Store OTP -> temp_token mapping and the pending temp_token state, and
+    # clean up any existing temp_token of this client, in one round trip
+    AuthStateStore(get_redis_connection("default")).initiate(
+        otp, temp_token, action, previous_temp_token=request.COOKIES.get("temp_token")
+    )
+
+    logger.info("Created auth intent for action %s with OTP and temp_token", action)
+
     # Create response and set temp_token as HttpOnly cookie
     response = Response({"otp": otp, "redirect_url": survey_url}, status=200)
     response.set_cookie(
@@ -169,48 +140,17 @@ def verify_callback_api(request):
         logger.warning("No temp_token found in verify_callback_api")
         return Response({"error": "No temp_token found"}, status=401)
 
-    r = get_redis_connection("default")
+    store = AuthStateStore(get_redis_connection("default"))
 
-    # Step 1: Look up temp_token state record
-    temp_token_hash = hashlib.sha256(temp_token.encode()).hexdigest()
-    state_key = f"temp_token_state:{temp_token_hash}"
-    state_data = r.get(state_key)
-
-    if not state_data:
-        logger.warning("Temp token state not found or expired in verify_callback_api")
-        return Response({"error": "Temp token state not found or expired"}, status=401)
-
-    try:
-        state_data = json.loads(state_data)
-    except json.JSONDecodeError:
-        logger.error("Invalid temp token state data in verify_callback_api")
-        return Response({"error": "Invalid temp token state data"}, status=401)
-
-    # Verify status is pending and action matches
-    if state_data.get("status") != "pending":
-        logger.warning("Temp token state not pending in verify_callback_api")
-        return Response({"error": "Invalid temp token state"}, status=401)
-
-    if state_data.get("action") != action:
-        logger.warning("Action mismatch in verify_callback_api")
-        return Response({"error": "Action mismatch"}, status=403)
-
-    # Step 2: Apply rate limiting per temp_token to prevent brute-force attempts
-    rate_limit_key = (
-        f"verify_attempts:{hashlib.sha256(temp_token.encode()).hexdigest()}"
-    )
-
-    attempts = r.incr(rate_limit_key)
-
-    if attempts == 1:
-        r.expire(rate_limit_key, TOKEN_RATE_LIMIT_TIME)
-
-    if attempts > TOKEN_RATE_LIMIT:
-        logger.warning("Too many verification attempts in verify_callback_api")
-        return Response({"error": "Too many verification attempts"}, status=429)
+    # Steps 1-2: Check the temp_token state is pending for this action and
+    # count the attempt (rate limited per temp_token against brute force)
+    outcome = store.begin_verification(temp_token, action)
+    if outcome != state.OK:
+        logger.warning("Verification rejected in verify_callback_api: %s", outcome)
+        return _outcome_error(outcome)
 
     # Step 3: Query questionnaire API for latest submission of the specific questionnaire of the action
-    latest_answer, error_response = asyncio.run(
+    latest_answer, error_response = http_client.run(
         utils.get_latest_answer(action=action, account=account),
     )
     if error_response:
@@ -225,68 +165,27 @@ def verify_callback_api(request):
         logger.warning("Answer ID mismatch in verify_callback_api")
         return Response({"error": "Answer ID mismatch"}, status=403)
 
-    # Extract OTP and quest_id from submission
-    submitted_otp = latest_answer.get("otp")
-
-    # Atomically get and delete OTP record to prevent reuse
-    otp_key = f"otp:{submitted_otp}"
-    otp_data_raw = r.getdel(otp_key)
-
-    if not otp_data_raw:
-        logger.warning("Invalid or expired OTP in verify_callback_api")
-        return Response({"error": "Invalid or expired OTP"}, status=401)
-
-    try:
-        otp_data = json.loads(otp_data_raw.decode("utf-8"))
-        expected_temp_token = otp_data.get("temp_token")
-        initiated_at = otp_data.get("initiated_at")
-    except (json.JSONDecodeError, AttributeError):
-        logger.error("Invalid OTP data format in verify_callback_api")
-        return Response({"error": "Invalid OTP data format"}, status=401)
-
-    if not expected_temp_token or not initiated_at:
-        logger.warning("Incomplete OTP data in verify_callback_api")
-        return Response({"error": "Incomplete OTP data"}, status=401)
-
-    # Step 5: StepVerify temp_token matches
-    if expected_temp_token != temp_token:
-        logger.warning("Invalid temp_token in verify_callback_api")
-        return Response({"error": "Invalid temp_token"}, status=401)
-
-    # Step 6: Validate submission timestamp after OTP extraction
+    # Step 4: Validate submission timestamp
+    submitted_at_str = latest_answer.get("submitted_at")
+    if submitted_at_str is None:
+        return Response({"error": "Missing submission timestamp"}, status=400)
     try:
-        submitted_at_str = latest_answer.get("submitted_at")
-        if submitted_at_str is None:
-            return Response({"error": "Missing submission timestamp"}, status=400)
-
         submitted_at = dateutil.parser.parse(submitted_at_str).timestamp()
-
-        # Additional validation: check submission is after initiation and within window
-        if submitted_at < initiated_at or (submitted_at - initiated_at) > OTP_TIMEOUT:
-            return Response(
-                {"error": "Submission timestamp outside validity window"},
-                status=401,
-            )
-
     except (ValueError, TypeError):
         logger.error("Error parsing submission timestamp")
         return Response({"error": "Invalid submission timestamp"}, status=401)
 
-    # Step 7: Update state to verified and add user details
-    state_data.update(
-        {
-            "status": "verified",
-            "account": account,
-        },
+    # Step 5: Atomically consume the OTP, check it belongs to this temp_token
+    # and was submitted within its validity window, and mark the state
+    # verified (clearing the rate limit)
+    outcome = store.consume_otp(
+        latest_answer.get("otp"), temp_token, submitted_at, account
     )
-
-    # Update temp_token_state in Redis with refreshed TTL
-    r.setex(state_key, TEMP_TOKEN_TIMEOUT, json.dumps(state_data))
+    if outcome != state.OK:
+        logger.warning("OTP rejected in verify_callback_api: %s", outcome)
+        return _outcome_error(outcome)
     expires_at = int(time.time() + TEMP_TOKEN_TIMEOUT)
 
-    # Clear rate limiting on success
-    r.delete(rate_limit_key)
-
     logger.info(
         "Successfully verified temp_token for user %s with action %s",
         account,
@@ -315,7 +214,7 @@ def verify_callback_api(request):
             login(request, user)
             is_logged_in = True
             # Delete temp_token_state after successful login
-            r.delete(state_key)
+            store.finish(temp_token)
         except Exception:
             logger.exception(
                 "Error during login session creation or cleanup for user %s", account
@@ -341,24 +240,13 @@ def verify_token_pwd(request, action: str) -> tuple[dict | None, Response | None
     if not temp_token:
         return None, Response({"error": "No temp_token found"}, status=401)
 
-    r = get_redis_connection("default")
-
-    # Look up temp_token state record
-    temp_token_hash = hashlib.sha256(temp_token.encode()).hexdigest()
-    state_key = f"temp_token_state:{temp_token_hash}"
-    state_data = r.get(state_key)
-
+    state_data = AuthStateStore(get_redis_connection("default")).get_state(temp_token)
     if not state_data:
         return None, Response(
             {"error": "Temp token state not found or expired"},
             status=401,
         )
 
-    try:
-        state_data = json.loads(state_data)
-    except json.JSONDecodeError:
-        return None, Response({"error": "Invalid temp token state data"}, status=401)
-
     # Verify status is verified and action is signup
     if state_data.get("status") != "verified" or state_data.get("action") != action:
         return None, Response({"error": "Invalid temp token state"}, status=403)
@@ -376,7 +264,7 @@ def verify_token_pwd(request, action: str) -> tuple[dict | None, Response | None
     account = state_data.get("account")
     if not account:
         return None, Response({"error": "No account in verified state"}, status=401)
-    return {"account": account, "password": password, "state_key": state_key}, None
+    return {"account": account, "password": password, "temp_token": temp_token}, None
 
 
 @api_view(["POST"])
@@ -396,7 +284,7 @@ def auth_signup_api(request) -> Response:
 
         account = verification_data.get("account")
         password = verification_data.get("password")
-        state_key = verification_data.get("state_key")
+        temp_token = verification_data.get("temp_token")
 
         # Create user session
         user, error_response = utils.create_user_session(request, account)
@@ -415,8 +303,7 @@ def auth_signup_api(request) -> Response:
         login(request, user)
 
         # Cleanup: Delete temp_token_state and clear cookie
-        r = get_redis_connection("default")
-        r.delete(state_key)
+        AuthStateStore(get_redis_connection("default")).finish(temp_token)
         response = Response({"success": True, "username": user.username}, status=200)
         response.delete_cookie("temp_token")
         return response
@@ -445,7 +332,7 @@ def auth_reset_password_api(request) -> Response:
             )
         account = verification_data.get("account")
         password = verification_data.get("password")
-        state_key = verification_data.get("state_key")
+        temp_token = verification_data.get("temp_token")
 
         # Get the user object and update password
         user_model = get_user_model()
@@ -457,8 +344,7 @@ def auth_reset_password_api(request) -> Response:
             return Response({"error": "User does not exist"}, status=404)
 
         # Cleanup: Delete temp_token_state and clear cookie
-        r = get_redis_connection("default")
-        r.delete(state_key)
+        AuthStateStore(get_redis_connection("default")).finish(temp_token)
         response = Response({"success": True, "username": user.username}, status=200)
         response.delete_cookie("temp_token")
         return response
@@ -470,6 +356,7 @@ def auth_reset_password_api(request) -> Response:
 
 @api_view(["POST"])
 @permission_classes([AllowAny])
+@rate_limit("auth_login")
 def auth_login_api(request) -> Response:
     account = request.data.get("account", "").strip()
     password = request.data.get("password", "")
@@ -483,14 +370,8 @@ def auth_login_api(request) -> Response:
             {"error": "Account, password, and Turnstile token are missing"}, status=400
         )
 
-    client_ip = (
-        request.META.get("HTTP_CF_CONNECTING_IP")
-        or request.META.get("HTTP_X_FORWARDED_FOR", "").split(",")[0].strip()
-        or request.META.get("REMOTE_ADDR")
-    )
-
-    success, error_response = asyncio.run(
-        utils.verify_turnstile_token(turnstile_token, client_ip)
+    success, error_response = http_client.run(
+        utils.verify_turnstile_token(turnstile_token, turnstile_ip(request))
     )
     if not success:
         return error_response or Response(
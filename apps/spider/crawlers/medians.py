@@ -89,6 +89,7 @@ def _convert_table_row_to_dict(table_row):
 def import_medians(data):
     for median_data in data:
         import_median(median_data)
+    Course.objects.refresh_offered()
 
 
 def import_median(median_data):
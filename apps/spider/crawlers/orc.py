@@ -2,8 +2,8 @@ import re
 from urllib.parse import urljoin
 
 from apps.spider.utils import retrieve_soup  # parse_number_and_subnumber,
-from apps.web.models import Course, CourseOffering, Instructor
-from lib.constants import CURRENT_TERM
+from apps.web.models import Course, CourseOffering, Instructor, OfferedCourse
+from lib import constants
 
 BASE_URL = "https://www.ji.sjtu.edu.cn/"
 ORC_BASE_URL = urljoin(BASE_URL, "/academics/courses/courses-by-number/")
@@ -137,6 +137,8 @@ def _crawl_course_data(course_url):
 
 
 def import_department(department_data):
+    # Worked out per import: a long-running worker outlives a term.
+    term = constants.get_current_term()
     for course_data in department_data:
         course, created = Course.objects.update_or_create(
             course_code=course_data["course_code"],
@@ -161,11 +163,16 @@ def import_department(department_data):
                 # Create a course offering for the current term if it doesn't exist
                 offering, _ = CourseOffering.objects.get_or_create(
                     course=course,
-                    term=CURRENT_TERM,
+                    term=term,
                     defaults={"section": 1, "period": ""},
                 )
                 offering.instructors.add(instructor)
 
+    # The signals keep the index in step offering by offering; this catches
+    # anything written around them.
+    OfferedCourse.objects.refresh([term])
+    Course.objects.refresh_offered(term=term)
+
 
 def extract_prerequisites(pre_requisites):
     result = pre_requisites
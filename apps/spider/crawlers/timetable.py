@@ -3,7 +3,13 @@ import re
 from django.db import transaction
 
 from apps.spider.utils import int_or_none, parse_number_and_subnumber, retrieve_soup
-from apps.web.models import Course, CourseOffering, DistributiveRequirement, Instructor
+from apps.web.models import (
+    Course,
+    CourseOffering,
+    DistributiveRequirement,
+    Instructor,
+    OfferedCourse,
+)
 from lib.terms import split_term
 
 TIMETABLE_URL = "http://oracle-www.dartmouth.edu/dart/groucho/timetable.display_courses"
@@ -139,6 +145,10 @@ def _get_timetable_term_code(term):
 def import_timetable(timetable_data):
     for course_data in timetable_data:
         _import_course_data(course_data)
+    OfferedCourse.objects.refresh(
+        {course_data["term"] for course_data in timetable_data}
+    )
+    Course.objects.refresh_offered()
 
 
 @transaction.atomic
@@ -0,0 +1,161 @@
+import importlib
+import json
+import re
+import time
+from contextlib import nullcontext
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.spider import replay, utils
+from apps.spider.crawlers import orc
+from apps.web.benchmark import throwaway_database
+from lib.middleware import count_query_shapes
+
+HEADING_REGEX = re.compile(r"<h2>[^<]*? – ")
+
+# Crawlers that have no fetch/parse/import path in this tree yet; they are
+# reported as skipped with the reason instead of being timed.
+UNAVAILABLE_CRAWLERS = (
+    (
+        "timetable",
+        "apps.spider.crawlers.timetable",
+        "crawl_timetable / import_timetable",
+    ),
+    (
+        "medians",
+        "apps.spider.crawlers.medians",
+        "crawl_term_medians_for_url / import_medians",
+    ),
+)
+
+
+def scale_orc_pages(pages, factor):
+    """
+    The recorded ORC pages grown `factor` times: synthesized course pages
+    (copies of the recorded ones, renamed into the made-up ZZ department)
+    are added and linked from the index, next to the recorded courses.
+    """
+    course_urls = sorted(url for url in pages if orc._is_department_url(url))
+    scaled = dict(pages)
+    links = []
+    for k in range(len(course_urls), len(course_urls) * factor):
+        url = f"{orc.COURSE_DETAIL_URL_PREFIX}bench{k}"
+        template = pages[course_urls[k % len(course_urls)]]
+        scaled[url] = HEADING_REGEX.sub(f"<h2>ZZ{k:04d}J – ", template, count=1)
+        links.append(f'<a href="{url}">ZZ{k:04d}J</a>')
+    index = scaled[orc.UNDERGRAD_URL]
+    scaled[orc.UNDERGRAD_URL] = index.replace(
+        "</body>", "\n".join(links) + "\n</body>", 1
+    )
+    return scaled
+
+
+def _skipped_crawlers():
+    skipped = {}
+    for name, module, functions in UNAVAILABLE_CRAWLERS:
+        try:
+            importlib.import_module(module)
+        except ImportError as e:
+            skipped[name] = f"{functions}: {module} does not import ({e})"
+        else:
+            skipped[name] = f"{functions}: no recorded fixtures"
+    return skipped
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the ORC crawler's fetch, parse and import stages separately "
+        "against recorded pages served locally, at several catalog sizes, "
+        "and count the database queries per imported course."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fixtures",
+            default=str(replay.FIXTURES_DIR / "orc"),
+            help="Directory of recorded ORC pages (see record_spider_fixtures).",
+        )
+        parser.add_argument(
+            "--scales",
+            default="1,10,100",
+            help="Catalog sizes as multiples of the recorded courses.",
+        )
+        parser.add_argument(
+            "--use-current-db",
+            action="store_true",
+            help="Import into the configured database (rolled back) instead "
+            "of a throwaway one.",
+        )
+        parser.add_argument("--output", help="Write the JSON results to this file.")
+        parser.add_argument("--json", action="store_true", help="Print JSON results.")
+
+    def handle(self, *args, **options):
+        recorded = replay.load(options["fixtures"])
+        factors = [int(factor) for factor in options["scales"].split(",")]
+        database = nullcontext() if options["use_current_db"] else throwaway_database()
+        with database:
+            rows = [
+                self._run(scale_orc_pages(recorded, factor), factor)
+                for factor in factors
+            ]
+        results = {"orc": rows, "skipped": _skipped_crawlers()}
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(results, f, indent=2)
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(
+            f"{'scale':>6}{'courses':>9}{'fetch ms/page':>15}{'parse ms/page':>15}"
+            f"{'import ms/course':>18}{'queries/course':>16}"
+        )
+        for row in rows:
+            self.stdout.write(
+                f"{row['scale']:>5}x{row['records']:>9}"
+                f"{row['fetch_ms_per_page']:>15.2f}{row['parse_ms_per_page']:>15.2f}"
+                f"{row['import_ms_per_record']:>18.2f}"
+                f"{row['queries_per_record']:>16.1f}"
+            )
+        for name, reason in results["skipped"].items():
+            self.stdout.write(f"skipped {name}: {reason}")
+
+    def _run(self, pages, factor):
+        # Fetch: every page once over HTTP from the replay server.
+        with replay.replaying(pages):
+            started = time.perf_counter()
+            fetched = {url: utils.fetch_html(url) for url in pages}
+            fetch_ms = (time.perf_counter() - started) * 1000
+
+        # Parse: the crawler functions, reading the fetched pages from memory.
+        with mock.patch.object(
+            utils, "fetch_html", lambda url, data=None: fetched[url]
+        ):
+            started = time.perf_counter()
+            course_urls = sorted(orc.crawl_program_urls())
+            records = [orc._crawl_course_data(url) for url in course_urls]
+            parse_ms = (time.perf_counter() - started) * 1000
+
+        # Import: into the database, rolled back so every scale starts empty.
+        with transaction.atomic():
+            with count_query_shapes() as queries:
+                started = time.perf_counter()
+                orc.import_department(records)
+                import_ms = (time.perf_counter() - started) * 1000
+            transaction.set_rollback(True)
+
+        return {
+            "scale": factor,
+            "records": len(records),
+            "pages": len(pages),
+            "fetch_ms": round(fetch_ms, 3),
+            "fetch_ms_per_page": round(fetch_ms / len(pages), 3),
+            "parse_ms": round(parse_ms, 3),
+            "parse_ms_per_page": round(parse_ms / len(pages), 3),
+            "import_ms": round(import_ms, 3),
+            "import_ms_per_record": round(import_ms / len(records), 3),
+            "queries": queries.total,
+            "queries_per_record": round(queries.total / len(records), 2),
+        }
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from apps.spider import replay
+from apps.spider.crawlers import orc
+
+
+class Command(BaseCommand):
+    help = (
+        "Save the ORC course index and course pages from the live site as "
+        "fixtures for the replay server (see benchmark_spider)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--directory", default=str(replay.FIXTURES_DIR / "orc"))
+        parser.add_argument(
+            "--limit", type=int, help="Record at most this many course pages."
+        )
+
+    def handle(self, *args, **options):
+        course_urls = sorted(orc.crawl_program_urls())[: options["limit"]]
+        manifest = replay.record(
+            [orc.UNDERGRAD_URL] + course_urls, options["directory"]
+        )
+        self.stdout.write(f"Recorded {len(manifest)} pages in {options['directory']}")
@@ -0,0 +1,104 @@
+"""
+Recorded crawler pages and a local HTTP server that replays them.
+
+The crawlers only know the live university sites. `record()` saves the
+pages they fetch into a fixture directory (`manifest.json` maps each URL
+to its file), and `replaying(pages)` serves such pages from a
+`ReplayServer` on localhost and points `apps.spider.utils.fetch_html` at
+it, so the crawlers run unchanged, offline and repeatably - over a real
+HTTP round trip, so fetch time is still measured.
+"""
+
+import json
+import re
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from apps.spider import utils
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "tests" / "fixtures"
+MANIFEST = "manifest.json"
+
+
+def _file_name(url):
+    parts = urlsplit(url)
+    name = re.sub(r"[^A-Za-z0-9]+", "_", f"{parts.netloc}{parts.path}?{parts.query}")
+    return name.strip("_")[:150] + ".html"
+
+
+def record(urls, directory):
+    """Fetch `urls` from the live sites and save them under `directory`."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    manifest_path = directory / MANIFEST
+    manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+    for url in urls:
+        name = _file_name(url)
+        (directory / name).write_text(utils.fetch_html(url))
+        manifest[url] = name
+    manifest_path.write_text(json.dumps(manifest, indent=2, sort_keys=True) + "\n")
+    return manifest
+
+
+def load(directory):
+    """The recorded pages under `directory`, `{url: html}`."""
+    directory = Path(directory)
+    manifest = json.loads((directory / MANIFEST).read_text())
+    return {url: (directory / name).read_text() for url, name in manifest.items()}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def _serve(self):
+        url = parse_qs(urlsplit(self.path).query).get("url", [""])[0]
+        if "Content-Length" in self.headers:
+            self.rfile.read(int(self.headers["Content-Length"]))
+        page = self.server.pages.get(url)
+        if page is None:
+            self.send_error(404, f"No recorded page for {url}")
+            return
+        body = page.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = _serve
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ReplayServer(ThreadingHTTPServer):
+    """Serves `pages` (`{url: html}`) as `GET /?url=<url>` on localhost."""
+
+    daemon_threads = True
+
+    def __init__(self, pages):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.pages = pages
+        self.origin = "http://127.0.0.1:{}".format(self.server_address[1])
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
+
+
+@contextmanager
+def replaying(pages):
+    """Fetch crawler pages from a local `ReplayServer` serving `pages`."""
+    with ReplayServer(pages) as server:
+        utils._replay["origin"] = server.origin
+        try:
+            yield server
+        finally:
+            utils._replay["origin"] = None
@@ -4,6 +4,7 @@ from django.db import transaction
 
 from apps.spider.crawlers import orc
 from apps.spider.models import CrawledData
+from apps.web import facets
 from lib import task_utils
 
 # from lib.constants import CURRENT_TERM
@@ -19,7 +20,8 @@ def import_pending_crawled_data(crawled_data_pk):
     #     medians.import_medians(crawled_data.pending_data)
     # elif
     if crawled_data.data_type == CrawledData.ORC_DEPARTMENT_COURSES:
-        orc.import_department(crawled_data.pending_data)
+        with facets.deferred_updates():
+            orc.import_department(crawled_data.pending_data)
     # else:
     #     assert crawled_data.data_type == CrawledData.COURSE_TIMETABLE
     #     timetable.import_timetable(crawled_data.pending_data)
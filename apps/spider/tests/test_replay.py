@@ -0,0 +1,61 @@
+import io
+import json
+import urllib.error
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from apps.spider import replay, utils
+from apps.spider.crawlers import orc
+from apps.spider.management.commands.benchmark_spider import scale_orc_pages
+from apps.web.models import Course
+
+ORC_FIXTURES = replay.FIXTURES_DIR / "orc"
+
+
+class ReplayTestCase(SimpleTestCase):
+    def setUp(self):
+        self.pages = replay.load(ORC_FIXTURES)
+
+    def test_crawler_runs_against_recorded_pages(self):
+        with replay.replaying(self.pages):
+            urls = sorted(orc.crawl_program_urls())
+            course = orc._crawl_course_data(urls[0])
+
+        self.assertEqual(len(urls), 3)
+        self.assertEqual(course["course_code"], "ECE2150J")
+        self.assertEqual(course["instructors"], ["Wang Yi", "Chen Rui"])
+
+    def test_unrecorded_page_is_not_found(self):
+        with replay.replaying(self.pages):
+            with self.assertRaises(urllib.error.HTTPError) as cm:
+                utils.fetch_html("https://www.ji.sjtu.edu.cn/missing/")
+
+        self.assertEqual(cm.exception.code, 404)
+
+    def test_scaled_pages_have_unique_courses(self):
+        pages = scale_orc_pages(self.pages, 4)
+
+        with replay.replaying(pages):
+            urls = orc.crawl_program_urls()
+            codes = {orc._crawl_course_data(url)["course_code"] for url in urls}
+
+        self.assertEqual(len(urls), 12)
+        self.assertEqual(len(codes), 12)
+
+
+class BenchmarkSpiderTestCase(TestCase):
+    def test_stages_are_reported_per_scale(self):
+        out = io.StringIO()
+
+        call_command(
+            "benchmark_spider", scales="1,2", use_current_db=True, json=True, stdout=out
+        )
+
+        results = json.loads(out.getvalue())
+        self.assertEqual([row["records"] for row in results["orc"]], [3, 6])
+        for row in results["orc"]:
+            self.assertGreater(row["queries_per_record"], 0)
+        self.assertEqual(set(results["skipped"]), {"timetable", "medians"})
+        # Imports are rolled back after each scale.
+        self.assertFalse(Course.objects.exists())
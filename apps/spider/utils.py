@@ -1,9 +1,17 @@
 import html
 import json
+import logging
 import urllib.request as urllib_request
+from urllib.parse import quote
 
 from bs4 import BeautifulSoup
 
+logger = logging.getLogger(__name__)
+
+# Origin of an `apps.spider.replay.ReplayServer`; while set, pages are
+# fetched from it instead of the live sites.
+_replay = {"origin": None}
+
 DEPARTMENT_CORRECTIONS = {"M&SS": "QSS", "WGST": "WGSS"}
 
 
@@ -29,9 +37,15 @@ def pretty_json(data):
 #         return int(numbers[0]), None
 
 
-def retrieve_soup(url, data=None, preprocess=lambda x: x):
-    print(url)
+def fetch_html(url, data=None):
+    logger.debug("Fetching %s", url)
+    if _replay["origin"] is not None:
+        url = "{}/?url={}".format(_replay["origin"], quote(url, safe=""))
     if data is not None:
         data = data.encode("utf-8")
     with urllib_request.urlopen(url, data=data) as response:
-        return BeautifulSoup(preprocess(response.read().decode("utf-8")), "html.parser")
+        return response.read().decode("utf-8")
+
+
+def retrieve_soup(url, data=None, preprocess=lambda x: x):
+    return BeautifulSoup(preprocess(fetch_html(url, data=data)), "html.parser")
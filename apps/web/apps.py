@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class WebConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.web"
+
+    def ready(self):
+        from apps.web import signals  # noqa: F401
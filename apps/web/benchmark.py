@@ -0,0 +1,312 @@
+"""
+Request mix, in-process replay and reporting for `manage.py benchmark_api`
+(and `advise_indexes`, which explains the queries of the same replay).
+
+A scenario is one kind of request with a relative weight in the mix; its
+`build(ctx, rng)` returns the `(method, path, json body)` to send, drawing
+ids and the page count of the course list from `ctx` (the seeded catalog).
+The mix leans on the pages that carry the traffic - course list and detail -
+and includes writes (votes) and auth so their cost shows up next to the
+reads.
+"""
+
+import json
+import math
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.test import Client, override_settings
+from django.test.utils import (
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+
+from apps.web.models import Student
+from apps.web.tests import factories
+from apps.web.tests.factories import DEPARTMENTS
+from lib.middleware import count_query_shapes
+
+# Browsing rarely goes deeper than this into the course list.
+MAX_PAGE = 20
+
+BENCHMARK_USERNAME = "benchmark"
+BENCHMARK_PASSWORD = "benchmark-password-1"
+
+Scenario = namedtuple("Scenario", ["name", "weight", "authenticated", "build"])
+
+
+def _course_id(ctx, rng):
+    return rng.choice(ctx["course_ids"])
+
+
+SCENARIOS = (
+    Scenario(
+        "course_list",
+        20,
+        False,
+        lambda ctx, rng: (
+            "GET",
+            f"/api/courses/?page={rng.randint(1, ctx['pages'])}",
+            None,
+        ),
+    ),
+    Scenario(
+        "course_list_filtered",
+        10,
+        False,
+        lambda ctx, rng: (
+            "GET",
+            f"/api/courses/?department={rng.choice(DEPARTMENTS)}&sort_by=review_count"
+            "&sort_order=desc",
+            None,
+        ),
+    ),
+    Scenario(
+        "course_list_sorted_by_score",
+        5,
+        True,
+        lambda ctx, rng: (
+            "GET",
+            "/api/courses/?sort_by=quality_score&sort_order=desc"
+            f"&min_difficulty={rng.randint(0, 3)}",
+            None,
+        ),
+    ),
+    Scenario(
+        "course_detail",
+        15,
+        False,
+        lambda ctx, rng: ("GET", f"/api/courses/{_course_id(ctx, rng)}/", None),
+    ),
+    Scenario(
+        "course_detail_authenticated",
+        10,
+        True,
+        lambda ctx, rng: ("GET", f"/api/courses/{_course_id(ctx, rng)}/", None),
+    ),
+    Scenario(
+        "course_reviews",
+        5,
+        True,
+        lambda ctx, rng: ("GET", f"/api/courses/{_course_id(ctx, rng)}/reviews/", None),
+    ),
+    Scenario(
+        "course_vote",
+        5,
+        True,
+        lambda ctx, rng: (
+            "POST",
+            f"/api/courses/{_course_id(ctx, rng)}/vote",
+            {"value": rng.randint(1, 5), "forLayup": rng.random() < 0.5},
+        ),
+    ),
+    Scenario(
+        "review_vote",
+        5,
+        True,
+        lambda ctx, rng: (
+            "POST",
+            f"/api/reviews/{rng.choice(ctx['review_ids'])}/vote/",
+            {"is_kudos": rng.random() < 0.7},
+        ),
+    ),
+    Scenario(
+        "departments", 5, False, lambda ctx, rng: ("GET", "/api/departments/", None)
+    ),
+    Scenario("landing", 5, False, lambda ctx, rng: ("GET", "/api/landing/", None)),
+    Scenario(
+        "user_status", 10, True, lambda ctx, rng: ("GET", "/api/user/status/", None)
+    ),
+    Scenario(
+        "auth_login",
+        2,
+        False,
+        lambda ctx, rng: (
+            "POST",
+            "/api/auth/login/",
+            {
+                "account": BENCHMARK_USERNAME,
+                "password": BENCHMARK_PASSWORD,
+                "turnstile_token": "benchmark",
+            },
+        ),
+    ),
+)
+
+
+@contextmanager
+def throwaway_database():
+    """A freshly migrated test database, destroyed afterwards."""
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False, aliases={"default"})
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=0)
+        teardown_test_environment()
+
+
+@contextmanager
+def benchmark_database(use_current_db=False):
+    """
+    Where a benchmark seeds its catalog: a throwaway test database or, with
+    `use_current_db`, the configured one inside a transaction that is rolled
+    back afterwards, so nothing is left behind and reruns start clean.
+    """
+    if not use_current_db:
+        with throwaway_database():
+            yield
+        return
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def seed_catalog(scale, seed=0):
+    """Seed a catalog `scale` times the default size into the current database."""
+    return factories.seed_catalog(
+        courses=max(int(2000 * scale), 1),
+        users=max(int(200 * scale), 1),
+        reviews=max(int(3000 * scale), 1),
+        votes=int(4000 * scale),
+        review_votes=int(3000 * scale),
+        seed=seed,
+    )
+
+
+def prepare_replay(scale, seed=0):
+    """
+    Seed a catalog `scale` times the default size, and the benchmark user,
+    into the current database. Returns the `ctx` the scenarios draw from.
+    """
+    data = seed_catalog(scale, seed)
+    user = User.objects.create_user(BENCHMARK_USERNAME, password=BENCHMARK_PASSWORD)
+    Student.objects.create(user=user)
+    cache.clear()
+    return {
+        "course_ids": [course.id for course in data["courses"]],
+        "review_ids": [review.id for review in data["reviews"]],
+        "pages": min(
+            math.ceil(len(data["courses"]) / settings.WEB["COURSE"]["PAGE_SIZE"]),
+            MAX_PAGE,
+        ),
+        "user": user,
+    }
+
+
+def replay(ctx, rng, requests):
+    """
+    Replay `requests` scenarios through the test client. Returns one sample
+    per request (`{"scenario", "ms", "queries", "status"}`) and the seconds
+    the requests took, seeding excluded.
+    """
+    anonymous, authenticated = Client(), Client()
+    authenticated.force_login(ctx["user"])
+    samples = []
+    started = time.perf_counter()
+    # Cloudflare is stubbed out so auth_login measures our own cost, and
+    # the rate limiter is off so the write scenarios are not answered 429.
+    with (
+        override_settings(RATE_LIMIT=dict(settings.RATE_LIMIT, ENABLED=False)),
+        mock.patch(
+            "apps.auth.utils.verify_turnstile_token",
+            mock.AsyncMock(return_value=(True, None)),
+        ),
+    ):
+        for scenario in request_mix(SCENARIOS, rng, requests):
+            method, path, body = scenario.build(ctx, rng)
+            client = authenticated if scenario.authenticated else anonymous
+            with count_query_shapes() as queries:
+                request_started = time.perf_counter()
+                response = client.generic(
+                    method,
+                    path,
+                    json.dumps(body) if body is not None else "",
+                    content_type="application/json",
+                )
+                elapsed_ms = (time.perf_counter() - request_started) * 1000
+            if scenario.name == "auth_login":
+                anonymous.logout()
+            samples.append(
+                {
+                    "scenario": scenario.name,
+                    "ms": elapsed_ms,
+                    "queries": queries.total,
+                    "status": response.status_code,
+                }
+            )
+    return samples, time.perf_counter() - started
+
+
+def replay_in_process(rng, scale, requests, seed=0):
+    """`prepare_replay` and `replay`: the samples and the replay's seconds."""
+    return replay(prepare_replay(scale, seed), rng, requests)
+
+
+def request_mix(scenarios, rng, requests):
+    """`requests` scenarios drawn by weight."""
+    return rng.choices(scenarios, weights=[s.weight for s in scenarios], k=requests)
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(p / 100 * len(ordered)) - 1, 0)]
+
+
+def _stats(samples, elapsed_s=None):
+    latencies = [sample["ms"] for sample in samples]
+    queries = [sample["queries"] for sample in samples if sample["queries"] is not None]
+    stats = {
+        "requests": len(samples),
+        "errors": sum(sample["status"] >= 400 for sample in samples),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "mean_ms": round(sum(latencies) / len(latencies), 3),
+        "queries_per_request": (
+            round(sum(queries) / len(queries), 2) if queries else None
+        ),
+    }
+    if elapsed_s is not None:
+        stats["requests_per_second"] = round(len(samples) / elapsed_s, 1)
+    return stats
+
+
+def summarize(samples, elapsed_s):
+    """Per-scenario and overall latency, query and throughput figures."""
+    by_scenario = {}
+    for sample in samples:
+        by_scenario.setdefault(sample["scenario"], []).append(sample)
+    return {
+        "overall": _stats(samples, elapsed_s),
+        "scenarios": {
+            name: _stats(scenario_samples)
+            for name, scenario_samples in sorted(by_scenario.items())
+        },
+    }
+
+
+def compare(current, baseline):
+    """`{scenario: {metric: relative change}}` of two `summarize` results."""
+    changes = {}
+    rows = [("overall", current["overall"], baseline["overall"])] + [
+        (name, stats, baseline["scenarios"][name])
+        for name, stats in current["scenarios"].items()
+        if name in baseline["scenarios"]
+    ]
+    for name, stats, before in rows:
+        changes[name] = {
+            metric: round((stats[metric] - before[metric]) / before[metric], 3)
+            for metric in ("p50_ms", "p95_ms", "queries_per_request")
+            if stats.get(metric) is not None and before.get(metric)
+        }
+    return changes
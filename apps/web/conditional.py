@@ -0,0 +1,139 @@
+"""
+Conditional GET support for the read APIs.
+
+Every cacheable resource is described by one or more version scopes (e.g. the
+whole catalog, or a single course). A scope's version stamp is the time of the
+last write that touched it, kept in the cache and bumped by the signal
+handlers in `apps.web.signals` once the write commits. Reading the stamps is a single cache round
+trip, so `ETag` / `Last-Modified` validators can be evaluated - and a
+`304 Not Modified` returned - before any query or serializer runs.
+
+Requests whose scopes were written within `DATABASE.STICKY_SECONDS` read
+from the primary rather than a replica (`lib.db_router`) - the same lag
+budget as the sticky cookie - so the ETag never describes rows the replica
+does not have yet.
+"""
+
+import hashlib
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.views.decorators.http import condition
+
+from lib import db_router
+
+CATALOG_SCOPE = "catalog"
+STATS_SCOPE = "stats"
+
+VERSION_KEY_PREFIX = "version"
+
+
+def course_scope(course_id):
+    return f"course:{course_id}"
+
+
+def _version_key(scope):
+    return f"{VERSION_KEY_PREFIX}:{scope}"
+
+
+def bump_versions(*scopes):
+    """
+    Mark every given scope as modified once the current transaction commits
+    (right away outside one). A stamp bumped before the commit would let a
+    concurrent read pair the new validator with the old rows, and clients
+    would then get 304s for stale data until the next write.
+    """
+
+    def bump():
+        stamp = time.time()
+        cache.set_many({_version_key(scope): stamp for scope in scopes}, timeout=None)
+
+    transaction.on_commit(bump)
+
+
+def get_versions(scopes):
+    """
+    Return the version stamps of the given scopes, in order.
+
+    A scope with no stamp yet (cold cache, flushed Redis) is stamped with the
+    current time, which invalidates every validator a client may still hold.
+    """
+    return _get_versions(scopes)[0]
+
+
+def _get_versions(scopes):
+    """`get_versions`, plus the stamps that were bumped by writes (not minted)."""
+    keys = [_version_key(scope) for scope in scopes]
+    stamps = cache.get_many(keys)
+    bumped = list(stamps.values())
+    missing = [key for key in keys if key not in stamps]
+    if missing:
+        now = time.time()
+        fresh = {key: now for key in missing}
+        cache.set_many(fresh, timeout=None)
+        stamps.update(fresh)
+    return [stamps[key] for key in keys], bumped
+
+
+def _request_versions(request, scopes, args, kwargs):
+    # etag_func and last_modified_func both need the stamps; read them once.
+    if not hasattr(request, "_version_stamps"):
+        stamps, bumped = _get_versions(scopes(request, *args, **kwargs))
+        # A replica may not have caught up with a write this recent: answer
+        # from the primary, so the new validator never comes with old rows.
+        if bumped and time.time() - max(bumped) < settings.DATABASE_STICKY_SECONDS:
+            db_router.use_primary()
+        request._version_stamps = stamps
+    return request._version_stamps
+
+
+def _user_key(request):
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        return "anon"
+    return f"user:{user.pk}"
+
+
+def conditional(scopes, vary_on_user=False):
+    """
+    Decorator adding `ETag` / `Last-Modified` validators to a read view.
+
+    Args:
+        scopes: callable `(request, *args, **kwargs) -> list[str]` returning
+            the version scopes the response is derived from.
+        vary_on_user: set when the payload depends on who is asking. The
+            user is folded into the ETag and `Last-Modified` is not emitted,
+            since a timestamp alone cannot tell two users' responses apart.
+    """
+
+    def etag_func(request, *args, **kwargs):
+        stamps = _request_versions(request, scopes, args, kwargs)
+        parts = [repr(stamp) for stamp in stamps]
+        if vary_on_user:
+            parts.append(_user_key(request))
+        digest = hashlib.md5(":".join(parts).encode(), usedforsecurity=False)
+        return digest.hexdigest()
+
+    def last_modified_func(request, *args, **kwargs):
+        stamps = _request_versions(request, scopes, args, kwargs)
+        return datetime.fromtimestamp(max(stamps), tz=timezone.utc)
+
+    return condition(
+        etag_func=etag_func,
+        last_modified_func=None if vary_on_user else last_modified_func,
+    )
+
+
+def catalog_scopes(request, *args, **kwargs):
+    return [CATALOG_SCOPE]
+
+
+def course_scopes(request, course_id, *args, **kwargs):
+    return [course_scope(course_id)]
+
+
+def stats_scopes(request, *args, **kwargs):
+    return [STATS_SCOPE]
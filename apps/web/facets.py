@@ -0,0 +1,263 @@
+"""
+Faceted course filtering over precomputed bitsets.
+
+Every course has a position in a dense index (`FacetIndex.ids`), and every
+facet value - a distrib, a credit count, an instructor, a median grade, or
+being offered this term - has a bitset over those positions: a Python int
+whose bit `i` is set when course `ids[i]` has that value. Selecting values
+is an OR within a facet and an AND across facets, and the counts shown next
+to each option are popcounts of the intersections, so neither touches the
+database. Only the final list of ids goes to the database (`id IN (...)`),
+where the usual annotations, sorting and paging apply.
+
+The index is built from the database by `rebuild()` and stored in the cache
+under `FACETS_KEY`, with a version stamp (`FACETS_SCOPE`, see
+`apps.web.conditional`). Each process keeps the copy it last loaded and
+fetches it again only when the stamp changes.
+
+Writes that change a course's facets update its bits once the transaction
+commits (the signal handlers in `apps.web.signals` call `courses_changed`).
+Importers wrap their work in `deferred_updates()` and rebuild the whole
+index once at the end instead. Concurrent updates can overwrite each other,
+and renaming an instructor is not tracked, so
+`apps.web.tasks.rebuild_facets` reconciles the index periodically.
+"""
+
+import logging
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.core.cache import cache
+from django.db import transaction
+
+from apps.web.conditional import bump_versions, get_versions
+from apps.web.models import Course, CourseMedian, CourseOffering
+
+logger = logging.getLogger(__name__)
+
+FACETS_KEY = "facets:index"
+FACETS_SCOPE = "facets"
+
+DISTRIB = "distrib"
+CREDITS = "credits"
+OFFERED = "offered"
+INSTRUCTOR = "instructor"
+MEDIAN = "median"
+FACETS = (DISTRIB, CREDITS, OFFERED, INSTRUCTOR, MEDIAN)
+
+# The only value of the OFFERED facet.
+OFFERED_CURRENT_TERM = "current"
+
+# The index this process last loaded, and the stamp it was loaded at.
+_local = {"stamp": None, "index": None}
+# Course ids changed inside deferred_updates(), or None outside it.
+_deferred = ContextVar("facets_deferred", default=None)
+
+
+class FacetIndex:
+    def __init__(self, ids=(), bitsets=None, live=0):
+        self.ids = list(ids)
+        self.bitsets = bitsets or {facet: {} for facet in FACETS}
+        # Bits of the courses that exist; deleted courses keep their position.
+        self.live = live
+        self._positions = {course_id: i for i, course_id in enumerate(self.ids)}
+
+    def __getstate__(self):
+        return {"ids": self.ids, "bitsets": self.bitsets, "live": self.live}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def match(self, selections, exclude=None):
+        """
+        The bitset of the live courses matching `selections`
+        (`{facet: set of values}`), ignoring the facet `exclude`.
+        """
+        mask = self.live
+        for facet, values in selections.items():
+            if facet == exclude or not values:
+                continue
+            bitsets = self.bitsets.get(facet, {})
+            selected = 0
+            for value in values:
+                selected |= bitsets.get(value, 0)
+            mask &= selected
+        return mask
+
+    def counts(self, selections, facets):
+        """
+        `{facet: {value: count}}` for each of `facets`: how many courses each
+        value would match given the selections in every other facet.
+        """
+        counts = {}
+        for facet in facets:
+            mask = self.match(selections, exclude=facet)
+            counts[facet] = {
+                value: count
+                for value, bits in sorted(self.bitsets.get(facet, {}).items())
+                if (count := (bits & mask).bit_count())
+            }
+        return counts
+
+    def course_ids(self, mask):
+        """The course ids whose bits are set in `mask`."""
+        return [
+            self.ids[i] for i, bit in enumerate(reversed(bin(mask)[2:])) if bit == "1"
+        ]
+
+    def set_course(self, course_id, values):
+        """Replace a course's facet values (`{facet: set of values}`)."""
+        position = self._positions.get(course_id)
+        if position is None:
+            position = len(self.ids)
+            self.ids.append(course_id)
+            self._positions[course_id] = position
+            bit = 1 << position
+        else:
+            bit = 1 << position
+            self._clear(bit)
+        self.live |= bit
+        for facet, facet_values in values.items():
+            bitsets = self.bitsets[facet]
+            for value in facet_values:
+                bitsets[value] = bitsets.get(value, 0) | bit
+
+    def remove_course(self, course_id):
+        position = self._positions.get(course_id)
+        if position is not None:
+            bit = 1 << position
+            self._clear(bit)
+            self.live &= ~bit
+
+    def _clear(self, bit):
+        for bitsets in self.bitsets.values():
+            for value, bits in list(bitsets.items()):
+                if bits & bit:
+                    bits &= ~bit
+                    if bits:
+                        bitsets[value] = bits
+                    else:
+                        del bitsets[value]
+
+
+def facet_values(course_ids=None):
+    """
+    `{course_id: {facet: set of values}}` from the database, for the given
+    courses or, by default, for all of them.
+    """
+    courses = Course.objects.all()
+    offerings = CourseOffering.objects.all()
+    medians = CourseMedian.objects.all()
+    distribs = Course.distribs.through.objects.all()
+    if course_ids is not None:
+        courses = courses.filter(id__in=course_ids)
+        offerings = offerings.filter(course_id__in=course_ids)
+        medians = medians.filter(course_id__in=course_ids)
+        distribs = distribs.filter(course_id__in=course_ids)
+
+    values = {}
+    for course_id, credits, offered in courses.values_list(
+        "id", "course_credits", "is_offered_current_term"
+    ):
+        values[course_id] = {facet: set() for facet in FACETS}
+        if credits is not None:
+            values[course_id][CREDITS].add(str(credits))
+        if offered:
+            values[course_id][OFFERED].add(OFFERED_CURRENT_TERM)
+
+    pairs = (
+        (DISTRIB, distribs.values_list("course_id", "distributiverequirement__name")),
+        (
+            INSTRUCTOR,
+            offerings.filter(instructors__isnull=False)
+            .values_list("course_id", "instructors__name")
+            .distinct(),
+        ),
+        (MEDIAN, medians.values_list("course_id", "median").distinct()),
+    )
+    for facet, rows in pairs:
+        for course_id, value in rows:
+            if course_id in values:
+                values[course_id][facet].add(value)
+    return values
+
+
+def build_index():
+    index = FacetIndex()
+    for course_id, values in sorted(facet_values().items()):
+        index.set_course(course_id, values)
+    return index
+
+
+def _store(index):
+    cache.set(FACETS_KEY, index, timeout=None)
+    bump_versions(FACETS_SCOPE)
+
+
+def rebuild():
+    """Build the index from the database and publish it."""
+    index = build_index()
+    _store(index)
+    logger.info("Rebuilt the facet index for %d courses", len(index.ids))
+    return index
+
+
+def get_index():
+    """The current index, from this process's copy if it is up to date."""
+    (stamp,) = get_versions([FACETS_SCOPE])
+    if _local["stamp"] != stamp:
+        index = cache.get(FACETS_KEY)
+        if index is None:
+            index = rebuild()
+            (stamp,) = get_versions([FACETS_SCOPE])
+        _local.update(stamp=stamp, index=index)
+    return _local["index"]
+
+
+def update_courses(course_ids):
+    """Recompute the bits of the given courses and publish the index."""
+    index = cache.get(FACETS_KEY)
+    if index is None:
+        # Built from scratch on the next read.
+        return
+    values = facet_values(course_ids)
+    for course_id in course_ids:
+        if course_id in values:
+            index.set_course(course_id, values[course_id])
+        else:
+            index.remove_course(course_id)
+    _store(index)
+
+
+def courses_changed(course_ids):
+    """Update the given courses' bits once the current transaction commits."""
+    course_ids = set(course_ids)
+    pending = _deferred.get()
+    if pending is not None:
+        pending |= course_ids
+    elif course_ids:
+        transaction.on_commit(lambda: update_courses(course_ids))
+
+
+@contextmanager
+def deferred_updates():
+    """Collect the changes of a bulk import and rebuild the index once after it."""
+    pending = set()
+    token = _deferred.set(pending)
+    try:
+        yield
+    finally:
+        _deferred.reset(token)
+    if pending:
+        transaction.on_commit(rebuild)
+
+
+def selections(params):
+    """`{facet: set of values}` from the comma-separated facet query parameters."""
+    selected = defaultdict(set)
+    for facet in FACETS:
+        for value in params.get(facet, "").split(","):
+            if value.strip():
+                selected[facet].add(value.strip())
+    return dict(selected)
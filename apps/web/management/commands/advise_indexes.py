@@ -0,0 +1,154 @@
+import json
+import random
+import re
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.web import benchmark
+from lib.middleware import sql_shape
+
+# Per vendor: (whole-table scan, sort not served by an index, index used).
+# SQLite's "SCAN t USING INDEX i" walks all of i, so it counts as a scan.
+PLAN_PATTERNS = {
+    "sqlite": (
+        re.compile(r"^SCAN (\w+)(?: USING (?:COVERING )?INDEX \S+)?$"),
+        re.compile(r"USE TEMP B-TREE FOR (?:ORDER BY|GROUP BY|DISTINCT)"),
+        re.compile(r"USING (?:COVERING )?INDEX (\S+)"),
+    ),
+    "postgresql": (
+        re.compile(r"Seq Scan on (\S+)"),
+        re.compile(r"(?:^|-> *)Sort\b"),
+        re.compile(r"Index (?:Only )?Scan (?:Backward )?using (\S+)"),
+    ),
+}
+
+
+class QueryCapture:
+    """Execute wrapper keeping one example, a count and the time per SELECT shape."""
+
+    def __init__(self):
+        self.shapes = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if sql.lstrip()[:6].upper() == "SELECT":
+                shape = self.shapes.setdefault(
+                    sql_shape(sql), {"sql": sql, "params": params, "count": 0, "ms": 0}
+                )
+                shape["count"] += 1
+                shape["ms"] += (time.perf_counter() - started) * 1000
+
+
+def explain(sql, params):
+    """
+    The plan of a query as lines of text, with the tables it scans in full,
+    whether it sorts, and the indexes it uses.
+    """
+    prefix = "EXPLAIN QUERY PLAN" if connection.vendor == "sqlite" else "EXPLAIN"
+    with connection.cursor() as cursor:
+        cursor.execute(f"{prefix} {sql}", params)
+        plan = [str(row[-1]).strip() for row in cursor.fetchall()]
+    seq_scan, sort, index = PLAN_PATTERNS.get(
+        connection.vendor, PLAN_PATTERNS["postgresql"]
+    )
+    return {
+        "plan": plan,
+        "seq_scans": sorted(
+            {m.group(1) for line in plan if (m := seq_scan.search(line))}
+        ),
+        "sorts": any(sort.search(line) for line in plan),
+        "indexes": sorted({m.group(1) for line in plan if (m := index.search(line))}),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay the API benchmark, EXPLAIN every distinct SELECT shape it runs "
+        "and flag the ones that scan a whole table."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scale",
+            type=float,
+            default=1.0,
+            help="Catalog size relative to 2000 courses / 3000 reviews.",
+        )
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--ignore",
+            default="",
+            help="Comma-separated tables whose full scans are expected.",
+        )
+        parser.add_argument(
+            "--use-current-db",
+            action="store_true",
+            help="Seed the configured database, in a transaction that is rolled "
+            "back, instead of a throwaway one.",
+        )
+        parser.add_argument(
+            "--fail-on-seq-scan",
+            action="store_true",
+            help="Exit with an error if any query shape scans a whole table.",
+        )
+        parser.add_argument("--json", action="store_true", help="Print JSON results.")
+
+    def handle(self, *args, **options):
+        ignored = {table for table in options["ignore"].split(",") if table}
+        with benchmark.benchmark_database(options["use_current_db"]):
+            # Seed before installing the wrapper: only the replay's own
+            # queries are explained, not the inserts and lookups of seeding.
+            ctx = benchmark.prepare_replay(options["scale"], options["seed"])
+            capture = QueryCapture()
+            with connection.execute_wrapper(capture):
+                benchmark.replay(
+                    ctx, random.Random(options["seed"]), options["requests"]
+                )
+            # Planner statistics for the freshly seeded tables.
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+            # Plans also scan subqueries and CTEs; only tables count.
+            tables = set(connection.introspection.table_names())
+            rows = []
+            for shape, sample in capture.shapes.items():
+                row = {
+                    "shape": shape,
+                    "count": sample["count"],
+                    "total_ms": round(sample["ms"], 3),
+                    **explain(sample["sql"], sample["params"]),
+                }
+                row["seq_scans"] = [
+                    table
+                    for table in row["seq_scans"]
+                    if table in tables and table not in ignored
+                ]
+                rows.append(row)
+        rows.sort(key=lambda row: (not row["seq_scans"], -row["total_ms"]))
+        flagged = [row for row in rows if row["seq_scans"]]
+
+        if options["json"]:
+            self.stdout.write(json.dumps(rows, indent=2))
+        else:
+            self.stdout.write(
+                f"{'count':>7}{'total ms':>10}  {'full scans':<28}{'sort':<6}shape"
+            )
+            for row in rows:
+                self.stdout.write(
+                    f"{row['count']:>7}{row['total_ms']:>10.1f}  "
+                    f"{','.join(row['seq_scans']) or '-':<28}"
+                    f"{'yes' if row['sorts'] else '-':<6}{row['shape'][:160]}"
+                )
+            self.stdout.write(
+                f"{len(flagged)} of {len(rows)} query shapes scan a whole table."
+            )
+        if options["fail_on_seq_scan"] and flagged:
+            raise CommandError(
+                f"{len(flagged)} query shapes scan a whole table: "
+                + ", ".join(sorted({t for row in flagged for t in row["seq_scans"]}))
+            )
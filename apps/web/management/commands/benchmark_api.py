@@ -0,0 +1,155 @@
+import json
+import math
+import random
+import re
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import httpx
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.web import benchmark
+
+SERVER_TIMING_QUERIES = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=settings.BASE_DIR,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a weighted request mix (course list, detail, reviews, votes, "
+        "departments, auth) against a synthetic catalog and report latency "
+        "percentiles, queries per request and throughput."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scale",
+            type=float,
+            default=1.0,
+            help="Catalog size relative to 2000 courses / 3000 reviews.",
+        )
+        parser.add_argument("--requests", type=int, default=1000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--url",
+            help="Replay the anonymous scenarios against a running server "
+            "(e.g. http://127.0.0.1:8000) instead of the in-process test client.",
+        )
+        parser.add_argument(
+            "--use-current-db",
+            action="store_true",
+            help="Seed the configured database, in a transaction that is rolled "
+            "back, instead of a throwaway one.",
+        )
+        parser.add_argument("--output", help="Write the JSON results to this file.")
+        parser.add_argument(
+            "--compare", help="A previous --output file to report changes against."
+        )
+        parser.add_argument("--json", action="store_true", help="Print JSON results.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        if options["url"]:
+            samples, elapsed_s = self._run_remote(
+                options["url"], rng, options["requests"]
+            )
+        else:
+            with benchmark.benchmark_database(options["use_current_db"]):
+                samples, elapsed_s = benchmark.replay_in_process(
+                    rng, options["scale"], options["requests"], options["seed"]
+                )
+
+        results = {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "target": options["url"] or "in-process",
+            "scale": options["scale"],
+            "seed": options["seed"],
+            **benchmark.summarize(samples, elapsed_s),
+        }
+        if options["compare"]:
+            with open(options["compare"]) as f:
+                baseline = json.load(f)
+            results["baseline_commit"] = baseline.get("commit")
+            results["changes"] = benchmark.compare(results, baseline)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(results, f, indent=2)
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self._write_table(results)
+
+    def _run_remote(self, url, rng, requests):
+        scenarios = [
+            scenario
+            for scenario in benchmark.SCENARIOS
+            if not scenario.authenticated and scenario.name != "auth_login"
+        ]
+        samples = []
+        with httpx.Client(base_url=url, timeout=30) as client:
+            listing = client.get("/api/courses/", params={"page": 1}).json()
+            ctx = {
+                "course_ids": [course["id"] for course in listing["results"]],
+                "pages": min(
+                    math.ceil(listing["count"] / settings.WEB["COURSE"]["PAGE_SIZE"]),
+                    benchmark.MAX_PAGE,
+                ),
+            }
+            started = time.perf_counter()
+            for scenario in benchmark.request_mix(scenarios, rng, requests):
+                method, path, body = scenario.build(ctx, rng)
+                request_started = time.perf_counter()
+                response = client.request(method, path, json=body)
+                elapsed_ms = (time.perf_counter() - request_started) * 1000
+                # Queries are only known when the server sampled the request
+                # and sends Server-Timing (METRICS.SERVER_TIMING).
+                match = SERVER_TIMING_QUERIES.search(
+                    response.headers.get("Server-Timing", "")
+                )
+                samples.append(
+                    {
+                        "scenario": scenario.name,
+                        "ms": elapsed_ms,
+                        "queries": int(match.group(1)) if match else None,
+                        "status": response.status_code,
+                    }
+                )
+            elapsed_s = time.perf_counter() - started
+        return samples, elapsed_s
+
+    def _write_table(self, results):
+        changes = results.get("changes", {})
+        self.stdout.write(
+            f"{'scenario':<30}{'requests':>9}{'errors':>7}{'p50 ms':>9}"
+            f"{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}{'p95 change':>12}"
+        )
+        rows = list(results["scenarios"].items()) + [("overall", results["overall"])]
+        for name, stats in rows:
+            queries = stats["queries_per_request"]
+            change = changes.get(name, {}).get("p95_ms")
+            self.stdout.write(
+                f"{name:<30}{stats['requests']:>9}{stats['errors']:>7}"
+                f"{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}"
+                f"{'-' if queries is None else f'{queries:.1f}':>9}"
+                f"{'' if change is None else f'{change:+.0%}':>12}"
+            )
+        self.stdout.write(
+            f"{results['overall']['requests_per_second']} requests/s "
+            f"({results['target']}, commit {results['commit'] or 'unknown'})"
+        )
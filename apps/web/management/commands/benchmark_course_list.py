@@ -0,0 +1,149 @@
+import json
+import math
+import statistics
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Prefetch
+from django.test import RequestFactory
+
+from apps.web import benchmark
+from apps.web.models import Course, CourseOffering, DistributiveRequirement
+from apps.web.serializers import CourseSearchRowSerializer, CourseSearchSerializer
+from lib.middleware import count_query_shapes
+
+
+def model_page(offset, limit, context):
+    """A course list page through model instances and CourseSearchSerializer."""
+    queryset = Course.objects.with_scores().prefetch_related(
+        Prefetch(
+            "distribs",
+            queryset=DistributiveRequirement.objects.order_by("name"),
+        ),
+        Prefetch(
+            "courseoffering_set",
+            queryset=CourseOffering.objects.prefetch_related("instructors"),
+        ),
+    )
+    page = queryset.order_by("course_code")[offset : offset + limit]
+    return CourseSearchSerializer(page, many=True, context=context).data
+
+
+def values_page(offset, limit, context):
+    """The same page through .values() rows and CourseSearchRowSerializer."""
+    queryset = CourseSearchRowSerializer.project(Course.objects.with_scores())
+    page = queryset.order_by("course_code")[offset : offset + limit]
+    return CourseSearchRowSerializer(page, many=True, context=context).data
+
+
+PATHS = {"model": model_page, "values": values_page}
+
+
+class Command(BaseCommand):
+    help = (
+        "Build course list pages through the model serializer and through the "
+        ".values() projection, check that they are identical and report CPU "
+        "time, peak memory and queries per page for each."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scale",
+            type=float,
+            default=1.0,
+            help="Catalog size relative to 2000 courses / 3000 reviews.",
+        )
+        parser.add_argument(
+            "--pages", type=int, default=benchmark.MAX_PAGE, help="Pages to build."
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=5, help="Timed builds of every page."
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--use-current-db",
+            action="store_true",
+            help="Seed the configured database, in a transaction that is rolled "
+            "back, instead of a throwaway one.",
+        )
+        parser.add_argument("--json", action="store_true", help="Print JSON results.")
+
+    def handle(self, *args, **options):
+        with benchmark.benchmark_database(options["use_current_db"]):
+            results = self._run(options)
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            self.stdout.write(
+                f"{results['pages']} pages of {results['page_size']} courses, "
+                "median per page:"
+            )
+            self.stdout.write(
+                f"{'path':<8}{'cpu ms':>10}{'peak KiB':>10}{'queries':>9}"
+            )
+            for name, row in results["paths"].items():
+                self.stdout.write(
+                    f"{name:<8}{row['cpu_ms']:>10.2f}{row['peak_kib']:>10.1f}"
+                    f"{row['queries']:>9}"
+                )
+        if results["mismatched_pages"]:
+            raise CommandError(
+                "The two paths differ on pages "
+                + ", ".join(map(str, results["mismatched_pages"]))
+            )
+
+    def _run(self, options):
+        data = benchmark.seed_catalog(options["scale"], options["seed"])
+        page_size = settings.WEB["COURSE"]["PAGE_SIZE"]
+        pages = min(math.ceil(len(data["courses"]) / page_size), options["pages"])
+        # Authenticated, so the scores are part of the output.
+        request = RequestFactory().get("/api/courses/")
+        request.user = User.objects.first()
+        context = {"request": request}
+
+        samples = {
+            name: {"cpu_ms": [], "peak_kib": [], "queries": []} for name in PATHS
+        }
+        mismatched = []
+        for page in range(pages):
+            offset = page * page_size
+            outputs = {}
+            for name, build in PATHS.items():
+                with count_query_shapes() as queries:
+                    outputs[name] = build(offset, page_size, context)
+                samples[name]["queries"].append(queries.total)
+
+                for _ in range(options["repeat"]):
+                    started = time.process_time()
+                    build(offset, page_size, context)
+                    samples[name]["cpu_ms"].append(
+                        (time.process_time() - started) * 1000
+                    )
+
+                tracemalloc.start()
+                try:
+                    build(offset, page_size, context)
+                    peak = tracemalloc.get_traced_memory()[1]
+                finally:
+                    tracemalloc.stop()
+                samples[name]["peak_kib"].append(peak / 1024)
+            if json.dumps(outputs["model"]) != json.dumps(outputs["values"]):
+                mismatched.append(page + 1)
+
+        return {
+            "pages": pages,
+            "page_size": page_size,
+            "paths": {
+                name: {
+                    "cpu_ms": round(statistics.median(row["cpu_ms"]), 3),
+                    "peak_kib": round(statistics.median(row["peak_kib"]), 1),
+                    "queries": max(row["queries"]),
+                }
+                for name, row in samples.items()
+            },
+            "mismatched_pages": mismatched,
+        }
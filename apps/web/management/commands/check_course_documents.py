@@ -0,0 +1,58 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.web import read_model
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-render every course document in parallel chunks and rebuild the "
+        "ones that are missing or out of date."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=None,
+            help="Courses per chunk (default: WEB.COURSE.DOCUMENT_CHUNK_SIZE).",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Chunks checked at once (default: WEB.COURSE.DOCUMENT_WORKERS).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report the documents that differ.",
+        )
+        parser.add_argument(
+            "--fail-on-drift",
+            action="store_true",
+            help="Exit with an error if any document was missing or stale.",
+        )
+        parser.add_argument("--json", action="store_true", help="Print JSON results.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        counts = read_model.check(
+            chunk_size=options["chunk_size"],
+            workers=options["workers"],
+            fix=not options["dry_run"],
+        )
+        counts["seconds"] = round(time.perf_counter() - started, 3)
+
+        if options["json"]:
+            self.stdout.write(json.dumps(counts, indent=2))
+        else:
+            for name in ("courses", "chunks", "missing", "stale", "rebuilt", "seconds"):
+                self.stdout.write(f"{name:<10}{counts[name]:>10}")
+        if options["fail_on_drift"] and (counts["missing"] or counts["stale"]):
+            raise CommandError(
+                f"{counts['missing']} course documents were missing and "
+                f"{counts['stale']} out of date."
+            )
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:52
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("web", "0011_remove_course_difficulty_score_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="course",
+            index=models.Index(
+                django.db.models.functions.text.Upper("department"),
+                name="web_course_department_upper",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="courseoffering",
+            index=models.Index(
+                fields=["course", "term"], name="web_courseo_course__8c8a37_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(
+                fields=["course", "user"], name="web_review_course__62a72b_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(
+                fields=["course", "-term"], name="web_review_course__949dac_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="reviewvote",
+            index=models.Index(
+                fields=["review", "is_kudos"], name="web_reviewv_review__65fc97_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="vote",
+            index=models.Index(
+                fields=["course", "category", "value"],
+                name="web_vote_course__b117a9_idx",
+            ),
+        ),
+    ]
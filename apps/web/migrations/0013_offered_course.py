@@ -0,0 +1,53 @@
+# Generated by Django 5.2.8 on 2026-10-19 01:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill(apps, schema_editor):
+    CourseOffering = apps.get_model("web", "CourseOffering")
+    OfferedCourse = apps.get_model("web", "OfferedCourse")
+    OfferedCourse.objects.bulk_create(
+        OfferedCourse(course_id=course_id, term=term)
+        for course_id, term in CourseOffering.objects.values_list(
+            "course_id", "term"
+        ).distinct()
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("web", "0012_composite_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OfferedCourse",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("term", models.CharField(max_length=4)),
+                (
+                    "course",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="web.course"
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("term", "course"), name="unique_offered_course_term"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
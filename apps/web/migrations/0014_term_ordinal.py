@@ -0,0 +1,67 @@
+# Generated by Django 5.2.8 on 2026-10-19 01:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+import lib.terms
+from lib.terms import numeric_value_of_term
+
+
+def backfill(apps, schema_editor):
+    for model_name in ("CourseMedian", "CourseOffering", "Review"):
+        model = apps.get_model("web", model_name)
+        terms = model.objects.values_list("term", flat=True).distinct()
+        for term in list(terms):
+            model.objects.filter(term=term).update(
+                term_ordinal=numeric_value_of_term(term)
+            )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("web", "0013_offered_course"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="review",
+            name="web_review_course__949dac_idx",
+        ),
+        migrations.AddField(
+            model_name="coursemedian",
+            name="term_ordinal",
+            field=lib.terms.TermOrdinalField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="courseoffering",
+            name="term_ordinal",
+            field=lib.terms.TermOrdinalField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="review",
+            name="term_ordinal",
+            field=lib.terms.TermOrdinalField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="coursemedian",
+            index=models.Index(
+                fields=["course", "-term_ordinal"],
+                name="web_coursem_course__92fc5d_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="courseoffering",
+            index=models.Index(
+                fields=["course", "-term_ordinal"],
+                name="web_courseo_course__b45529_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(
+                fields=["course", "-term_ordinal"], name="web_review_course__2b5f0a_idx"
+            ),
+        ),
+    ]
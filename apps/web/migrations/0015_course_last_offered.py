@@ -0,0 +1,65 @@
+# Generated by Django 5.2.8 on 2026-10-19 01:22
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from lib.constants import CURRENT_TERM
+
+
+def backfill(apps, schema_editor):
+    # Same as CourseManager.refresh_offered.
+    Course = apps.get_model("web", "Course")
+    CourseMedian = apps.get_model("web", "CourseMedian")
+    CourseOffering = apps.get_model("web", "CourseOffering")
+    offerings = CourseOffering.objects.filter(course=OuterRef("pk")).order_by(
+        "-term_ordinal", "-pk"
+    )
+    medians = CourseMedian.objects.filter(
+        course=OuterRef("pk"), term_ordinal__gt=0
+    ).order_by("-term_ordinal")
+
+    def latest(field):
+        return Coalesce(
+            Subquery(offerings.values(field)[:1]),
+            Subquery(medians.values(field)[:1]),
+        )
+
+    Course.objects.update(
+        last_offered_term=latest("term"),
+        last_offered_ordinal=Coalesce(latest("term_ordinal"), 0),
+        is_offered_current_term=Exists(
+            CourseOffering.objects.filter(course=OuterRef("pk"), term=CURRENT_TERM)
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("web", "0014_term_ordinal"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="course",
+            name="is_offered_current_term",
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name="course",
+            name="last_offered_ordinal",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="course",
+            name="last_offered_term",
+            field=models.CharField(blank=True, editable=False, max_length=4, null=True),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="course",
+            index=models.Index(
+                fields=["-last_offered_ordinal"], name="web_course_last_of_feb421_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.8 on 2026-10-19 01:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("web", "0015_course_last_offered"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CourseChange",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("course_id", models.IntegerField(db_index=True)),
+                ("reason", models.CharField(max_length=32)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="CourseDocument",
+            fields=[
+                (
+                    "course",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="document",
+                        serialize=False,
+                        to="web.course",
+                    ),
+                ),
+                ("document", models.JSONField()),
+                ("built_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
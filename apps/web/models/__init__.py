@@ -1,8 +1,10 @@
 from .course import Course
+from .course_document import CourseChange, CourseDocument
 from .course_median import CourseMedian
 from .course_offering import CourseOffering
 from .distributive_requirement import DistributiveRequirement
 from .instructor import Instructor
+from .offered_course import OfferedCourse
 from .review import Review
 from .student import Student
 from .vote import Vote
@@ -10,10 +12,13 @@ from .vote_for_review import ReviewVote
 
 __all__ = [
     "Course",
+    "CourseChange",
+    "CourseDocument",
     "CourseMedian",
     "CourseOffering",
     "DistributiveRequirement",
     "Instructor",
+    "OfferedCourse",
     "Review",
     "Student",
     "Vote",
@@ -3,15 +3,18 @@ from __future__ import unicode_literals
 import re
 
 from django.db import models
-from django.db.models import Avg, Count, Q
-from django.db.models.functions import Coalesce
+from django.db.models import Avg, Count, Exists, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Upper
 from django.urls import reverse
 
-from lib.constants import CURRENT_TERM
-from lib.terms import numeric_value_of_term
+from lib import constants
 
 from .course_offering import CourseOffering
 
+# Default `term` of Course.get_instructors, where None already means every
+# term: the current term, worked out when called.
+CURRENT = object()
+
 
 class CourseManager(models.Manager):
     course_search_regex = re.compile(
@@ -86,6 +89,41 @@ class CourseManager(models.Manager):
             review_count=Count("review", distinct=True),
         )
 
+    def refresh_offered(self, course_ids=None, term=None):
+        """
+        Recompute the denormalized `last_offered_term`, `last_offered_ordinal`
+        and `is_offered_current_term` of the given courses (all of them by
+        default) in a single UPDATE. `term` is the current term, worked out
+        at call time by default.
+        """
+        from apps.web.models import CourseMedian
+
+        term = term or constants.get_current_term()
+
+        offerings = CourseOffering.objects.filter(course=OuterRef("pk")).order_by(
+            "-term_ordinal", "-pk"
+        )
+        medians = CourseMedian.objects.filter(
+            course=OuterRef("pk"), term_ordinal__gt=0
+        ).order_by("-term_ordinal")
+
+        def latest(field):
+            # Same as Course.last_offered: the latest term offered, else the
+            # latest term with a median.
+            return Coalesce(
+                Subquery(offerings.values(field)[:1]),
+                Subquery(medians.values(field)[:1]),
+            )
+
+        courses = self.all() if course_ids is None else self.filter(pk__in=course_ids)
+        return courses.update(
+            last_offered_term=latest("term"),
+            last_offered_ordinal=Coalesce(latest("term_ordinal"), 0),
+            is_offered_current_term=Exists(
+                CourseOffering.objects.filter(course=OuterRef("pk"), term=term)
+            ),
+        )
+
     def with_scores_vote_counts(self):
         """Annotate courses with vote counts (for detail view)"""
         from apps.web.models import Vote
@@ -131,6 +169,15 @@ class Course(models.Model):
     # subnumber = models.IntegerField(null=True, db_index=True, blank=True)
     # source = models.CharField(max_length=16, choices=SOURCES.CHOICES)
 
+    # Denormalized from the offerings and medians by
+    # CourseManager.refresh_offered, so the course list can show and sort by
+    # them without touching either table.
+    last_offered_term = models.CharField(
+        max_length=4, null=True, blank=True, editable=False
+    )
+    last_offered_ordinal = models.PositiveIntegerField(default=0, editable=False)
+    is_offered_current_term = models.BooleanField(default=False, editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -138,6 +185,12 @@ class Course(models.Model):
         constraints = [
             models.UniqueConstraint(fields=["course_code"], name="unique_course_code")
         ]
+        indexes = [
+            # department__iexact compares UPPER(department)
+            models.Index(Upper("department"), name="web_course_department_upper"),
+            # sort_by=last_offered
+            models.Index(fields=["-last_offered_ordinal"]),
+        ]
 
     def __unicode__(self):
         return "{}: {}".format(self.short_name(), self.title)
@@ -151,10 +204,11 @@ class Course(models.Model):
     def distribs_string(self, separator=", "):
         return separator.join([d.name for d in self.distribs.all()])
 
-    def offered_times_string(self, term=CURRENT_TERM):
+    def offered_times_string(self, term=None):
         return ", ".join(self.offered_times(term))
 
-    def offered_times(self, term=CURRENT_TERM):
+    def offered_times(self, term=None):
+        term = term or constants.get_current_term()
         offered_times = []
 
         # filtering here creates an N+1 query... so we filter it ourselves.
@@ -176,52 +230,88 @@ class Course(models.Model):
             offered_times.append("other")
         return offered_times
 
-    def is_offered(self, term=CURRENT_TERM):
+    def is_offered(self, term=None):
+        term = term or constants.get_current_term()
         return self.courseoffering_set.filter(term=term).count() > 0
 
-    def prefetched_is_offered(self, term=CURRENT_TERM):
+    def prefetched_is_offered(self, term=None):
+        term = term or constants.get_current_term()
         for offering in self.courseoffering_set.all():
             if offering.term == term:
                 return True
         return False
 
+    def _is_prefetched(self, relation):
+        return relation in getattr(self, "_prefetched_objects_cache", {})
+
     def last_offered(self):
-        last_offering = self.courseoffering_set.last()
-        if last_offering:
-            return last_offering.term
+        """
+        The latest term the course is offered in, else the latest with a
+        median. Stored in `last_offered_term`; this reads the offerings.
+        """
+        if self._is_prefetched("courseoffering_set"):
+            last_offering = max(
+                self.courseoffering_set.all(),
+                key=lambda o: (o.term_ordinal, o.pk),
+                default=None,
+            )
+            if last_offering:
+                return last_offering.term
         else:
-            max_value_term = None
-            max_value = 0
-            for term in self.coursemedian_set.values_list("term", flat=True):
-                value = numeric_value_of_term(term)
-                if value > max_value:
-                    max_value_term = term
-                    max_value = value
-            return max_value_term
+            term = (
+                self.courseoffering_set.order_by("-term_ordinal", "-pk")
+                .values_list("term", flat=True)
+                .first()
+            )
+            if term:
+                return term
+        if self._is_prefetched("coursemedian_set"):
+            last_median = max(
+                (m for m in self.coursemedian_set.all() if m.term_ordinal > 0),
+                key=lambda m: m.term_ordinal,
+                default=None,
+            )
+            return last_median.term if last_median else None
+        return (
+            self.coursemedian_set.filter(term_ordinal__gt=0)
+            .order_by("-term_ordinal")
+            .values_list("term", flat=True)
+            .first()
+        )
 
     def short_description(self):
         if self.description:
             return ". ".join(self.description.split(". ")[:2]) + "..."
 
     def search_reviews(self, query):
-        return self.review_set.order_by("-term").filter(
+        return self.review_set.order_by("-term_ordinal").filter(
             Q(comments__icontains=query) | Q(professor__icontains=query)
         )
 
     def should_ask_viewers_to_contribute(self):
         return self.department in {"COSC", "ENGS"}
 
-    def get_instructors(self, term=CURRENT_TERM):
+    def get_instructors(self, term=CURRENT):
         """
-        Get all instructors for this course in the specified term.
-        If term is None, returns instructors across all terms.
+        Get all instructors for this course in the specified term, the
+        current one by default. If term is None, returns instructors across
+        all terms.
         """
+        if term is CURRENT:
+            term = constants.get_current_term()
         instructors = []
-        # Prefetch instructors to avoid N+1 queries
-        offerings = self.courseoffering_set.prefetch_related("instructors").all()
-
-        if term:
-            offerings = offerings.filter(term=term)
+        if self._is_prefetched("courseoffering_set"):
+            # Filter in Python: filtering the manager would ignore the prefetch.
+            offerings = [
+                offering
+                for offering in self.courseoffering_set.all()
+                if not term or offering.term == term
+            ]
+        else:
+            # Prefetch instructors to avoid N+1 queries
+            offerings = self.courseoffering_set.prefetch_related("instructors").all()
+            if term:
+                offerings = offerings.filter(term=term)
 
         for offering in offerings:
             for instructor in offering.instructors.all():
@@ -0,0 +1,40 @@
+from __future__ import unicode_literals
+
+from django.db import models
+
+
+class CourseDocument(models.Model):
+    """
+    A course as the course endpoints return it, rendered ahead of time by
+    `apps.web.read_model` - everything but what depends on the user reading
+    it.
+    """
+
+    course = models.OneToOneField(
+        "Course",
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name="document",
+    )
+    document = models.JSONField()
+    built_at = models.DateTimeField(auto_now=True)
+
+    def __unicode__(self):
+        return "Document for course {}".format(self.course_id)
+
+
+class CourseChange(models.Model):
+    """
+    Outbox of changes to courses whose documents need rebuilding. Written in
+    the transaction of the change itself and drained by
+    `apps.web.read_model.process_changes`.
+    """
+
+    # Not a foreign key: the change may be the course's deletion.
+    course_id = models.IntegerField(db_index=True)
+    # The model that changed, e.g. "vote" or "courseoffering".
+    reason = models.CharField(max_length=32)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __unicode__(self):
+        return "{} changed course {}".format(self.reason, self.course_id)
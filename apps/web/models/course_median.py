@@ -2,6 +2,8 @@ from __future__ import unicode_literals
 
 from django.db import models
 
+from lib.terms import TermOrdinalField
+
 
 class CourseMedian(models.Model):
     course = models.ForeignKey("Course", on_delete=models.CASCADE)
@@ -10,6 +12,7 @@ class CourseMedian(models.Model):
     enrollment = models.IntegerField()
     median = models.CharField(max_length=6, db_index=True)
     term = models.CharField(max_length=4, db_index=True)
+    term_ordinal = TermOrdinalField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -18,3 +21,7 @@ class CourseMedian(models.Model):
 
     class Meta:
         unique_together = ("course", "section", "term")
+        indexes = [
+            # A course's medians, latest term first
+            models.Index(fields=["course", "-term_ordinal"]),
+        ]
@@ -3,11 +3,14 @@ from __future__ import unicode_literals
 from django.db import models
 
 from lib import constants
+from lib.terms import TermOrdinalField
 
 
 class CourseOfferingManager(models.Manager):
-    def course_ids_for_term(self, term=constants.CURRENT_TERM):
-        return self.filter(term=term).values_list("course_id", flat=True).distinct()
+    def course_ids_for_term(self, term=None):
+        from apps.web.models import OfferedCourse
+
+        return OfferedCourse.objects.course_ids(term or constants.get_current_term())
 
 
 class CourseOffering(models.Model):
@@ -17,6 +20,7 @@ class CourseOffering(models.Model):
     instructors = models.ManyToManyField("Instructor")
 
     term = models.CharField(max_length=4, db_index=True)
+    term_ordinal = TermOrdinalField()
     section = models.IntegerField()
     period = models.CharField(max_length=128, db_index=True)
     limit = models.IntegerField(null=True)
@@ -28,6 +32,12 @@ class CourseOffering(models.Model):
 
     class Meta:
         unique_together = ("term", "course", "section")
+        indexes = [
+            # A course's offerings in a term (is_offered, get_instructors)
+            models.Index(fields=["course", "term"]),
+            # A course's offerings, latest term first (last_offered)
+            models.Index(fields=["course", "-term_ordinal"]),
+        ]
 
     def __unicode__(self):
         return "{} {}".format(self.term, self.course.short_name())
@@ -0,0 +1,70 @@
+from __future__ import unicode_literals
+
+from django.db import models
+
+
+class OfferedCourseManager(models.Manager):
+    def course_ids(self, term):
+        return self.filter(term=term).values_list("course_id", flat=True)
+
+    def sync_course(self, course_id):
+        """Match a course's rows to the terms of its offerings."""
+        from apps.web.models import CourseOffering
+
+        terms = set(
+            CourseOffering.objects.filter(course_id=course_id).values_list(
+                "term", flat=True
+            )
+        )
+        indexed = set(self.filter(course_id=course_id).values_list("term", flat=True))
+        if indexed - terms:
+            self.filter(course_id=course_id, term__in=indexed - terms).delete()
+        if terms - indexed:
+            self.bulk_create(
+                [
+                    self.model(course_id=course_id, term=term)
+                    for term in terms - indexed
+                ],
+                ignore_conflicts=True,
+            )
+
+    def refresh(self, terms=None):
+        """Rebuild the rows of the given terms (all terms by default) set-wise."""
+        from apps.web.models import CourseOffering
+
+        offerings = CourseOffering.objects.all()
+        stale = self.all()
+        if terms is not None:
+            offerings = offerings.filter(term__in=terms)
+            stale = stale.filter(term__in=terms)
+        stale.delete()
+        self.bulk_create(
+            self.model(course_id=course_id, term=term)
+            for course_id, term in offerings.values_list("course_id", "term").distinct()
+        )
+
+
+class OfferedCourse(models.Model):
+    """
+    One row per course and term it is offered in: the distinct
+    `(term, course)` pairs of `CourseOffering`, so "courses offered in a
+    term" is an index range scan instead of a DISTINCT over every section
+    of every term. Kept in sync by `apps.web.signals` and refreshed by the
+    importers.
+    """
+
+    objects = OfferedCourseManager()
+
+    term = models.CharField(max_length=4)
+    course = models.ForeignKey("Course", on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            # Also the index for lookups by term.
+            models.UniqueConstraint(
+                fields=["term", "course"], name="unique_offered_course_term"
+            )
+        ]
+
+    def __unicode__(self):
+        return "{} {}".format(self.term, self.course.short_name())
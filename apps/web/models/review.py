@@ -4,6 +4,8 @@ from django.contrib.auth.models import User
 from django.db import models
 from django.db.models import Count, OuterRef, Q, Subquery
 
+from lib.terms import TermOrdinalField
+
 
 class ReviewManager(models.Manager):
     def user_can_write_review(self, user, course):
@@ -68,6 +70,7 @@ class Review(models.Model):
 
     professor = models.CharField(max_length=255, db_index=True, blank=False)
     term = models.CharField(max_length=3, db_index=True, blank=False)
+    term_ordinal = TermOrdinalField()
     comments = models.TextField(blank=False)
 
     sentiment_labeler = models.CharField(
@@ -83,6 +86,14 @@ class Review(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Review.objects.user_can_write_review
+            models.Index(fields=["course", "user"]),
+            # A course's reviews, latest term first
+            models.Index(fields=["course", "-term_ordinal"]),
+        ]
+
     def __unicode__(self):
         return "{} {} {}: {}".format(
             self.course.short_name(), self.professor, self.term, self.comments
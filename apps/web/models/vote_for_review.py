@@ -79,6 +79,10 @@ class ReviewVote(models.Model):
 
     class Meta:
         unique_together = ("review", "user")
+        indexes = [
+            # Kudos and dislike counts per review
+            models.Index(fields=["review", "is_kudos"]),
+        ]
         verbose_name = "Review Vote"
         verbose_name_plural = "Review Votes"
 
@@ -0,0 +1,308 @@
+"""
+Pre-rendered course documents: a read model for the course endpoints.
+
+`CourseSerializer` assembles a course from half a dozen tables - the
+course, its distribs, crosslistings, offerings and instructors, reviews,
+votes and professors. Each course's `CourseDocument` holds that output,
+rendered ahead of time, for every field but `USER_FIELDS`. Serving a
+course is then one primary-key lookup. For a logged-in user, only their
+own votes on the course and its reviews, and whether they may still
+review it, are added on top (`user_overlay`).
+
+Writes that change a document add a `CourseChange` row to an outbox in
+their own transaction (the signal handlers in `apps.web.signals` call
+`course_changed`). `process_changes`, run every minute by
+`apps.web.tasks.process_course_changes`, rebuilds the documents of the
+changed courses and deletes the rows it handled. Until then a document
+with pending changes is stale, so reads render that course from the
+database instead and writers see their own writes.
+
+Renaming an instructor is not recorded as a change. `check` (the
+`check_course_documents` command and a nightly task) re-renders every
+document in parallel chunks and rebuilds the ones that differ or are
+missing - courses without a document, e.g. right after migrating, are
+rendered on every read until then. A document rebuilt while `check` was
+rendering it is left alone.
+"""
+
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.db.models import Exists, Max, OuterRef, Prefetch
+from django.utils import timezone
+
+from apps.web.models import (
+    Course,
+    CourseChange,
+    CourseDocument,
+    CourseOffering,
+    Review,
+    ReviewVote,
+)
+from apps.web.serializers import CourseSerializer, course_batch_context
+from lib import constants
+
+logger = logging.getLogger(__name__)
+
+# The fields of CourseSerializer that depend on the user reading them.
+USER_FIELDS = ("difficulty_vote", "quality_vote", "can_write_review")
+DOCUMENT_FIELDS = tuple(
+    name for name in CourseSerializer.Meta.fields if name not in USER_FIELDS
+)
+
+
+def render(course_ids, term=None):
+    """
+    `{course_id: document}` from the database, for the courses that exist.
+    The instructors listed are those of `term`, the current term by default.
+    """
+    course_ids = list(course_ids)
+    courses = (
+        Course.objects.with_scores_vote_counts()
+        .filter(pk__in=course_ids)
+        .prefetch_related(
+            "distribs",
+            "crosslisted_courses",
+            Prefetch(
+                "courseoffering_set",
+                queryset=CourseOffering.objects.prefetch_related("instructors"),
+            ),
+            Prefetch("review_set", queryset=Review.objects.with_votes().order_by("pk")),
+        )
+    )
+    context = {
+        "request": None,
+        "fields": DOCUMENT_FIELDS,
+        "document": True,
+        "term": term or constants.get_current_term(),
+        "batch": course_batch_context(
+            course_ids, None, ["professors_and_review_count"]
+        ),
+    }
+    data = CourseSerializer(courses, many=True, context=context).data
+    # Exactly what the JSON column gives back, so documents compare equal.
+    return {
+        document["id"]: document
+        for document in json.loads(json.dumps(data, cls=DjangoJSONEncoder))
+    }
+
+
+def store(documents, replace=True):
+    """Save `{course_id: document}`; with `replace=False`, only missing ones."""
+    rows = [
+        CourseDocument(course_id=course_id, document=document)
+        for course_id, document in documents.items()
+    ]
+    if replace:
+        CourseDocument.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["course"],
+            update_fields=["document", "built_at"],
+        )
+    else:
+        CourseDocument.objects.bulk_create(rows, ignore_conflicts=True)
+
+
+def rebuild(course_ids):
+    documents = render(course_ids)
+    store(documents)
+    return documents
+
+
+def course_changed(course_ids, reason):
+    """Record that the documents of the given courses need rebuilding."""
+    CourseChange.objects.bulk_create(
+        CourseChange(course_id=course_id, reason=reason)
+        for course_id in set(course_ids)
+    )
+
+
+def process_changes(chunk_size=None):
+    """
+    Rebuild the documents of the courses in the outbox, oldest changes
+    first, and delete the changes handled. Changes recorded meanwhile are
+    left for the next run. Returns the number of documents rebuilt.
+    """
+    chunk_size = chunk_size or settings.WEB["COURSE"]["DOCUMENT_CHUNK_SIZE"]
+    last = CourseChange.objects.aggregate(last=Max("pk"))["last"]
+    rebuilt = 0
+    while last is not None:
+        changes = list(
+            CourseChange.objects.filter(pk__lte=last)
+            .order_by("pk")
+            .values_list("pk", "course_id")[:chunk_size]
+        )
+        if not changes:
+            break
+        course_ids = {course_id for _, course_id in changes}
+        rebuilt += len(rebuild(course_ids))
+        # Only the rows read: one committed after them may not be rendered yet.
+        CourseChange.objects.filter(pk__in=[pk for pk, _ in changes]).delete()
+    if rebuilt:
+        logger.info("Rebuilt %d course documents", rebuilt)
+    return rebuilt
+
+
+def get_documents(course_ids):
+    """
+    `{course_id: document}` for the given courses that exist: the stored
+    documents, in one query, and documents rendered from the database for
+    courses whose document is missing or has changes pending. Reads never
+    store documents (they may run on a replica); `process_changes` and
+    `check` do.
+    """
+    documents = dict(
+        CourseDocument.objects.filter(pk__in=course_ids)
+        .exclude(Exists(CourseChange.objects.filter(course_id=OuterRef("pk"))))
+        .values_list("pk", "document")
+    )
+    outdated = [course_id for course_id in course_ids if course_id not in documents]
+    if outdated:
+        documents.update(render(outdated))
+    return documents
+
+
+def user_overlay(course_ids, request, selected):
+    """
+    The user-specific part of the `selected` fields for the given courses:
+    `{"fields": {course_id: {name: value}}, "review_votes": {review_id:
+    is_kudos}}`.
+    """
+    overlay = {
+        "fields": {course_id: {} for course_id in course_ids},
+        "review_votes": {},
+    }
+    # No queries for anonymous users: can_write_review is simply False.
+    user_fields = [name for name in selected if name in USER_FIELDS]
+    if user_fields:
+        context = {
+            "request": request,
+            "fields": user_fields,
+            "batch": course_batch_context(course_ids, request, user_fields),
+        }
+        for course_id in course_ids:
+            overlay["fields"][course_id] = CourseSerializer(
+                Course(id=course_id), context=context
+            ).data
+
+    user = request.user if request is not None else None
+    if "review_set" in selected and user is not None and user.is_authenticated:
+        overlay["review_votes"] = dict(
+            ReviewVote.objects.filter(
+                user=user, review__course_id__in=course_ids
+            ).values_list("review_id", "is_kudos")
+        )
+    return overlay
+
+
+def present(document, selected, overlay, request):
+    """A document as `CourseSerializer` returns the `selected` fields to `request`."""
+    authenticated = request is not None and request.user.is_authenticated
+    fields = overlay["fields"][document["id"]]
+    data = {}
+    for name in selected:
+        if name in USER_FIELDS:
+            data[name] = fields[name]
+        elif name == "review_set":
+            data[name] = (
+                [
+                    dict(review, user_vote=overlay["review_votes"].get(review["id"]))
+                    for review in document[name]
+                ]
+                if authenticated
+                else []
+            )
+        else:
+            data[name] = document[name]
+    return data
+
+
+def courses_for_request(course_ids, request):
+    """
+    `{course_id: data}` for the given courses that exist, as
+    `CourseSerializer` would return them to `request`.
+    """
+    selected = CourseSerializer.selected_fields(request)
+    documents = get_documents(course_ids)
+    overlay = user_overlay(list(documents), request, selected)
+    return {
+        course_id: present(document, selected, overlay, request)
+        for course_id, document in documents.items()
+    }
+
+
+def _check_chunk(course_ids, fix, threaded):
+    try:
+        # Read before rendering: a document rebuilt meanwhile (by
+        # process_changes) may be newer than our render, and is kept.
+        stored = {
+            pk: (document, built_at)
+            for pk, document, built_at in CourseDocument.objects.filter(
+                pk__in=course_ids
+            ).values_list("pk", "document", "built_at")
+        }
+        rendered = render(course_ids)
+        missing = [course_id for course_id in rendered if course_id not in stored]
+        stale = [
+            course_id
+            for course_id, document in rendered.items()
+            if course_id in stored and stored[course_id][0] != document
+        ]
+        rebuilt = 0
+        if fix and missing:
+            store(
+                {course_id: rendered[course_id] for course_id in missing},
+                replace=False,
+            )
+            rebuilt += len(missing)
+        if fix:
+            for course_id in stale:
+                rebuilt += CourseDocument.objects.filter(
+                    pk=course_id, built_at=stored[course_id][1]
+                ).update(document=rendered[course_id], built_at=timezone.now())
+        return len(rendered), len(missing), len(stale), rebuilt
+    finally:
+        if threaded:
+            # Each thread has a connection of its own.
+            connection.close()
+
+
+def check(chunk_size=None, workers=None, fix=True):
+    """
+    Re-render every course's document, in chunks of `chunk_size` courses
+    checked by `workers` threads, and (with `fix`) store the ones that are
+    missing or differ. Returns the counts.
+    """
+    chunk_size = chunk_size or settings.WEB["COURSE"]["DOCUMENT_CHUNK_SIZE"]
+    workers = workers or settings.WEB["COURSE"]["DOCUMENT_WORKERS"]
+    course_ids = list(Course.objects.order_by("pk").values_list("pk", flat=True))
+    chunks = [
+        course_ids[i : i + chunk_size] for i in range(0, len(course_ids), chunk_size)
+    ]
+    if workers > 1 and len(chunks) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(
+                executor.map(lambda chunk: _check_chunk(chunk, fix, True), chunks)
+            )
+    else:
+        results = [_check_chunk(chunk, fix, False) for chunk in chunks]
+
+    counts = {
+        "courses": sum(checked for checked, _, _, _ in results),
+        "chunks": len(chunks),
+        "missing": sum(missing for _, missing, _, _ in results),
+        "stale": sum(stale for _, _, stale, _ in results),
+        "rebuilt": sum(rebuilt for _, _, _, rebuilt in results),
+    }
+    if counts["rebuilt"]:
+        logger.warning(
+            "Rebuilt %d missing and %d stale course documents",
+            counts["missing"],
+            counts["stale"],
+        )
+    return counts
@@ -1,6 +1,7 @@
 # apps/web/serializers.py
 from django.conf import settings
 from django.db.models import Count
+from django.db.models.functions import Substr
 from rest_framework import serializers
 
 from apps.web.models import (
@@ -11,9 +12,71 @@ from apps.web.models import (
     Review,
     Vote,
 )
+from apps.web.models.course import CURRENT
 from lib import constants
 from lib.terms import is_valid_term
 
+# Longer course descriptions are cut to this many characters in the list.
+SHORT_DESCRIPTION_LENGTH = 300
+
+
+def _query_param_names(request, param):
+    """The comma-separated names in a query parameter, or None if absent."""
+    if request is None:
+        return None
+    # A DRF Request, or a plain HttpRequest when serializing outside a view.
+    params = getattr(request, "query_params", request.GET)
+    if param not in params:
+        return None
+    return {name.strip() for name in params[param].split(",")}
+
+
+class SparseFieldsMixin:
+    """
+    Lets the client choose the top-level fields of the response:
+
+    - `?fields=a,b` returns only the named fields;
+    - `?omit=a,b` leaves the named fields out;
+    - `?expand=a,b` computes only the named `Meta.expandable_fields` - the
+      ones that need extra queries - and none of the others. Without it (or
+      `fields`), every field is returned, as before.
+
+    `Meta.authenticated_fields` are only returned to logged-in users.
+    Unknown names are ignored. Fields that are not selected are removed
+    before serialization, so their methods and nested serializers never run.
+    """
+
+    @classmethod
+    def selected_fields(cls, request):
+        """The names of the fields to return for `request`, in output order."""
+        fields = _query_param_names(request, "fields")
+        omit = _query_param_names(request, "omit") or set()
+        expand = _query_param_names(request, "expand")
+        expandable = getattr(cls.Meta, "expandable_fields", ())
+        authenticated = request is not None and request.user.is_authenticated
+
+        selected = []
+        for name in cls.Meta.fields:
+            if name in omit:
+                continue
+            if fields is not None:
+                if name not in fields:
+                    continue
+            elif expand is not None and name in expandable and name not in expand:
+                continue
+            if not authenticated and name in cls.Meta.authenticated_fields:
+                continue
+            selected.append(name)
+        return selected
+
+    def get_fields(self):
+        fields = super().get_fields()
+        # context["fields"] overrides the request's selection.
+        selected = self.context.get("fields") or self.selected_fields(
+            self.context.get("request")
+        )
+        return {name: fields[name] for name in selected}
+
 
 class DistributiveRequirementSerializer(serializers.ModelSerializer):
     class Meta:
@@ -113,13 +176,18 @@ class DepartmentSerializer(serializers.Serializer):
     count = serializers.IntegerField()
 
 
-class CourseSearchSerializer(serializers.ModelSerializer):
+class CourseSearchSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     distribs = DistributiveRequirementSerializer(many=True, read_only=True)
     review_count = serializers.SerializerMethodField()
-    is_offered_in_current_term = serializers.SerializerMethodField()
+    last_offered = serializers.CharField(source="last_offered_term", read_only=True)
+    is_offered_in_current_term = serializers.BooleanField(
+        source="is_offered_current_term", read_only=True
+    )
     instructors = serializers.SerializerMethodField()
     quality_score = serializers.SerializerMethodField()
     difficulty_score = serializers.SerializerMethodField()
+    short_description = serializers.SerializerMethodField()
+    offered_times_string = serializers.SerializerMethodField()
 
     class Meta:
         model = Course
@@ -134,10 +202,21 @@ class CourseSearchSerializer(serializers.ModelSerializer):
             "last_offered",
             "is_offered_in_current_term",
             "instructors",
+            "short_description",
+            "offered_times_string",
         )
+        # Everything read from the course's offerings or distribs.
+        expandable_fields = (
+            "distribs",
+            "instructors",
+            "offered_times_string",
+        )
+        authenticated_fields = ("quality_score", "difficulty_score")
 
     def get_review_count(self, obj):
-        return getattr(obj, "review_count", obj.review_set.count())
+        if hasattr(obj, "review_count"):
+            return obj.review_count
+        return obj.review_set.count()
 
     def get_quality_score(self, obj):
         return getattr(obj, "quality_score", 0.0)
@@ -145,9 +224,6 @@ class CourseSearchSerializer(serializers.ModelSerializer):
     def get_difficulty_score(self, obj):
         return getattr(obj, "difficulty_score", 0.0)
 
-    def get_is_offered_in_current_term(self, obj):
-        return obj.courseoffering_set.filter(term=constants.CURRENT_TERM).exists()
-
     def get_instructors(self, obj):
         """Return a list of instructor names for the course"""
         instructors = obj.get_instructors()
@@ -155,33 +231,159 @@ class CourseSearchSerializer(serializers.ModelSerializer):
 
     def get_short_description(self, obj):
         """Return a shortened version of the course description"""
-        if obj.description:
-            return (
-                obj.description
-                if len(obj.description) <= 300
-                else obj.description[:300] + "..."
-            )
-        return None
+        return _short_description(obj.description)
 
     def get_offered_times_string(self, obj):
         """Return a string of when the course is offered"""
-        periods = set(o.period for o in obj.courseoffering_set.all())
+        periods = sorted(set(o.period for o in obj.courseoffering_set.all()))
         return ", ".join(periods) if periods else None
 
-    def to_representation(self, instance):
-        ret = super().to_representation(instance)
-        request = self.context.get("request")
 
-        # Remove scores for unauthenticated users
-        if not request or not request.user.is_authenticated:
-            ret.pop("quality_score", None)
-            ret.pop("difficulty_score", None)
+def _short_description(description):
+    if description:
+        if len(description) <= SHORT_DESCRIPTION_LENGTH:
+            return description
+        return description[:SHORT_DESCRIPTION_LENGTH] + "..."
+    return None
+
+
+# The fields of CourseSearchSerializer read from the course's offerings.
+OFFERING_FIELDS = {
+    "instructors",
+    "offered_times_string",
+}
+
+
+def _course_search_related(ids, selected):
+    """
+    The distribs and offerings (with current-term instructors) of the given
+    courses, one query each - each only if one of the `selected` fields
+    needs it.
+    """
+    related = {course_id: {"distribs": [], "offerings": []} for course_id in ids}
+
+    if "distribs" in selected:
+        distribs = (
+            Course.distribs.through.objects.filter(course_id__in=ids)
+            .order_by("distributiverequirement__name")
+            .values_list("course_id", "distributiverequirement__name")
+        )
+        for course_id, name in distribs:
+            related[course_id]["distribs"].append({"name": name})
+
+    if OFFERING_FIELDS.isdisjoint(selected):
+        return related
+
+    offerings = {}
+    for offering in (
+        CourseOffering.objects.filter(course_id__in=ids)
+        .order_by("pk")
+        .values("id", "course_id", "term", "period")
+    ):
+        offering["instructors"] = []
+        offerings[offering["id"]] = offering
+        related[offering["course_id"]]["offerings"].append(offering)
+
+    term = constants.get_current_term()
+    current = [
+        offering_id
+        for offering_id, offering in offerings.items()
+        if offering["term"] == term
+    ]
+    if "instructors" in selected and current:
+        instructors = (
+            CourseOffering.instructors.through.objects.filter(
+                courseoffering_id__in=current
+            )
+            .order_by("pk")
+            .values_list("courseoffering_id", "instructor_id", "instructor__name")
+        )
+        for offering_id, instructor_id, name in instructors:
+            offerings[offering_id]["instructors"].append((instructor_id, name))
+
+    return related
+
+
+class CourseSearchRowListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        rows = list(data)
+        selected = self.child.selected_fields()
+        related = _course_search_related([row["id"] for row in rows], selected)
+        return [
+            self.child.row_representation(row, related[row["id"]], selected)
+            for row in rows
+        ]
+
+
+class CourseSearchRowSerializer(serializers.BaseSerializer):
+    """
+    `CourseSearchSerializer` output built from `.values()` rows, for the
+    course list. Only the columns in `project()` are read - not the long
+    description, pre-requisites or topics - and no model instances or
+    serializer fields are created; with `many=True`, related rows are loaded
+    for the whole page at once. `?fields=`, `?omit=` and `?expand=` work as
+    for `CourseSearchSerializer`, and skip the lookups they leave out.
+    """
+
+    class Meta:
+        list_serializer_class = CourseSearchRowListSerializer
+
+    @staticmethod
+    def project(queryset):
+        """The rows to serialize from a `Course.objects.with_scores()` queryset."""
+        return queryset.annotate(
+            description_head=Substr("description", 1, SHORT_DESCRIPTION_LENGTH + 1)
+        ).values(
+            "id",
+            "course_code",
+            "course_title",
+            "review_count",
+            "quality_score",
+            "difficulty_score",
+            "description_head",
+            "last_offered_term",
+            "is_offered_current_term",
+        )
 
-        # Add summary fields
-        ret["short_description"] = self.get_short_description(instance)
-        ret["offered_times_string"] = self.get_offered_times_string(instance)
+    def selected_fields(self):
+        return CourseSearchSerializer.selected_fields(self.context.get("request"))
 
-        return ret
+    def to_representation(self, instance):
+        selected = self.selected_fields()
+        related = _course_search_related([instance["id"]], selected)
+        return self.row_representation(instance, related[instance["id"]], selected)
+
+    def row_representation(self, row, related, selected):
+        return {
+            name: row[name]
+            if name in row
+            else getattr(self, f"get_{name}")(row, related)
+            for name in selected
+        }
+
+    def get_distribs(self, row, related):
+        return related["distribs"]
+
+    def get_last_offered(self, row, related):
+        return row["last_offered_term"]
+
+    def get_is_offered_in_current_term(self, row, related):
+        return row["is_offered_current_term"]
+
+    def get_instructors(self, row, related):
+        instructors = {}
+        # Only the current term's offerings have their instructors loaded.
+        for offering in related["offerings"]:
+            for instructor_id, name in offering["instructors"]:
+                instructors.setdefault(instructor_id, name)
+        return list(instructors.values())
+
+    def get_short_description(self, row, related):
+        return _short_description(row["description_head"])
+
+    def get_offered_times_string(self, row, related):
+        periods = sorted(set(o["period"] for o in related["offerings"]))
+        return ", ".join(periods) if periods else None
 
 
 class CourseVoteSerializer(serializers.Serializer):
@@ -193,13 +395,13 @@ class ReviewVoteSerializer(serializers.Serializer):
     is_kudos = serializers.BooleanField()
 
 
-class CourseSerializer(serializers.ModelSerializer):
+class CourseSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     review_set = serializers.SerializerMethodField()
     courseoffering_set = CourseOfferingSerializer(many=True, read_only=True)
     distribs = DistributiveRequirementSerializer(many=True, read_only=True)
     xlist = serializers.SerializerMethodField()
     professors_and_review_count = serializers.SerializerMethodField()
-    last_offered = serializers.CharField()
+    last_offered = serializers.CharField(source="last_offered_term", read_only=True)
     difficulty_vote = serializers.SerializerMethodField()
     quality_vote = serializers.SerializerMethodField()
     can_write_review = serializers.SerializerMethodField()
@@ -237,32 +439,40 @@ class CourseSerializer(serializers.ModelSerializer):
             "instructors",
             "course_topics",
         )
-
-    def to_representation(self, instance):
-        ret = super().to_representation(instance)
-        request = self.context.get("request")
-
-        # Remove scores and votes for unauthenticated users
-        if not request or not request.user.is_authenticated:
-            ret.pop("quality_score", None)
-            ret.pop("difficulty_score", None)
-            ret.pop("difficulty_vote", None)
-            ret.pop("quality_vote", None)
-            ret.pop("quality_vote_count", None)
-            ret.pop("difficulty_vote_count", None)
-
-        return ret
+        # Each needs queries of its own (or a prefetch in CoursesDetailAPI).
+        expandable_fields = (
+            "xlist",
+            "review_set",
+            "courseoffering_set",
+            "professors_and_review_count",
+            "difficulty_vote",
+            "quality_vote",
+            "can_write_review",
+            "instructors",
+        )
+        # Scores and votes are for logged-in users only.
+        authenticated_fields = (
+            "difficulty_score",
+            "quality_score",
+            "quality_vote_count",
+            "difficulty_vote_count",
+            "difficulty_vote",
+            "quality_vote",
+        )
 
     def get_review_set(self, obj):
         request = self.context.get("request")
-        if request and request.user.is_authenticated:
+        # Documents (apps.web.read_model) keep the reviews for logged-in users.
+        if self.context.get("document") or (request and request.user.is_authenticated):
             return ReviewSerializer(
                 obj.review_set.all(), many=True, context=self.context
             ).data
         return []
 
     def get_review_count(self, obj):
-        return getattr(obj, "review_count", obj.review_set.count())
+        if hasattr(obj, "review_count"):
+            return obj.review_count
+        return obj.review_set.count()
 
     def get_quality_score(self, obj):
         return getattr(obj, "quality_score", 0.0)
@@ -277,6 +487,9 @@ class CourseSerializer(serializers.ModelSerializer):
         ]
 
     def get_professors_and_review_count(self, obj):
+        batch = self.context.get("batch")
+        if batch is not None:
+            return batch["professors"][obj.id]
         professors_and_review_count = list(
             obj.review_set.values("professor")
             .annotate(Count("professor"))
@@ -301,7 +514,7 @@ class CourseSerializer(serializers.ModelSerializer):
     def get_difficulty_vote(self, obj):
         request = self.context.get("request")
         if request and request.user.is_authenticated:
-            vote, _ = Vote.objects.for_course_and_user(obj, request.user)
+            vote, _ = self._user_votes(obj, request.user)
             if vote and vote.value > 0:
                 return {"value": vote.value}
         return None
@@ -309,31 +522,92 @@ class CourseSerializer(serializers.ModelSerializer):
     def get_quality_vote(self, obj):
         request = self.context.get("request")
         if request and request.user.is_authenticated:
-            _, vote = Vote.objects.for_course_and_user(obj, request.user)
+            _, vote = self._user_votes(obj, request.user)
             if vote and vote.value > 0:
                 return {"value": vote.value}
         return None
 
     def get_quality_vote_count(self, obj):
-        return getattr(
-            obj, "quality_vote_count", Vote.objects.get_vote_count(obj, "quality")
-        )
+        if hasattr(obj, "quality_vote_count"):
+            return obj.quality_vote_count
+        return Vote.objects.get_vote_count(obj, "quality")
 
     def get_difficulty_vote_count(self, obj):
-        return getattr(
-            obj, "difficulty_vote_count", Vote.objects.get_vote_count(obj, "difficulty")
-        )
+        if hasattr(obj, "difficulty_vote_count"):
+            return obj.difficulty_vote_count
+        return Vote.objects.get_vote_count(obj, "difficulty")
 
     def get_can_write_review(self, obj):
         request = self.context.get("request")
         if request and request.user.is_authenticated:
+            batch = self.context.get("batch")
+            if batch is not None:
+                return obj.id not in batch["reviewed"]
             return Review.objects.user_can_write_review(request.user.id, obj.id)
         return False
 
+    def _user_votes(self, obj, user):
+        batch = self.context.get("batch")
+        if batch is not None:
+            return batch["votes"].get(obj.id, (None, None))
+        return Vote.objects.for_course_and_user(obj, user)
+
     def get_instructors(self, obj):
         """Return a list of instructor names for the course"""
-        instructors = obj.get_instructors()
+        # read_model.render passes the term its documents are rendered for.
+        instructors = obj.get_instructors(self.context.get("term", CURRENT))
         return [instructor.name for instructor in instructors]
 
     def get_course_topics(self, obj):
         return obj.course_topics
+
+
+def course_batch_context(course_ids, request, selected):
+    """
+    What `CourseSerializer` would otherwise query once per course, for many
+    courses at once: pass the result as the serializer's `batch` context.
+    Only the parts the `selected` fields read are loaded.
+    """
+    batch = {"professors": {}, "votes": {}, "reviewed": set()}
+    user = request.user if request is not None else None
+
+    if "professors_and_review_count" in selected:
+        professors = {course_id: [] for course_id in course_ids}
+        review_counts = (
+            Review.objects.filter(course_id__in=course_ids)
+            .values("course_id", "professor")
+            .annotate(Count("professor"))
+            .order_by("course_id", "-professor__count")
+            .values_list("course_id", "professor", "professor__count")
+        )
+        for course_id, professor, count in review_counts:
+            professors[course_id].append((professor, count))
+        instructors = (
+            Instructor.objects.filter(courseoffering__course_id__in=course_ids)
+            .values_list("courseoffering__course_id", "name")
+            .distinct()
+        )
+        for course_id, name in instructors:
+            if name not in {professor for professor, _ in professors[course_id]}:
+                professors[course_id].append((name, 0))
+        batch["professors"] = professors
+
+    if user is None or not user.is_authenticated:
+        return batch
+
+    if {"difficulty_vote", "quality_vote"} & set(selected):
+        for vote in Vote.objects.filter(course_id__in=course_ids, user=user):
+            difficulty, quality = batch["votes"].get(vote.course_id, (None, None))
+            if vote.category == Vote.CATEGORIES.DIFFICULTY:
+                difficulty = vote
+            if vote.category == Vote.CATEGORIES.QUALITY:
+                quality = vote
+            batch["votes"][vote.course_id] = (difficulty, quality)
+
+    if "can_write_review" in selected:
+        batch["reviewed"] = set(
+            Review.objects.filter(course_id__in=course_ids, user=user).values_list(
+                "course_id", flat=True
+            )
+        )
+    return batch
@@ -0,0 +1,201 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from apps.web import facets, read_model, stats
+from apps.web.conditional import CATALOG_SCOPE, bump_versions, course_scope
+from apps.web.models import (
+    Course,
+    CourseMedian,
+    CourseOffering,
+    OfferedCourse,
+    Review,
+    ReviewVote,
+    Vote,
+)
+
+
+def _bump_course(course_id, *extra_scopes):
+    bump_versions(CATALOG_SCOPE, course_scope(course_id), *extra_scopes)
+
+
+@receiver([post_save, post_delete], sender=Course)
+def course_changed(sender, instance, **kwargs):
+    _bump_course(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=CourseOffering)
+@receiver([post_save, post_delete], sender=CourseMedian)
+@receiver([post_save, post_delete], sender=Vote)
+def course_child_changed(sender, instance, **kwargs):
+    _bump_course(instance.course_id)
+
+
+@receiver([post_save, post_delete], sender=CourseOffering)
+def offering_terms_changed(sender, instance, **kwargs):
+    OfferedCourse.objects.sync_course(instance.course_id)
+
+
+@receiver(post_save, sender=Course)
+def course_saved(sender, instance, **kwargs):
+    # A save from a stale instance writes back old denormalized values.
+    Course.objects.refresh_offered([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=CourseOffering)
+@receiver([post_save, post_delete], sender=CourseMedian)
+def course_terms_changed(sender, instance, **kwargs):
+    Course.objects.refresh_offered([instance.course_id])
+
+
+@receiver([post_save, post_delete], sender=Review)
+def review_changed(sender, instance, **kwargs):
+    _bump_course(instance.course_id)
+
+
+@receiver([post_save, post_delete], sender=ReviewVote)
+def review_vote_changed(sender, instance, **kwargs):
+    # The review may already be gone when its votes are cascade-deleted; the
+    # review's own post_delete bumps the course in that case.
+    course_id = (
+        Review.objects.filter(pk=instance.review_id)
+        .values_list("course_id", flat=True)
+        .first()
+    )
+    if course_id is not None:
+        _bump_course(course_id)
+        # The review's kudos and dislike counts are in the course's document.
+        read_model.course_changed([course_id], "reviewvote")
+
+
+def _related_course_ids(sender, instance, pk_set):
+    """The courses on either side of a distribs or crosslisting change."""
+    if isinstance(instance, Course):
+        course_ids = {instance.pk}
+        if sender is Course.crosslisted_courses.through:
+            course_ids |= pk_set or set()
+        return course_ids
+    return pk_set or set()
+
+
+@receiver(m2m_changed, sender=Course.distribs.through)
+@receiver(m2m_changed, sender=Course.crosslisted_courses.through)
+def course_relations_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    course_ids = _related_course_ids(sender, instance, pk_set)
+    bump_versions(CATALOG_SCOPE, *(course_scope(pk) for pk in course_ids))
+
+
+@receiver(m2m_changed, sender=CourseOffering.instructors.through)
+def offering_instructors_changed(sender, instance, action, reverse, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if isinstance(instance, CourseOffering):
+        _bump_course(instance.course_id)
+    else:
+        bump_versions(CATALOG_SCOPE)
+
+
+@receiver([post_save, post_delete], sender=Course)
+def course_facets_changed(sender, instance, **kwargs):
+    facets.courses_changed([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=CourseOffering)
+@receiver([post_save, post_delete], sender=CourseMedian)
+def course_child_facets_changed(sender, instance, **kwargs):
+    facets.courses_changed([instance.course_id])
+
+
+@receiver(m2m_changed, sender=Course.distribs.through)
+def distribs_facets_changed(sender, instance, action, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if isinstance(instance, Course):
+        facets.courses_changed([instance.pk])
+    else:
+        facets.courses_changed(pk_set or ())
+
+
+@receiver(m2m_changed, sender=CourseOffering.instructors.through)
+def instructors_facets_changed(sender, instance, action, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if isinstance(instance, CourseOffering):
+        facets.courses_changed([instance.course_id])
+    else:
+        facets.courses_changed(
+            CourseOffering.objects.filter(pk__in=pk_set or ()).values_list(
+                "course_id", flat=True
+            )
+        )
+
+
+@receiver([post_save, post_delete], sender=Course)
+def course_document_changed(sender, instance, **kwargs):
+    read_model.course_changed([instance.pk], "course")
+
+
+@receiver([post_save, post_delete], sender=CourseOffering)
+@receiver([post_save, post_delete], sender=CourseMedian)
+@receiver([post_save, post_delete], sender=Vote)
+@receiver([post_save, post_delete], sender=Review)
+def course_child_document_changed(sender, instance, **kwargs):
+    read_model.course_changed([instance.course_id], sender._meta.model_name)
+
+
+@receiver(m2m_changed, sender=Course.distribs.through)
+@receiver(m2m_changed, sender=Course.crosslisted_courses.through)
+def course_relations_document_changed(sender, instance, action, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    read_model.course_changed(
+        _related_course_ids(sender, instance, pk_set), sender._meta.model_name
+    )
+
+
+@receiver(m2m_changed, sender=CourseOffering.instructors.through)
+def instructors_document_changed(sender, instance, action, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if isinstance(instance, CourseOffering):
+        course_ids = [instance.course_id]
+    else:
+        course_ids = CourseOffering.objects.filter(pk__in=pk_set or ()).values_list(
+            "course_id", flat=True
+        )
+    read_model.course_changed(course_ids, "instructors")
+
+
+def _count_change(name, signal, created=False):
+    """Adjust a landing counter; returns whether the row count changed."""
+    if signal is post_delete:
+        stats.adjust_counter(name, -1)
+        return True
+    if created:
+        stats.adjust_counter(name, 1)
+        return True
+    return False
+
+
+@receiver([post_save, post_delete], sender=Course)
+def course_counted(sender, instance, signal, created=False, **kwargs):
+    _count_change("course", signal, created)
+
+
+@receiver([post_save, post_delete], sender=Vote)
+def vote_counted(sender, instance, signal, created=False, **kwargs):
+    _count_change("vote", signal, created)
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_counted(sender, instance, signal, created=False, **kwargs):
+    _count_change("user", signal, created)
+
+
+@receiver([post_save, post_delete], sender=Review)
+def review_counted(sender, instance, signal, created=False, **kwargs):
+    if _count_change("review", signal, created):
+        # Recent activity and the term's top courses are derived from reviews.
+        stats.invalidate_snapshot()
@@ -0,0 +1,165 @@
+"""
+Site-wide statistics served by the landing page.
+
+Row counts are kept as cache counters that are adjusted by the signal
+handlers on every insert/delete and periodically reconciled against the
+database by `apps.web.tasks.reconcile_statistics`. The slower-moving parts of
+the landing payload (recent activity, top courses of the term) are stored as
+one precomputed snapshot next to the counters, so a landing request is a
+single `get_many` round trip. Review writes drop the snapshot and the next
+landing request rebuilds it.
+
+When the cache is cold, counters fall back to the planner's row estimates
+(`pg_class.reltuples`) instead of a full `COUNT(*)`.
+"""
+
+import logging
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count
+
+from apps.web.conditional import STATS_SCOPE, bump_versions
+from apps.web.models import Course, Review, Vote
+from lib import constants
+
+logger = logging.getLogger(__name__)
+
+COUNTED_MODELS = {
+    "review": Review,
+    "course": Course,
+    "user": User,
+    "vote": Vote,
+}
+
+COUNTER_KEY_FMT = "stats:count:{}"
+SNAPSHOT_KEY = "stats:snapshot"
+
+RECENT_REVIEWS_LIMIT = 5
+TOP_COURSES_LIMIT = 5
+
+
+def _counter_key(name):
+    return COUNTER_KEY_FMT.format(name)
+
+
+def adjust_counter(name, delta):
+    """Apply a write to a counter. Cold counters are left for reconciliation."""
+    try:
+        cache.incr(_counter_key(name), delta)
+    except ValueError:
+        pass
+    bump_versions(STATS_SCOPE)
+
+
+def estimated_count(model):
+    """
+    Cheap row count for a cold cache.
+
+    On PostgreSQL this reads the planner statistics instead of scanning the
+    table; `reltuples` is -1 for tables that have never been analyzed, in
+    which case (and on other backends) it falls back to an exact count.
+    """
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        if row and row[0] >= 0:
+            return row[0]
+    return model.objects.count()
+
+
+def build_snapshot():
+    """Compute the precomputed (non-counter) part of the landing payload."""
+    recent_reviews = [
+        {
+            "course_id": course_id,
+            "course_code": course_code,
+            "course_title": course_title,
+            "term": term,
+            "created_at": created_at.isoformat(),
+        }
+        for course_id, course_code, course_title, term, created_at in (
+            Review.objects.order_by("-created_at").values_list(
+                "course_id",
+                "course__course_code",
+                "course__course_title",
+                "term",
+                "created_at",
+            )[:RECENT_REVIEWS_LIMIT]
+        )
+    ]
+
+    top_courses = [
+        {
+            "id": course_id,
+            "course_code": course_code,
+            "course_title": course_title,
+            "review_count": review_count,
+        }
+        for course_id, course_code, course_title, review_count in (
+            Course.objects.filter(courseoffering__term=constants.CURRENT_TERM)
+            .annotate(review_count=Count("review", distinct=True))
+            .filter(review_count__gt=0)
+            .order_by("-review_count", "course_code")
+            .values_list("id", "course_code", "course_title", "review_count")[
+                :TOP_COURSES_LIMIT
+            ]
+        )
+    ]
+
+    return {
+        "term": constants.CURRENT_TERM,
+        "recent_reviews": recent_reviews,
+        "top_courses": top_courses,
+    }
+
+
+def reconcile():
+    """Recount every counter and rebuild the snapshot from the database."""
+    values = {
+        _counter_key(name): model.objects.count()
+        for name, model in COUNTED_MODELS.items()
+    }
+    values[SNAPSHOT_KEY] = build_snapshot()
+    cache.set_many(values, timeout=None)
+    bump_versions(STATS_SCOPE)
+    logger.info("Reconciled landing statistics")
+    return values
+
+
+def invalidate_snapshot():
+    """
+    Drop the snapshot once the current transaction commits; the next
+    `landing_stats` call rebuilds it, so writers don't pay for the aggregates.
+    """
+
+    def invalidate():
+        cache.delete(SNAPSHOT_KEY)
+        bump_versions(STATS_SCOPE)
+
+    transaction.on_commit(invalidate)
+
+
+def landing_stats():
+    """Return the landing payload from a single cache read."""
+    keys = [_counter_key(name) for name in COUNTED_MODELS] + [SNAPSHOT_KEY]
+    values = cache.get_many(keys)
+
+    payload = {}
+    for name, model in COUNTED_MODELS.items():
+        count = values.get(_counter_key(name))
+        payload[f"{name}_count"] = (
+            count if count is not None else estimated_count(model)
+        )
+
+    snapshot = values.get(SNAPSHOT_KEY)
+    if snapshot is None:
+        snapshot = build_snapshot()
+        cache.set(SNAPSHOT_KEY, snapshot, timeout=None)
+    payload.update(snapshot)
+    return payload
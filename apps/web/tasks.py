@@ -0,0 +1,55 @@
+from celery import shared_task
+from django.core.cache import cache
+
+from apps.web import facets, read_model, stats
+from apps.web.conditional import CATALOG_SCOPE, bump_versions
+from apps.web.models import Course
+from lib import constants, task_utils
+
+# The term Course.is_offered_current_term was last computed for.
+OFFERED_TERM_KEY = "courses:offered_term"
+
+
+@shared_task
+@task_utils.email_if_fails
+def reconcile_statistics():
+    stats.reconcile()
+
+
+@shared_task
+@task_utils.email_if_fails
+def rebuild_facets():
+    facets.rebuild()
+
+
+@shared_task
+@task_utils.email_if_fails
+def roll_over_current_term():
+    """
+    Recompute the courses' denormalized current-term flags, and queue their
+    documents for rebuilding, once the term changes. The term is worked out
+    afresh, as constants.CURRENT_TERM is fixed when a worker starts.
+    """
+    term = constants.get_current_term()
+    if cache.get(OFFERED_TERM_KEY) == term:
+        return
+    Course.objects.refresh_offered(term=term)
+    facets.rebuild()
+    # The documents list the current term's instructors.
+    read_model.course_changed(
+        Course.objects.values_list("pk", flat=True), "current_term"
+    )
+    bump_versions(CATALOG_SCOPE)
+    cache.set(OFFERED_TERM_KEY, term, timeout=None)
+
+
+@shared_task
+@task_utils.email_if_fails
+def process_course_changes():
+    read_model.process_changes()
+
+
+@shared_task
+@task_utils.email_if_fails
+def check_course_documents():
+    read_model.check()
@@ -1,7 +1,9 @@
+import random
+
 import factory
 from django.contrib.auth.models import User
 
-from apps.web import models
+from apps.web import models, read_model
 from lib import constants
 
 
@@ -9,7 +11,7 @@ class UserFactory(factory.django.DjangoModelFactory):
     class Meta:
         model = User
 
-    username = factory.Faker("first_name")
+    username = factory.Sequence(lambda n: "user{}".format(n))
     email = factory.Faker("email")
     first_name = factory.Faker("first_name")
     last_name = factory.Faker("last_name")
@@ -32,7 +34,8 @@ class CourseFactory(factory.django.DjangoModelFactory):
     class Meta:
         model = models.Course
 
-    title = factory.Faker("words")
+    course_code = factory.Sequence(lambda n: "COSC{:04d}".format(n))
+    course_title = factory.Faker("sentence")
     department = "COSC"
     number = factory.Faker("random_number")
     url = factory.Faker("url")
@@ -75,7 +78,6 @@ class StudentFactory(factory.django.DjangoModelFactory):
         model = models.Student
 
     user = factory.SubFactory(UserFactory)
-    confirmation_link = User.objects.make_random_password(length=16)
 
 
 class VoteFactory(factory.django.DjangoModelFactory):
@@ -86,3 +88,82 @@ class VoteFactory(factory.django.DjangoModelFactory):
     course = factory.SubFactory(CourseFactory)
     user = factory.SubFactory(UserFactory)
     category = models.Vote.CATEGORIES.QUALITY
+
+
+class InstructorFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = models.Instructor
+
+    name = factory.Sequence(lambda n: "Instructor {}".format(n))
+
+
+VOTE_CATEGORIES = (models.Vote.CATEGORIES.QUALITY, models.Vote.CATEGORIES.DIFFICULTY)
+WORDS = "course lecture exam homework professor great hard easy fair curve".split()
+DEPARTMENTS = ("COSC", "MATH", "ECON", "PHYS", "CHEM", "HIST")
+TERMS = ("23F", "24W", "24S", "24X", "24F", constants.CURRENT_TERM)
+
+
+def seed_catalog(
+    courses=2000, users=200, reviews=3000, votes=4000, review_votes=3000, seed=0
+):
+    """
+    Bulk-insert a realistic catalog: courses in a few departments with one
+    to three offerings each (with instructors), and reviews, course votes and
+    review votes spread over them. Rows are built with the factories above
+    and inserted with `bulk_create`, so signals do not run; the offered-term
+    index and columns are refreshed as the importers would, and the course
+    documents built.
+    """
+    rng = random.Random(seed)
+    users = User.objects.bulk_create(UserFactory.build_batch(users))
+    instructors = models.Instructor.objects.bulk_create(
+        InstructorFactory.build_batch(max(len(users) // 2, 1))
+    )
+    courses = models.Course.objects.bulk_create(
+        CourseFactory.build(department=rng.choice(DEPARTMENTS), number=number)
+        for number in range(courses)
+    )
+
+    offerings = models.CourseOffering.objects.bulk_create(
+        CourseOfferingFactory.build(course=course, term=term, section=1)
+        for course in courses
+        for term in rng.sample(TERMS, rng.randint(1, 3))
+    )
+    Through = models.CourseOffering.instructors.through
+    Through.objects.bulk_create(
+        Through(courseoffering=offering, instructor=rng.choice(instructors))
+        for offering in offerings
+    )
+    # What the importers do after a bulk import.
+    models.OfferedCourse.objects.refresh()
+    models.Course.objects.refresh_offered()
+
+    reviews = models.Review.objects.bulk_create(
+        ReviewFactory.build(
+            course=rng.choice(courses),
+            user=rng.choice(users),
+            term=rng.choice(TERMS),
+            comments=" ".join(rng.choice(WORDS) for _ in range(40)),
+        )
+        for _ in range(reviews)
+    )
+
+    course_votes = {
+        (rng.choice(courses), rng.choice(users), rng.choice(VOTE_CATEGORIES))
+        for _ in range(votes)
+    }
+    models.Vote.objects.bulk_create(
+        VoteFactory.build(
+            course=course, user=user, category=category, value=rng.randint(1, 5)
+        )
+        for course, user, category in course_votes
+    )
+
+    pairs = {(rng.choice(reviews), rng.choice(users)) for _ in range(review_votes)}
+    models.ReviewVote.objects.bulk_create(
+        models.ReviewVote(review=review, user=user, is_kudos=rng.random() < 0.7)
+        for review, user in pairs
+    )
+    # What the document worker would build from the changes recorded.
+    read_model.check(workers=1)
+    return {"users": users, "courses": courses, "reviews": reviews}
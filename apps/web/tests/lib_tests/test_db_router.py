@@ -0,0 +1,138 @@
+import time
+
+from asgiref.sync import iscoroutinefunction
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from apps.web import conditional
+from apps.web.models import Course
+from apps.web.tests import factories
+from lib import db_router
+
+# A second, independent SQLite database standing in for a replica: rows
+# created on only one of the two show which database a request read from.
+# It is registered on import, so the test runner creates and migrates it
+# along with the default database.
+REPLICA = "replica_test"
+connections.settings[REPLICA] = connections.configure_settings(
+    {
+        "default": {},
+        REPLICA: {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"},
+    }
+)[REPLICA]
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA], DATABASE_STICKY_SECONDS=10)
+class ReplicaRoutingTestCase(TestCase):
+    databases = {"default", REPLICA}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = factories.UserFactory()
+        cls.course = factories.CourseFactory()
+        # Replicated rows.
+        User.objects.using(REPLICA).bulk_create([User(**cls._fields(cls.user))])
+        Course.objects.using(REPLICA).bulk_create([Course(**cls._fields(cls.course))])
+
+    @staticmethod
+    def _fields(obj):
+        return {
+            field.attname: getattr(obj, field.attname) for field in obj._meta.fields
+        }
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def _detail(self, course):
+        return self.client.get(reverse("course_detail_api", args=[course.id]))
+
+    def test_safe_requests_read_from_the_replica(self):
+        primary_only = factories.CourseFactory()
+        replica_only = Course.objects.using(REPLICA).create(
+            id=primary_only.id + 1, course_code="REP101", department="REP", number=101
+        )
+
+        self.assertEqual(self._detail(replica_only).status_code, 200)
+        self.assertEqual(self._detail(primary_only).status_code, 404)
+
+    def test_recently_written_scopes_are_read_from_the_primary(self):
+        primary_only = factories.CourseFactory()
+        replica_only = Course.objects.using(REPLICA).create(
+            id=primary_only.id + 1, course_code="REP101", department="REP", number=101
+        )
+        scope = conditional.course_scope(replica_only.id)
+
+        # Another client's write just committed; the replica may lag behind.
+        with self.captureOnCommitCallbacks(execute=True):
+            conditional.bump_versions(scope)
+        self.assertEqual(self._detail(replica_only).status_code, 404)
+
+        # Once the lag budget has passed, the replica serves it again.
+        cache.set(conditional._version_key(scope), time.time() - 60)
+        self.assertEqual(self._detail(replica_only).status_code, 200)
+
+    def test_writes_stick_the_client_to_the_primary(self):
+        response = self.client.post(
+            reverse("course_vote_api", args=[self.course.id]),
+            {"value": 4, "forLayup": False},
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        sticky = response.cookies[db_router.STICKY_COOKIE]
+        self.assertEqual(sticky["max-age"], 10)
+        # The vote is on the primary only, and the next read sees it.
+        detail = self._detail(self.course).json()
+        self.assertEqual(detail["quality_vote"], {"value": 4})
+
+        # Once the cookie and the course's recent stamp have expired, reads
+        # go to the replica again.
+        self.client.cookies.pop(db_router.STICKY_COOKIE)
+        cache.set(
+            conditional._version_key(conditional.course_scope(self.course.id)),
+            time.time() - 60,
+        )
+        self.assertIsNone(self._detail(self.course).json()["quality_vote"])
+
+    def test_reads_without_writes_are_not_sticky(self):
+        response = self._detail(self.course)
+
+        self.assertNotIn(db_router.STICKY_COOKIE, response.cookies)
+
+    def test_unsafe_requests_read_from_the_primary(self):
+        primary_only = factories.CourseFactory()
+
+        response = self.client.post(
+            reverse("course_vote_api", args=[primary_only.id]),
+            {"value": 3, "forLayup": True},
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+
+    async def test_async_views_are_routed_without_a_thread_switch(self):
+        seen = []
+
+        async def view(request):
+            seen.append(db_router._replica.get())
+            db_router.ReplicaRouter().db_for_write(Course)
+            return HttpResponse()
+
+        routing = db_router.ReplicaRoutingMiddleware(view)
+
+        self.assertTrue(iscoroutinefunction(routing))
+        response = await routing(RequestFactory().get("/"))
+        self.assertEqual(seen, [REPLICA])
+        self.assertIn(db_router.STICKY_COOKIE, response.cookies)
+        self.assertIsNone(db_router._replica.get())
+
+    def test_queries_outside_requests_use_the_primary(self):
+        router = db_router.ReplicaRouter()
+
+        self.assertEqual(router.db_for_read(Course), db_router.PRIMARY)
+        self.assertFalse(router.allow_migrate(REPLICA, "web"))
@@ -0,0 +1,83 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+from django.test import SimpleTestCase, override_settings
+
+from lib import http_client
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def setup(self):
+        # One handler instance per accepted TCP connection.
+        self.server.connections += 1
+        super().setup()
+
+    def do_GET(self):
+        body = b'{"success": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class HttpClientTestCase(SimpleTestCase):
+    REQUESTS = 10
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        self.server.connections = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/"
+
+    def test_pooled_client_reuses_one_connection(self):
+        for _ in range(self.REQUESTS):
+            response = http_client.run(http_client.request("GET", self.url))
+            self.assertEqual(response.json(), {"success": True})
+
+        self.assertEqual(self.server.connections, 1)
+
+    def test_client_per_request_opens_a_connection_each_time(self):
+        # The pattern the pooled client replaces: one handshake per call.
+        async def fetch():
+            async with httpx.AsyncClient() as client:
+                return await client.get(self.url)
+
+        for _ in range(self.REQUESTS):
+            asyncio.run(fetch())
+
+        self.assertEqual(self.server.connections, self.REQUESTS)
+
+    def test_latency_is_recorded_per_host(self):
+        before = http_client.latency_histograms().get("127.0.0.1", {"count": 0})
+
+        for _ in range(3):
+            http_client.run(http_client.request("GET", self.url))
+
+        histogram = http_client.latency_histograms()["127.0.0.1"]
+        self.assertEqual(histogram["count"] - before["count"], 3)
+        self.assertEqual(histogram["buckets"]["+Inf"], histogram["count"])
+
+    @override_settings(
+        HTTP_CLIENT={
+            "HTTP2": False,
+            "TIMEOUT": 30,
+            "MAX_CONNECTIONS": 50,
+            "HOSTS": {"slow.example": {"TIMEOUT": 60}},
+        }
+    )
+    def test_host_settings_override_defaults(self):
+        self.assertEqual(
+            http_client.host_settings("slow.example"),
+            {"HTTP2": False, "TIMEOUT": 60, "MAX_CONNECTIONS": 50},
+        )
+        self.assertEqual(http_client.host_settings("other.example")["TIMEOUT"], 30)
@@ -0,0 +1,164 @@
+from asgiref.sync import iscoroutinefunction
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from apps.web.models import Course
+from apps.web.tests import factories
+from lib import metrics, middleware
+
+METRICS = {
+    "ENABLED": True,
+    "SAMPLE_RATE": 1.0,
+    "SLOW_REQUEST_MS": 60000,
+    "SERVER_TIMING": True,
+    "TOKEN": None,
+    "ALLOWED_IPS": ["127.0.0.1"],
+    "N_PLUS_ONE_THRESHOLD": 10,
+}
+
+DETAIL_VIEW = "apps.web.views.CoursesDetailAPI"
+
+
+@override_settings(METRICS=METRICS)
+class PerformanceMiddlewareTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course = factories.CourseFactory()
+        self.url = reverse("course_detail_api", args=[self.course.id])
+
+    def test_sampled_request_gets_server_timing(self):
+        response = self.client.get(self.url)
+
+        timing = response.headers["Server-Timing"]
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertIn("serialize;dur=", timing)
+        self.assertRegex(timing, r'cache;desc="[1-9]\d* hits, \d+ misses"')
+
+    async def test_async_stacks_are_timed_without_a_thread_switch(self):
+        async def view(request):
+            return HttpResponse()
+
+        performance = middleware.PerformanceMiddleware(view)
+
+        self.assertTrue(iscoroutinefunction(performance))
+        response = await performance(RequestFactory().get("/"))
+        self.assertIn("total;dur=", response.headers["Server-Timing"])
+
+    def test_request_is_recorded_by_view(self):
+        before = metrics.view_metrics().get(DETAIL_VIEW, {"requests": 0})
+
+        self.client.get(self.url)
+        self.client.get(self.url)
+
+        after = metrics.view_metrics()[DETAIL_VIEW]
+        self.assertEqual(after["requests"] - before["requests"], 2)
+        self.assertGreater(after["db_queries"], 0)
+
+    @override_settings(METRICS=dict(METRICS, SAMPLE_RATE=0.0))
+    def test_unsampled_request_has_no_breakdown(self):
+        response = self.client.get(self.url)
+
+        self.assertNotIn("Server-Timing", response.headers)
+
+    @override_settings(METRICS=dict(METRICS, SLOW_REQUEST_MS=0))
+    def test_slow_requests_are_logged(self):
+        with self.assertLogs("lib.middleware", "WARNING") as logs:
+            self.client.get(self.url)
+
+        self.assertIn(DETAIL_VIEW, logs.output[0])
+
+    def test_metrics_endpoint(self):
+        self.client.get(self.url)
+
+        response = self.client.get(reverse("metrics"))
+
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn(
+            f'coursereview_request_duration_seconds_count{{view="{DETAIL_VIEW}"}}',
+            body,
+        )
+        self.assertIn(f'coursereview_db_queries_total{{view="{DETAIL_VIEW}"}}', body)
+
+    def test_metrics_endpoint_rejects_other_clients(self):
+        response = self.client.get(reverse("metrics"), REMOTE_ADDR="10.1.2.3")
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_metrics_endpoint_rejects_requests_relayed_by_a_local_proxy(self):
+        response = self.client.get(
+            reverse("metrics"), HTTP_X_FORWARDED_FOR="203.0.113.7"
+        )
+
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(METRICS=dict(METRICS, TOKEN="secret"))
+    def test_metrics_endpoint_requires_the_token_when_configured(self):
+        url = reverse("metrics")
+
+        self.assertEqual(self.client.get(url).status_code, 403)
+        response = self.client.get(url, headers={"Authorization": "Bearer secret"})
+        self.assertEqual(response.status_code, 200)
+
+
+class RenderTestCase(SimpleTestCase):
+    def test_histograms_are_cumulative_in_seconds(self):
+        metrics.record_request("render.view", 200, 7.0)
+        metrics.record_request("render.view", 503, 70.0)
+
+        body = metrics.render(
+            http_client_histograms={
+                "wj.example": {
+                    "count": 1,
+                    "sum_ms": 30.0,
+                    "buckets": {"25": 0, "50": 1, "+Inf": 1},
+                }
+            },
+            rate_limit_rejects={"course_vote": 3},
+        )
+
+        self.assertIn(
+            'coursereview_request_duration_seconds_bucket{view="render.view",le="0.01"} 1',
+            body,
+        )
+        self.assertIn(
+            'coursereview_request_duration_seconds_bucket{view="render.view",le="+Inf"} 2',
+            body,
+        )
+        self.assertIn('coursereview_request_errors_total{view="render.view"} 1', body)
+        self.assertIn(
+            'coursereview_http_client_duration_seconds_bucket{host="wj.example",le="0.05"} 1',
+            body,
+        )
+        self.assertIn(
+            'coursereview_rate_limit_rejects_total{route="course_vote"} 3', body
+        )
+
+
+class QueryShapeTestCase(SimpleTestCase):
+    def test_literals_and_in_lists_collapse(self):
+        self.assertEqual(
+            middleware.sql_shape(
+                "SELECT *  FROM t WHERE id IN (%s, %s, %s) AND name = 'x' LIMIT 21"
+            ),
+            "SELECT * FROM t WHERE id IN (...) AND name = ? LIMIT ?",
+        )
+
+
+@override_settings(METRICS=dict(METRICS, N_PLUS_ONE_THRESHOLD=3))
+class NPlusOneMiddlewareTestCase(TestCase):
+    def test_repeated_queries_are_logged(self):
+        courses = [factories.CourseFactory() for _ in range(3)]
+
+        def view(request):
+            for course in courses:
+                Course.objects.filter(id=course.id).exists()
+            return HttpResponse()
+
+        with self.assertLogs("lib.middleware", "WARNING") as logs:
+            middleware.NPlusOneMiddleware(view)(RequestFactory().get("/"))
+
+        self.assertIn("3 queries of shape", logs.output[0])
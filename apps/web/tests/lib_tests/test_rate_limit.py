@@ -0,0 +1,192 @@
+from unittest import mock
+
+import fakeredis
+from django.contrib.auth.models import User
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.web.tests.factories import CourseFactory
+from lib import rate_limit
+
+RATE_LIMIT = {
+    "ENABLED": True,
+    "RATE": None,
+    "KEY": "user",
+    "METHODS": None,
+    "ROUTES": {
+        "course_vote": {"RATE": "2/min"},
+        "review_create": {"RATE": "1/hour", "METHODS": ["POST"]},
+        "ip_route": {"RATE": "1/min", "KEY": "ip"},
+    },
+}
+
+
+@override_settings(RATE_LIMIT=RATE_LIMIT)
+class RateLimitTestCase(TestCase):
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis()
+        patcher = mock.patch.object(
+            rate_limit, "get_redis_connection", lambda alias: self.redis
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_parse_rate(self):
+        self.assertEqual(rate_limit.parse_rate("10/min"), (10, 60))
+        self.assertEqual(rate_limit.parse_rate("5/hour"), (5, 3600))
+        self.assertEqual(rate_limit.parse_rate("1/s"), (1, 1))
+
+    def test_route_settings_override_defaults(self):
+        options = rate_limit.route_settings("ip_route")
+        self.assertEqual(options["RATE"], "1/min")
+        self.assertEqual(options["KEY"], "ip")
+        self.assertIsNone(rate_limit.route_settings("unknown")["RATE"])
+
+    def test_limit_within_a_window(self):
+        decisions = [rate_limit.check("r", "a", "3/min", now=60.0) for _ in range(4)]
+
+        self.assertEqual([d.allowed for d in decisions], [True, True, True, False])
+        self.assertGreater(decisions[-1].retry_after, 0)
+        self.assertTrue(rate_limit.check("r", "b", "3/min", now=60.0).allowed)
+
+    def test_previous_window_is_weighted_by_overlap(self):
+        for _ in range(4):
+            rate_limit.check("r", "a", "4/min", now=0.0)
+
+        # 15s into the next window 3/4 of the previous window still counts.
+        self.assertTrue(rate_limit.check("r", "a", "4/min", now=75.0).allowed)
+        self.assertFalse(rate_limit.check("r", "a", "4/min", now=75.0).allowed)
+        # 45s in only 1/4 of it does.
+        self.assertTrue(rate_limit.check("r", "a", "4/min", now=105.0).allowed)
+        self.assertTrue(rate_limit.check("r", "a", "4/min", now=105.0).allowed)
+        self.assertFalse(rate_limit.check("r", "a", "4/min", now=105.0).allowed)
+
+    def test_rejections_are_counted_per_route(self):
+        for _ in range(3):
+            rate_limit.check("votes", "a", "1/min", now=0.0)
+        rate_limit.check("logins", "a", "1/min", now=0.0)
+
+        self.assertEqual(rate_limit.reject_counts(), {"votes": 2})
+
+    def test_zero_limit_rejects_without_the_script(self):
+        decision = rate_limit.check("r", "a", "0/min", now=30.0)
+
+        self.assertEqual(decision, rate_limit.Decision(False, 60))
+        self.assertEqual(rate_limit.reject_counts(), {"r": 1})
+
+    def test_client_ip_ignores_forwarded_headers_from_untrusted_peers(self):
+        request = RequestFactory().post(
+            "/",
+            REMOTE_ADDR="203.0.113.7",
+            HTTP_X_FORWARDED_FOR="1.2.3.4",
+            HTTP_CF_CONNECTING_IP="5.6.7.8",
+        )
+
+        self.assertEqual(rate_limit.client_ip(request), "203.0.113.7")
+
+    @override_settings(RATE_LIMIT={**RATE_LIMIT, "TRUSTED_PROXIES": ["10.0.0.0/8"]})
+    def test_client_ip_is_the_right_most_untrusted_hop(self):
+        request = RequestFactory().post(
+            "/",
+            REMOTE_ADDR="10.0.0.1",
+            HTTP_X_FORWARDED_FOR="1.2.3.4, 198.51.100.9, 10.0.0.2",
+        )
+
+        self.assertEqual(rate_limit.client_ip(request), "198.51.100.9")
+
+    def test_forwarding_without_trusted_proxies_warns_once(self):
+        rate_limit._warned["forwarding"] = False
+        self.addCleanup(rate_limit._warned.update, forwarding=False)
+        request = RequestFactory().post(
+            "/", REMOTE_ADDR="127.0.0.1", HTTP_X_FORWARDED_FOR="1.2.3.4"
+        )
+
+        with self.assertLogs("lib.rate_limit", "WARNING") as logs:
+            rate_limit.client_ip(request)
+            rate_limit.client_ip(request)
+
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("TRUSTED_PROXIES", logs.output[0])
+
+    @override_settings(RATE_LIMIT={**RATE_LIMIT, "TRUSTED_PROXIES": ["127.0.0.1"]})
+    def test_turnstile_never_gets_a_proxy_address(self):
+        factory = RequestFactory()
+        cases = [
+            ({"REMOTE_ADDR": "203.0.113.7"}, "203.0.113.7"),
+            (
+                {
+                    "REMOTE_ADDR": "127.0.0.1",
+                    "HTTP_X_FORWARDED_FOR": "1.2.3.4, 162.158.0.1",
+                    "HTTP_CF_CONNECTING_IP": "1.2.3.4",
+                },
+                "1.2.3.4",
+            ),
+            ({"REMOTE_ADDR": "127.0.0.1"}, None),
+            ({"REMOTE_ADDR": "10.0.0.1", "HTTP_X_FORWARDED_FOR": "1.2.3.4"}, None),
+        ]
+        for meta, expected in cases:
+            with self.subTest(meta=meta):
+                request = factory.post("/", **meta)
+                self.assertEqual(rate_limit.turnstile_ip(request), expected)
+
+    def test_fails_open_without_redis(self):
+        server = fakeredis.FakeServer()
+        server.connected = False
+        self.redis = fakeredis.FakeRedis(server=server)
+
+        with self.assertLogs("lib.rate_limit", "ERROR"):
+            self.assertTrue(rate_limit.check("r", "a", "1/min").allowed)
+
+    def test_decorator_keys_by_ip(self):
+        @rate_limit.rate_limit("ip_route")
+        def view(request):
+            return "ok"
+
+        factory = RequestFactory()
+        first = factory.post("/", REMOTE_ADDR="10.0.0.1")
+        second = factory.post("/", REMOTE_ADDR="10.0.0.1")
+        other = factory.post("/", REMOTE_ADDR="10.0.0.2")
+
+        self.assertEqual(view(first), "ok")
+        response = view(second)
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+        self.assertEqual(view(other), "ok")
+
+    async def test_decorator_wraps_async_views(self):
+        @rate_limit.rate_limit("ip_route")
+        async def view(request):
+            return "ok"
+
+        factory = RequestFactory()
+
+        self.assertEqual(await view(factory.post("/")), "ok")
+        self.assertEqual((await view(factory.post("/"))).status_code, 429)
+
+    def test_course_vote_is_limited_per_user(self):
+        course = CourseFactory()
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="voter"))
+        url = reverse("course_vote_api", args=[course.id])
+
+        statuses = [
+            client.post(url, {"value": 5, "forLayup": False}, format="json").status_code
+            for _ in range(3)
+        ]
+
+        self.assertEqual(statuses, [200, 200, 429])
+
+    def test_review_creation_throttle_skips_reads(self):
+        course = CourseFactory()
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="writer"))
+        url = reverse("course_review_api", args=[course.id])
+
+        for _ in range(3):
+            self.assertEqual(client.get(url).status_code, 200)
+        client.post(url, {})
+        response = client.post(url, {})
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(rate_limit.reject_counts(), {"review_create": 1})
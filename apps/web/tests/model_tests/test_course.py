@@ -1,7 +1,13 @@
+from unittest import mock
+
+from django.core.cache import cache
 from django.test import TestCase
 
-from apps.web.models import Course, CourseOffering
+from apps.web import tasks
+from apps.web.models import Course, CourseMedian, CourseOffering
 from apps.web.tests import factories
+from lib import constants
+from lib.terms import numeric_value_of_term
 
 
 class CourseTestCase(TestCase):
@@ -85,6 +91,93 @@ class CourseTestCase(TestCase):
             self.assertTrue(time in offered_times or time == "other")
         self.assertTrue("other" in times)
 
+    def test_term_ordinal_follows_the_term(self):
+        self.assertEqual(self.c1o.term_ordinal, 161)
+        self.c1o.term = "15F"
+        self.c1o.save()
+        self.c1o.refresh_from_db()
+        self.assertEqual(self.c1o.term_ordinal, 154)
+
+        (median,) = CourseMedian.objects.bulk_create(
+            [
+                CourseMedian(
+                    course=self.c1, section=1, enrollment=1, median="A", term="16X"
+                )
+            ]
+        )
+        self.assertEqual(median.term_ordinal, 163)
+
+    def test_last_offered_is_the_latest_term(self):
+        factories.CourseOfferingFactory(term="15F", course=self.c1)
+        self.assertEqual(self.c1.last_offered(), self.TEST_TERM)
+
+        CourseOffering.objects.filter(course=self.c2).delete()
+        for term in ("15F", "16W", "15X"):
+            CourseMedian.objects.create(
+                course=self.c2, section=1, enrollment=1, median="A", term=term
+            )
+        self.assertEqual(self.c2.last_offered(), "16W")
+
+    def test_offered_columns_follow_offerings_and_medians(self):
+        factories.CourseOfferingFactory(term=constants.CURRENT_TERM, course=self.c1)
+        CourseOffering.objects.filter(course=self.c2).delete()
+        CourseMedian.objects.create(
+            course=self.c2, section=1, enrollment=1, median="A", term="15X"
+        )
+        # A stale instance does not write back old values.
+        self.c1.save()
+
+        self.assertEqual(
+            set(
+                Course.objects.values_list(
+                    "last_offered_term",
+                    "last_offered_ordinal",
+                    "is_offered_current_term",
+                )
+            ),
+            {
+                (
+                    constants.CURRENT_TERM,
+                    numeric_value_of_term(constants.CURRENT_TERM),
+                    True,
+                ),
+                ("15X", 153, False),
+            },
+        )
+
+    @mock.patch.object(constants, "get_current_term", return_value="16W")
+    def test_roll_over_current_term(self, get_current_term):
+        cache.clear()
+        self.assertFalse(Course.objects.filter(is_offered_current_term=True).exists())
+
+        tasks.roll_over_current_term()
+
+        self.assertEqual(
+            set(Course.objects.filter(is_offered_current_term=True)), {self.c1, self.c2}
+        )
+
+    @mock.patch.object(constants, "get_current_term", return_value="16W")
+    def test_term_defaults_are_worked_out_when_called(self, get_current_term):
+        # A worker started in an earlier term still uses today's.
+        instructor = factories.InstructorFactory()
+        self.c1o.instructors.add(instructor)
+        # The signal handlers refresh c1's flag for the patched term.
+        factories.CourseOfferingFactory(term="15F", course=self.c1)
+
+        self.assertTrue(self.c1.is_offered())
+        self.assertEqual(list(self.c1.get_instructors()), [instructor])
+        self.assertEqual(
+            list(Course.objects.filter(is_offered_current_term=True)), [self.c1]
+        )
+
+    def test_search_reviews_orders_by_term(self):
+        for term in ("15F", "16W", "15S"):
+            factories.ReviewFactory(course=self.c1, term=term, comments="good")
+        self.assertEqual(
+            [review.term for review in self.c1.search_reviews("good")],
+            ["16W", "15F", "15S"],
+        )
+
 
 class CourseSearchTestCase(TestCase):
     DEPARTMENT_4 = "COSC"
@@ -0,0 +1,40 @@
+from django.test import TestCase
+
+from apps.web.models import CourseOffering, OfferedCourse
+from apps.web.tests import factories
+
+
+class OfferedCourseTestCase(TestCase):
+    def setUp(self):
+        self.course = factories.CourseFactory()
+        self.offering = factories.CourseOfferingFactory(course=self.course, term="23F")
+
+    def _terms(self):
+        return set(
+            OfferedCourse.objects.filter(course=self.course).values_list(
+                "term", flat=True
+            )
+        )
+
+    def test_offerings_keep_the_index_in_sync(self):
+        factories.CourseOfferingFactory(course=self.course, term="23F", section=2)
+        self.assertEqual(self._terms(), {"23F"})
+
+        self.offering.term = "24S"
+        self.offering.save()
+        self.assertEqual(self._terms(), {"23F", "24S"})
+
+        CourseOffering.objects.filter(term="23F").delete()
+        self.assertEqual(self._terms(), {"24S"})
+
+    def test_refresh_rebuilds_only_the_given_terms(self):
+        factories.CourseOfferingFactory(course=self.course, term="24S")
+        OfferedCourse.objects.all().delete()
+        OfferedCourse.objects.create(course=factories.CourseFactory(), term="23F")
+
+        OfferedCourse.objects.refresh(["23F"])
+
+        self.assertEqual(self._terms(), {"23F"})
+        self.assertEqual(
+            list(OfferedCourse.objects.course_ids("23F")), [self.course.id]
+        )
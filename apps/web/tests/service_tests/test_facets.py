@@ -0,0 +1,96 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from apps.web import facets
+from apps.web.models import CourseMedian
+from apps.web.tests import factories
+
+
+class FacetIndexTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.art = factories.DistributiveRequirementFactory(name="ART")
+        self.lit = factories.DistributiveRequirementFactory(name="LIT")
+        self.instructor = factories.InstructorFactory(name="Wang Yi")
+
+        self.painting = factories.CourseFactory(course_credits=4)
+        self.painting.distribs.add(self.art)
+        offering = factories.CourseOfferingFactory(course=self.painting)
+        offering.instructors.add(self.instructor)
+        CourseMedian.objects.create(
+            course=self.painting, section=1, enrollment=10, median="A-", term="23F"
+        )
+
+        self.poetry = factories.CourseFactory(course_credits=3)
+        self.poetry.distribs.add(self.art, self.lit)
+        factories.CourseOfferingFactory(course=self.poetry, term="20F")
+
+        self.other = factories.CourseFactory(course_credits=4)
+
+    def _ids(self, **selections):
+        index = facets.get_index()
+        selected = {facet: set(values) for facet, values in selections.items()}
+        return set(index.course_ids(index.match(selected)))
+
+    def test_filters_combine_across_facets(self):
+        painting, poetry = self.painting.id, self.poetry.id
+
+        self.assertEqual(self._ids(distrib=["ART"]), {painting, poetry})
+        self.assertEqual(self._ids(distrib=["ART"], credits=["4"]), {painting})
+        self.assertEqual(
+            self._ids(credits=["3", "4"]), {painting, poetry, self.other.id}
+        )
+        self.assertEqual(self._ids(offered=["current"]), {painting})
+        self.assertEqual(self._ids(instructor=["Wang Yi"], median=["A-"]), {painting})
+        self.assertEqual(self._ids(distrib=["none"]), set())
+
+    def test_counts_ignore_their_own_selection(self):
+        counts = facets.get_index().counts({"distrib": {"LIT"}}, ["distrib", "credits"])
+
+        self.assertEqual(counts["distrib"], {"ART": 2, "LIT": 1})
+        self.assertEqual(counts["credits"], {"3": 1})
+
+    def test_writes_update_the_index_after_commit(self):
+        facets.get_index()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other.distribs.add(self.lit)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.poetry.delete()
+
+        self.assertEqual(self._ids(distrib=["LIT"]), {self.other.id})
+
+    def test_deferred_updates_rebuild_once(self):
+        facets.get_index()
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with facets.deferred_updates():
+                self.other.distribs.add(self.lit)
+                factories.CourseOfferingFactory(course=self.other)
+
+        self.assertEqual(callbacks.count(facets.rebuild), 1)
+        self.assertEqual(
+            self._ids(distrib=["LIT"], offered=["current"]), {self.other.id}
+        )
+
+    def test_warm_index_is_one_cache_read(self):
+        facets.get_index()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self._ids(credits=["3"]), {self.poetry.id})
+
+    def test_course_list_filters_and_counts(self):
+        response = self.client.get(
+            reverse("courses_api"), {"distrib": "ART,LIT", "facets": "distrib,credits"}
+        )
+
+        data = response.json()
+        self.assertEqual(
+            {course["id"] for course in data["results"]},
+            {self.painting.id, self.poetry.id},
+        )
+        self.assertEqual(
+            data["facets"],
+            {"distrib": {"ART": 2, "LIT": 1}, "credits": {"3": 1, "4": 1}},
+        )
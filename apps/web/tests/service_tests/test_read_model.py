@@ -0,0 +1,158 @@
+import io
+import json
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import call_command
+from django.db.models import Prefetch
+from django.test import RequestFactory, TestCase
+
+from apps.web import read_model
+from apps.web.models import (
+    Course,
+    CourseChange,
+    CourseDocument,
+    CourseOffering,
+    Review,
+    ReviewVote,
+)
+from apps.web.serializers import CourseSerializer
+from apps.web.tests import factories
+from lib import constants
+
+
+class ReadModelTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = factories.UserFactory()
+        cls.course, cls.other = factories.CourseFactory.create_batch(2)
+        cls.course.distribs.add(factories.DistributiveRequirementFactory())
+        cls.course.crosslisted_courses.add(cls.other)
+        offering = factories.CourseOfferingFactory(course=cls.course)
+        offering.instructors.add(factories.InstructorFactory())
+        cls.review = factories.ReviewFactory(course=cls.course, professor="Prof A")
+        ReviewVote.objects.create(review=cls.review, user=cls.user, is_kudos=True)
+        factories.VoteFactory(course=cls.course, user=cls.user, value=4)
+
+    def setUp(self):
+        read_model.process_changes()
+
+    def _request(self, user=None):
+        request = RequestFactory().get("/")
+        request.user = user or AnonymousUser()
+        return request
+
+    def _live(self, request):
+        """The course as CourseSerializer renders it from the database."""
+        course = (
+            Course.objects.with_scores_vote_counts()
+            .prefetch_related(
+                Prefetch(
+                    "courseoffering_set",
+                    queryset=CourseOffering.objects.prefetch_related("instructors"),
+                ),
+                Prefetch(
+                    "review_set",
+                    queryset=Review.objects.with_votes(vote_user=request.user),
+                ),
+            )
+            .get(pk=self.course.pk)
+        )
+        data = CourseSerializer(course, context={"request": request}).data
+        return json.loads(json.dumps(data, default=str))
+
+    def _read(self, request):
+        return read_model.courses_for_request([self.course.pk], request)[self.course.pk]
+
+    def test_reads_match_the_serializer(self):
+        for user in (None, self.user):
+            with self.subTest(user=user):
+                request = self._request(user)
+                self.assertEqual(self._read(request), self._live(request))
+
+    def test_anonymous_read_is_one_lookup(self):
+        with self.assertNumQueries(1):
+            data = self._read(self._request())
+
+        self.assertEqual(data["review_set"], [])
+        self.assertFalse(data["can_write_review"])
+
+    def test_changes_are_read_through_until_processed(self):
+        factories.VoteFactory(course=self.course, value=2)
+        self.assertTrue(CourseChange.objects.filter(course_id=self.course.pk).exists())
+
+        request = self._request(self.user)
+        self.assertEqual(self._read(request)["quality_vote_count"], 2)
+
+        self.assertEqual(read_model.process_changes(), 1)
+        self.assertFalse(CourseChange.objects.exists())
+        document = CourseDocument.objects.get(pk=self.course.pk).document
+        self.assertEqual(document["quality_vote_count"], 2)
+        with self.assertNumQueries(1):
+            self._read(self._request())
+
+    def test_deleted_courses_lose_their_document(self):
+        self.other.delete()
+        read_model.process_changes()
+
+        self.assertFalse(CourseDocument.objects.filter(pk=self.other.pk).exists())
+        self.assertEqual(read_model.get_documents([self.other.pk]), {})
+
+    def test_check_rebuilds_drifted_documents(self):
+        CourseDocument.objects.filter(pk=self.course.pk).update(document={})
+        CourseDocument.objects.filter(pk=self.other.pk).delete()
+
+        dry_run = read_model.check(chunk_size=1, workers=1, fix=False)
+        counts = read_model.check(chunk_size=1, workers=1)
+
+        self.assertEqual(
+            dry_run,
+            {"courses": 2, "chunks": 2, "missing": 1, "stale": 1, "rebuilt": 0},
+        )
+        self.assertEqual(counts["rebuilt"], 2)
+        self.assertEqual(read_model.check(workers=1)["rebuilt"], 0)
+
+    def test_check_command(self):
+        CourseDocument.objects.filter(pk=self.course.pk).delete()
+        out = io.StringIO()
+
+        call_command("check_course_documents", workers=1, json=True, stdout=out)
+
+        results = json.loads(out.getvalue())
+        self.assertEqual(results["missing"], 1)
+        self.assertEqual(results["rebuilt"], 1)
+        self.assertTrue(CourseDocument.objects.filter(pk=self.course.pk).exists())
+
+    def test_check_keeps_documents_rebuilt_while_it_renders(self):
+        CourseDocument.objects.filter(pk=self.course.pk).update(document={})
+        render = read_model.render
+
+        def render_then_process_a_change(course_ids, term=None):
+            rendered = render(course_ids, term)
+            # process_changes rebuilds the course after check has rendered it.
+            Course.objects.filter(pk=self.course.pk).update(course_title="Renamed")
+            read_model.store(render([self.course.pk]))
+            return rendered
+
+        with mock.patch.object(read_model, "render", render_then_process_a_change):
+            counts = read_model.check(workers=1)
+
+        self.assertEqual(counts["stale"], 1)
+        self.assertEqual(counts["rebuilt"], 0)
+        self.assertEqual(
+            CourseDocument.objects.get(pk=self.course.pk).document["course_title"],
+            "Renamed",
+        )
+
+    def test_documents_list_the_current_terms_instructors(self):
+        instructors = read_model.render([self.course.pk])[self.course.pk]["instructors"]
+        self.assertTrue(instructors)
+
+        # Worked out per render, not when the worker started.
+        with mock.patch.object(constants, "get_current_term", return_value="00X"):
+            document = read_model.render([self.course.pk])[self.course.pk]
+        self.assertEqual(document["instructors"], [])
+        self.assertEqual(
+            read_model.render([self.course.pk], "00X")[self.course.pk]["instructors"],
+            [],
+        )
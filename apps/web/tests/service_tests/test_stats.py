@@ -0,0 +1,61 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from apps.web import stats
+from apps.web.models import Vote
+from apps.web.tests import factories
+from lib import constants
+
+
+class LandingStatsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.course = factories.CourseFactory()
+        factories.CourseOfferingFactory(course=self.course)
+        self.user = factories.UserFactory()
+
+    def test_cold_cache_falls_back_to_estimates(self):
+        factories.ReviewFactory(course=self.course)
+        cache.clear()
+
+        payload = stats.landing_stats()
+        self.assertEqual(payload["review_count"], 1)
+        self.assertEqual(payload["course_count"], 1)
+
+    def test_counters_follow_writes_after_reconcile(self):
+        stats.reconcile()
+
+        review = factories.ReviewFactory(course=self.course, user=self.user)
+        Vote.objects.vote(3, self.course.id, Vote.CATEGORIES.QUALITY, self.user)
+        payload = stats.landing_stats()
+        self.assertEqual(payload["review_count"], 1)
+        self.assertEqual(payload["vote_count"], 1)
+        self.assertEqual(payload["user_count"], 1)
+
+        review.delete()
+        Vote.objects.vote(3, self.course.id, Vote.CATEGORIES.QUALITY, self.user)
+        payload = stats.landing_stats()
+        self.assertEqual(payload["review_count"], 0)
+        self.assertEqual(payload["vote_count"], 0)
+
+    def test_warm_landing_payload_is_one_cache_read(self):
+        factories.ReviewFactory(course=self.course)
+        stats.reconcile()
+
+        with self.assertNumQueries(0):
+            payload = stats.landing_stats()
+
+        self.assertEqual(payload["term"], constants.CURRENT_TERM)
+        self.assertEqual(payload["recent_reviews"][0]["course_id"], self.course.id)
+        self.assertEqual(payload["top_courses"][0]["id"], self.course.id)
+        self.assertEqual(payload["top_courses"][0]["review_count"], 1)
+
+    def test_new_review_refreshes_recent_activity(self):
+        stats.reconcile()
+        self.assertEqual(stats.landing_stats()["recent_reviews"], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            factories.ReviewFactory(course=self.course)
+        self.assertIsNone(cache.get(stats.SNAPSHOT_KEY))
+        recent = stats.landing_stats()["recent_reviews"]
+        self.assertEqual([r["course_id"] for r in recent], [self.course.id])
@@ -0,0 +1,137 @@
+import io
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from apps.web import benchmark
+from apps.web.models import Course
+
+
+class BenchmarkApiTestCase(TestCase):
+    def _run(self, **options):
+        out = io.StringIO()
+        call_command(
+            "benchmark_api",
+            scale=0.01,
+            requests=80,
+            use_current_db=True,
+            json=True,
+            stdout=out,
+            **options,
+        )
+        return json.loads(out.getvalue())
+
+    def test_request_mix_runs_without_errors(self):
+        results = self._run()
+
+        self.assertEqual(results["overall"]["requests"], 80)
+        self.assertEqual(results["overall"]["errors"], 0, results["scenarios"])
+        self.assertGreater(results["overall"]["requests_per_second"], 0)
+        for name, stats in results["scenarios"].items():
+            with self.subTest(scenario=name):
+                self.assertLessEqual(stats["p50_ms"], stats["p95_ms"])
+                self.assertLessEqual(stats["p95_ms"], stats["p99_ms"])
+                self.assertIsNotNone(stats["queries_per_request"])
+
+    def test_current_db_is_rolled_back_so_reruns_work(self):
+        self._run()
+
+        self.assertFalse(Course.objects.exists())
+        self.assertFalse(
+            User.objects.filter(username=benchmark.BENCHMARK_USERNAME).exists()
+        )
+        self.assertEqual(self._run()["overall"]["errors"], 0)
+
+    def test_results_are_saved_and_compared(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "baseline.json")
+            saved = self._run(output=path)
+            with open(path) as f:
+                self.assertEqual(json.load(f)["overall"], saved["overall"])
+
+            results = benchmark.compare(saved, saved)
+
+        self.assertEqual(results["overall"]["p95_ms"], 0)
+
+
+class PercentileTestCase(SimpleTestCase):
+    def test_nearest_rank(self):
+        values = list(range(1, 101))
+
+        self.assertEqual(benchmark.percentile(values, 50), 50)
+        self.assertEqual(benchmark.percentile(values, 99), 99)
+        self.assertEqual(benchmark.percentile([7.0], 95), 7.0)
+
+
+class AdviseIndexesTestCase(TestCase):
+    def test_every_select_shape_is_explained(self):
+        out = io.StringIO()
+
+        call_command(
+            "advise_indexes",
+            scale=0.01,
+            requests=40,
+            use_current_db=True,
+            json=True,
+            stdout=out,
+        )
+
+        rows = json.loads(out.getvalue())
+        self.assertTrue(rows)
+        for row in rows:
+            with self.subTest(shape=row["shape"]):
+                self.assertTrue(row["shape"].startswith("SELECT"))
+                self.assertTrue(row["plan"])
+                self.assertGreater(row["count"], 0)
+
+    def test_seeding_queries_are_not_captured(self):
+        prepare_replay = benchmark.prepare_replay
+
+        def seed_with_marker(*args):
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 AS seeding_marker")
+            return prepare_replay(*args)
+
+        out = io.StringIO()
+        with mock.patch.object(benchmark, "prepare_replay", seed_with_marker):
+            call_command(
+                "advise_indexes",
+                scale=0.01,
+                requests=20,
+                use_current_db=True,
+                json=True,
+                stdout=out,
+            )
+
+        rows = json.loads(out.getvalue())
+        self.assertTrue(rows)
+        self.assertFalse([row for row in rows if "seeding_marker" in row["shape"]])
+
+
+class BenchmarkCourseListTestCase(TestCase):
+    def test_both_paths_are_measured_and_identical(self):
+        out = io.StringIO()
+
+        call_command(
+            "benchmark_course_list",
+            scale=0.02,
+            pages=2,
+            repeat=1,
+            use_current_db=True,
+            json=True,
+            stdout=out,
+        )
+
+        results = json.loads(out.getvalue())
+        self.assertEqual(results["pages"], 2)
+        self.assertEqual(results["mismatched_pages"], [])
+        self.assertEqual(set(results["paths"]), {"model", "values"})
+        self.assertLessEqual(
+            results["paths"]["values"]["queries"], results["paths"]["model"]["queries"]
+        )
@@ -0,0 +1,115 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from apps.web.models import Vote
+from apps.web.tests import factories
+
+
+class ConditionalGetTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.course = factories.CourseFactory()
+        self.other_course = factories.CourseFactory()
+        self.user = factories.UserFactory()
+
+    def _get(self, url, **headers):
+        return self.client.get(url, headers=headers)
+
+    def test_list_returns_etag_and_304_when_unchanged(self):
+        url = reverse("courses_api")
+        response = self._get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers["ETag"]
+
+        response = self._get(url, if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    def test_list_returns_200_after_catalog_changes(self):
+        url = reverse("courses_api")
+        etag = self._get(url).headers["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            factories.ReviewFactory(course=self.course)
+
+        response = self._get(url, if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+    def test_list_etag_differs_between_anonymous_and_authenticated(self):
+        url = reverse("courses_api")
+        anonymous_etag = self._get(url).headers["ETag"]
+
+        self.client.force_login(self.user)
+        response = self._get(url, if_none_match=anonymous_etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_304_skips_queries(self):
+        url = reverse("course_detail_api", args=[self.course.id])
+        etag = self._get(url).headers["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self._get(url, if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_detail_is_invalidated_only_by_its_own_course(self):
+        url = reverse("course_detail_api", args=[self.course.id])
+        etag = self._get(url).headers["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Vote.objects.vote(
+                4, self.other_course.id, Vote.CATEGORIES.QUALITY, self.user
+            )
+        self.assertEqual(self._get(url, if_none_match=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Vote.objects.vote(4, self.course.id, Vote.CATEGORIES.QUALITY, self.user)
+        self.assertEqual(self._get(url, if_none_match=etag).status_code, 200)
+
+    def test_detail_is_invalidated_by_distrib_changes(self):
+        url = reverse("course_detail_api", args=[self.course.id])
+        etag = self._get(url).headers["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.distribs.add(factories.DistributiveRequirementFactory())
+        self.assertEqual(self._get(url, if_none_match=etag).status_code, 200)
+
+    def test_departments_honours_if_modified_since(self):
+        url = reverse("departments_api")
+        response = self._get(url)
+        self.assertEqual(response.status_code, 200)
+        last_modified = response.headers["Last-Modified"]
+
+        response = self._get(url, if_modified_since=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_landing_is_invalidated_by_new_reviews(self):
+        url = reverse("landing_api")
+        etag = self._get(url).headers["ETag"]
+        self.assertEqual(self._get(url, if_none_match=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            factories.ReviewFactory(course=self.course)
+        response = self._get(url, if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["review_count"], 1)
+
+    def test_stamps_are_bumped_only_on_commit(self):
+        url = reverse("course_detail_api", args=[self.course.id])
+        etag = self._get(url).headers["ETag"]
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            Vote.objects.vote(4, self.course.id, Vote.CATEGORIES.QUALITY, self.user)
+            self.assertEqual(self._get(url, if_none_match=etag).status_code, 304)
+        for callback in callbacks:
+            callback()
+
+        self.assertEqual(self._get(url, if_none_match=etag).status_code, 200)
+
+    def test_cold_cache_invalidates_validators(self):
+        url = reverse("medians", args=[self.course.id])
+        etag = self._get(url).headers["ETag"]
+
+        cache.clear()
+        self.assertEqual(self._get(url, if_none_match=etag).status_code, 200)
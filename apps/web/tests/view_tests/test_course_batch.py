@@ -0,0 +1,97 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from apps.web.tests import factories
+from lib.middleware import count_query_shapes
+
+
+class CourseBatchTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = factories.UserFactory()
+        cls.courses = factories.CourseFactory.create_batch(6)
+        art = factories.DistributiveRequirementFactory(name="ART")
+        instructor = factories.InstructorFactory()
+        for i, course in enumerate(cls.courses):
+            course.distribs.add(art)
+            offering = factories.CourseOfferingFactory(course=course)
+            offering.instructors.add(instructor)
+            for _ in range(i % 3):
+                factories.ReviewFactory(course=course, professor="Prof A")
+        cls.courses[0].crosslisted_courses.add(cls.courses[1])
+        factories.ReviewFactory(
+            course=cls.courses[2], user=cls.user, professor="Prof B"
+        )
+        factories.VoteFactory(course=cls.courses[1], user=cls.user, value=5)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def _batch(self, ids, **params):
+        return self.client.get(
+            reverse("courses_batch_api"),
+            {"ids": ",".join(map(str, ids)), **params},
+        )
+
+    def test_results_match_the_detail_api_in_request_order(self):
+        ids = [course.id for course in reversed(self.courses)]
+
+        response = self._batch(ids)
+
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual([course["id"] for course in results], ids)
+        for course in results:
+            with self.subTest(course=course["id"]):
+                detail = self.client.get(
+                    reverse("course_detail_api", args=[course["id"]])
+                )
+                self.assertEqual(course, detail.json())
+
+    def test_missing_ids_are_reported(self):
+        missing = self.courses[-1].id + 100
+
+        data = self._batch([missing, self.courses[0].id, self.courses[0].id]).json()
+
+        self.assertEqual(
+            [course["id"] for course in data["results"]], [self.courses[0].id]
+        )
+        self.assertEqual(data["not_found"], [missing])
+
+    def test_queries_do_not_grow_with_the_batch(self):
+        def queries_for(courses):
+            cache.clear()
+            self.client.force_login(self.user)
+            with count_query_shapes() as queries:
+                response = self._batch([course.id for course in courses])
+            self.assertEqual(response.status_code, 200)
+            return queries.total
+
+        self.assertEqual(queries_for(self.courses[:2]), queries_for(self.courses))
+
+    def test_sparse_fields(self):
+        data = self._batch([self.courses[0].id], fields="id,xlist").json()
+
+        self.assertEqual(
+            data["results"],
+            [
+                {
+                    "id": self.courses[0].id,
+                    "xlist": [
+                        {
+                            "short_name": self.courses[1].short_name(),
+                            "id": self.courses[1].id,
+                        }
+                    ],
+                }
+            ],
+        )
+
+    @override_settings(WEB={**settings.WEB, "COURSE": {"BATCH_SIZE": 2}})
+    def test_invalid_ids_are_rejected(self):
+        for ids in ([], ["x"], [1, 2, 3]):
+            with self.subTest(ids=ids):
+                self.assertEqual(self._batch(ids).status_code, 400)
@@ -0,0 +1,143 @@
+import json
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db.models import Prefetch
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from apps.web.models import (
+    Course,
+    CourseMedian,
+    CourseOffering,
+    DistributiveRequirement,
+)
+from apps.web.serializers import CourseSearchRowSerializer, CourseSearchSerializer
+from apps.web.tests import factories
+from lib import constants
+
+
+class CourseListProjectionTestCase(TestCase):
+    """The course list's .values() path matches CourseSearchSerializer."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = factories.UserFactory()
+        offered = factories.CourseFactory(description="x" * 400)
+        art = factories.DistributiveRequirementFactory(name="ART")
+        lit = factories.DistributiveRequirementFactory(name="LIT")
+        offered.distribs.add(lit, art)
+        first, second = factories.InstructorFactory.create_batch(2)
+        for section, instructors in ((1, [second, first]), (2, [first])):
+            offering = factories.CourseOfferingFactory(
+                course=offered, section=section, period=f"{section}A"
+            )
+            offering.instructors.set(instructors)
+        factories.CourseOfferingFactory(course=offered, term="20F", period="9L")
+        factories.VoteFactory(course=offered, user=cls.user, value=4)
+        factories.ReviewFactory(course=offered, user=cls.user)
+
+        # Never offered: last_offered comes from the medians.
+        medians_only = factories.CourseFactory(description="")
+        for term in ("21S", "19F", "20X"):
+            CourseMedian.objects.create(
+                course=medians_only, section=1, enrollment=10, median="A", term=term
+            )
+        factories.CourseFactory()
+
+    def setUp(self):
+        cache.clear()
+
+    def _expected(self, user=None):
+        request = RequestFactory().get("/")
+        request.user = user or AnonymousUser()
+        queryset = (
+            Course.objects.with_scores()
+            .prefetch_related(
+                Prefetch(
+                    "distribs",
+                    queryset=DistributiveRequirement.objects.order_by("name"),
+                ),
+                Prefetch(
+                    "courseoffering_set",
+                    queryset=CourseOffering.objects.prefetch_related("instructors"),
+                ),
+            )
+            .order_by("course_code")
+        )
+        data = CourseSearchSerializer(
+            queryset, many=True, context={"request": request}
+        ).data
+        return json.loads(json.dumps(data))
+
+    def test_anonymous_output_matches_model_serializer(self):
+        results = self.client.get(reverse("courses_api")).json()["results"]
+
+        self.assertEqual(results, self._expected())
+        self.assertNotIn("quality_score", results[0])
+
+    def test_authenticated_output_matches_model_serializer(self):
+        self.client.force_login(self.user)
+
+        results = self.client.get(reverse("courses_api")).json()["results"]
+
+        self.assertEqual(results, self._expected(self.user))
+        offered = results[0]
+        self.assertEqual(offered["quality_score"], 4.0)
+        self.assertEqual(len(offered["short_description"]), 303)
+        self.assertEqual(offered["last_offered"], constants.CURRENT_TERM)
+        self.assertEqual(results[1]["last_offered"], "21S")
+
+    def test_single_row(self):
+        row = CourseSearchRowSerializer.project(Course.objects.with_scores()).get(
+            course_code=Course.objects.order_by("course_code")[0].course_code
+        )
+
+        data = CourseSearchRowSerializer(row).data
+
+        self.assertTrue(data["is_offered_in_current_term"])
+        self.assertEqual(
+            data["instructors"],
+            [i.name for i in Course.objects.first().get_instructors()],
+        )
+        self.assertEqual(data["distribs"], [{"name": "ART"}, {"name": "LIT"}])
+
+
+class CourseListOfferedTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.current = factories.CourseFactory(course_code="ECE2150J")
+        factories.CourseOfferingFactory(course=cls.current)
+        cls.past = factories.CourseFactory(course_code="ECE1010J")
+        factories.CourseOfferingFactory(course=cls.past, term="20F")
+        cls.never = factories.CourseFactory(course_code="ECE0001J")
+
+    def setUp(self):
+        cache.clear()
+
+    def _codes(self, **params):
+        response = self.client.get(reverse("courses_api"), params)
+        self.assertEqual(response.status_code, 200)
+        return [course["course_code"] for course in response.json()["results"]]
+
+    def test_offered_in(self):
+        self.assertEqual(self._codes(offered_in="20f"), ["ECE1010J"])
+        self.assertEqual(
+            self._codes(offered_in=f"20F,{constants.CURRENT_TERM}"),
+            ["ECE1010J", "ECE2150J"],
+        )
+
+    def test_sort_by_last_offered(self):
+        self.assertEqual(
+            self._codes(sort_by="last_offered", sort_order="desc"),
+            ["ECE2150J", "ECE1010J", "ECE0001J"],
+        )
+
+    def test_sort_by_offered(self):
+        self.assertEqual(
+            self._codes(sort_by="offered", sort_order="desc"),
+            ["ECE2150J", "ECE0001J", "ECE1010J"],
+        )
+        self.assertEqual(
+            self._codes(sort_by="offered"), ["ECE0001J", "ECE1010J", "ECE2150J"]
+        )
@@ -0,0 +1,101 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from apps.web.tests import factories
+from lib.middleware import count_query_shapes
+
+# A query shape repeated this often within one request is a query per row.
+N_PLUS_ONE_THRESHOLD = 5
+
+# (url name, needs a course id, anonymous budget, authenticated budget);
+# a budget of None means the endpoint is not served to that client.
+READ_BUDGETS = (
+    ("courses_api", False, 6, 7),
+    # Served from the course's document (apps.web.read_model).
+    ("course_detail_api", True, 1, 5),
+    ("course_review_api", True, None, 3),
+    ("course_instructors", True, 3, 4),
+    ("medians", True, 1, 2),
+    ("course_professors", True, 2, 3),
+    ("landing_api", False, 6, 7),
+    ("departments_api", False, 1, 2),
+    ("user_status", False, 0, 1),
+    ("user_reviews_api", False, None, 2),
+)
+
+
+class QueryBudgetTestCase(TestCase):
+    """
+    Every endpoint runs a bounded number of queries against a realistic
+    catalog, and no query runs once per row.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        data = factories.seed_catalog()
+        cls.course = data["courses"][0]
+        cls.review = data["reviews"][0]
+        cls.user = data["users"][0]
+
+    def setUp(self):
+        cache.clear()
+
+    def _assert_within_budget(self, budget, request):
+        with count_query_shapes() as queries:
+            response = request()
+
+        self.assertLess(response.status_code, 400)
+        self.assertLessEqual(queries.total, budget, dict(queries.shapes))
+        self.assertEqual(queries.repeated(N_PLUS_ONE_THRESHOLD), [])
+
+    def _check_reads(self, budget_index):
+        for name, needs_course, *budgets in READ_BUDGETS:
+            budget = budgets[budget_index]
+            if budget is None:
+                continue
+            args = [self.course.id] if needs_course else []
+            with self.subTest(endpoint=name):
+                cache.clear()
+                if budget_index:
+                    self.client.force_login(self.user)
+                url = reverse(name, args=args)
+                self._assert_within_budget(budget, lambda: self.client.get(url))
+
+    def test_anonymous_reads(self):
+        self._check_reads(0)
+
+    def test_authenticated_reads(self):
+        self._check_reads(1)
+
+    def test_course_list_pages_and_filters(self):
+        self.client.force_login(self.user)
+        url = reverse("courses_api")
+        for params in (
+            {"page": 3},
+            {"department": "MATH"},
+            {"sort_by": "quality_score", "sort_order": "desc"},
+            {"code": "COSC00"},
+        ):
+            with self.subTest(params=params):
+                self._assert_within_budget(7, lambda: self.client.get(url, params))
+
+    def test_votes(self):
+        self.client.force_login(self.user)
+        # Each save of the vote also records a change for the course's document.
+        self._assert_within_budget(
+            13,
+            lambda: self.client.post(
+                reverse("course_vote_api", args=[self.course.id]),
+                {"value": 4, "forLayup": False},
+                content_type="application/json",
+            ),
+        )
+        self._assert_within_budget(
+            11,
+            lambda: self.client.post(
+                reverse("review_vote_api", args=[self.review.id]),
+                {"is_kudos": True},
+                content_type="application/json",
+            ),
+        )
@@ -0,0 +1,108 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from apps.web.serializers import CourseSearchSerializer, CourseSerializer
+from apps.web.tests import factories
+from lib.middleware import count_query_shapes
+
+
+class SparseFieldsTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = factories.UserFactory()
+        cls.course = factories.CourseFactory()
+        offering = factories.CourseOfferingFactory(course=cls.course)
+        offering.instructors.add(factories.InstructorFactory())
+        factories.ReviewFactory(course=cls.course, user=cls.user)
+        factories.VoteFactory(course=cls.course, user=cls.user, value=3)
+
+    def setUp(self):
+        cache.clear()
+        self.detail_url = reverse("course_detail_api", args=[self.course.id])
+
+    def _get(self, url, params=None):
+        with count_query_shapes() as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json(), queries.total
+
+    def test_detail_fields_skips_everything_else(self):
+        self.client.force_login(self.user)
+        full, full_queries = self._get(self.detail_url)
+        # Sessions live in the cache too.
+        cache.clear()
+        self.client.force_login(self.user)
+
+        header, header_queries = self._get(
+            self.detail_url, {"fields": "id,course_code,quality_score,unknown"}
+        )
+
+        self.assertEqual(list(full), list(CourseSerializer.Meta.fields))
+        self.assertEqual(
+            header,
+            {
+                "id": full["id"],
+                "course_code": full["course_code"],
+                "quality_score": full["quality_score"],
+            },
+        )
+        self.assertLess(header_queries, full_queries)
+
+    def test_detail_empty_expand_returns_only_cheap_fields(self):
+        self.client.force_login(self.user)
+
+        data, _ = self._get(self.detail_url, {"expand": ""})
+        expanded, _ = self._get(self.detail_url, {"expand": "review_set"})
+
+        self.assertTrue(
+            set(CourseSerializer.Meta.expandable_fields).isdisjoint(data),
+        )
+        self.assertIn("quality_score", data)
+        self.assertEqual(len(expanded["review_set"]), 1)
+        self.assertNotIn("professors_and_review_count", expanded)
+
+    def test_detail_omit(self):
+        data, _ = self._get(self.detail_url, {"omit": "review_set,xlist"})
+
+        self.assertNotIn("review_set", data)
+        self.assertNotIn("xlist", data)
+        self.assertIn("instructors", data)
+
+    def test_scores_are_never_selected_for_anonymous_users(self):
+        data, _ = self._get(self.detail_url, {"fields": "id,quality_score"})
+
+        self.assertEqual(data, {"id": self.course.id})
+
+    def test_list_fields_skips_related_lookups(self):
+        url = reverse("courses_api")
+        full, full_queries = self._get(url)
+        cache.clear()
+
+        data, queries = self._get(url, {"fields": "id,course_code"})
+
+        self.assertEqual(
+            list(full["results"][0]),
+            [
+                name
+                for name in CourseSearchSerializer.Meta.fields
+                if name not in CourseSearchSerializer.Meta.authenticated_fields
+            ],
+        )
+        self.assertEqual(
+            data["results"],
+            [{"id": self.course.id, "course_code": self.course.course_code}],
+        )
+        # The count and the page, no distribs/offerings/instructors lookups.
+        self.assertEqual(queries, 2)
+        self.assertLess(queries, full_queries)
+
+    def test_list_expand(self):
+        data, _ = self._get(reverse("courses_api"), {"expand": "instructors"})
+
+        course = data["results"][0]
+        self.assertEqual(len(course["instructors"]), 1)
+        self.assertNotIn("distribs", course)
+        self.assertNotIn("offered_times_string", course)
+        self.assertIn("last_offered", course)
+        self.assertIn("short_description", course)
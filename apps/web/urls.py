@@ -6,6 +6,7 @@ urlpatterns = [
     re_path(r"^user/status/?", views.user_status, name="user_status"),
     re_path(r"^landing/$", views.landing_api, name="landing_api"),
     re_path(r"^courses/$", views.CoursesListAPI.as_view(), name="courses_api"),
+    re_path(r"^courses/batch/$", views.courses_batch_api, name="courses_batch_api"),
     re_path(
         r"^courses/(?P<course_id>[0-9]+)/$",
         views.CoursesDetailAPI.as_view(),
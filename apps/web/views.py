@@ -1,7 +1,11 @@
+import hmac
 import logging
 
+import redis
 from django.conf import settings
-from django.db.models import Count, Prefetch, Q
+from django.db.models import Count, Q
+from django.http import Http404, HttpResponse
+from django.utils.decorators import method_decorator
 from rest_framework import generics, mixins, pagination, status
 from rest_framework.decorators import (
     api_view,
@@ -10,24 +14,34 @@ from rest_framework.decorators import (
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
+from apps.web import facets, read_model, stats
+from apps.web.conditional import (
+    catalog_scopes,
+    conditional,
+    course_scope,
+    course_scopes,
+    stats_scopes,
+)
 from apps.web.models import (
     Course,
     CourseMedian,
     Instructor,
+    OfferedCourse,
     Review,
     ReviewVote,
     Vote,
 )
 from apps.web.serializers import (
-    CourseSearchSerializer,
+    CourseSearchRowSerializer,
     CourseSerializer,
     CourseVoteSerializer,
     ReviewSerializer,
     ReviewVoteSerializer,
 )
+from lib import http_client, metrics
 from lib.departments import get_department_name
 from lib.grades import numeric_value_for_grade
-from lib.terms import numeric_value_of_term
+from lib.rate_limit import RouteRateThrottle, client_ip, rate_limit, reject_counts
 
 logger = logging.getLogger(__name__)
 
@@ -54,6 +68,7 @@ def user_status(request):
         return Response({"isAuthenticated": False})
 
 
+@conditional(stats_scopes)
 @api_view(["GET"])
 @permission_classes([AllowAny])
 def landing_api(request):
@@ -62,15 +77,35 @@ def landing_api(request):
     Input:
         - None
     Output:
-        {"review_count": int}
-    """
-    return Response(
         {
-            "review_count": Review.objects.count(),
+            "review_count": int,
+            "course_count": int,
+            "user_count": int,
+            "vote_count": int,
+            "term": "string",
+            "recent_reviews": [
+                {
+                    "course_id": int,
+                    "course_code": "string",
+                    "course_title": "string",
+                    "term": "string",
+                    "created_at": "string"
+                }, ...
+            ],
+            "top_courses": [
+                {
+                    "id": int,
+                    "course_code": "string",
+                    "course_title": "string",
+                    "review_count": int
+                }, ...
+            ]
         }
-    )
+    """
+    return Response(stats.landing_stats())
 
 
+@method_decorator(conditional(catalog_scopes, vary_on_user=True), name="get")
 class CoursesListAPI(generics.GenericAPIView, mixins.ListModelMixin):
     """
     List courses with filtering, sorting, and pagination.
@@ -81,41 +116,67 @@ class CoursesListAPI(generics.GenericAPIView, mixins.ListModelMixin):
             - code (string): Filter by course code (partial match)
             - min_quality (integer): Filter by minimum quality score (authenticated only)
             - min_difficulty (integer): Filter by minimum difficulty score (authenticated only)
-            - sort_by (string): Sort field ("course_code", "review_count"),("quality_score", "difficulty_score")(authenticated only)
+            - offered_in (string): Filter by the terms a course is offered in
+              (e.g. "23F"), comma-separated to match any of them
+            - sort_by (string): Sort field ("course_code", "review_count", "offered", "last_offered"),("quality_score", "difficulty_score")(authenticated only);
+              "offered" puts the courses offered this term first with "desc",
+              "last_offered" the most recently offered ones
             - sort_order (string): "asc" or "desc" (default: "asc")
             - page (integer): Page number for pagination
+            - distrib, credits, instructor, median (string): Filter by facet
+              values, comma-separated to match any of them
+            - offered (string): "current" for courses offered this term
+            - facets (string): Comma-separated facets to return counts for
+            - fields, omit, expand (comma-separated field names): Choose the
+              fields returned for each course (see SparseFieldsMixin)
 
     Output:
         {
             "count": integer,
             "next": "string|null",
             "previous": "string|null",
-            "results": [CourseSearchSerializer objects]
+            "results": [CourseSearchSerializer objects],
+            "facets": {facet: {value: count}} (only with ?facets=)
         }
     """
 
-    serializer_class = CourseSearchSerializer
+    # Same output as CourseSearchSerializer, from .values() rows.
+    serializer_class = CourseSearchRowSerializer
     permission_classes = [AllowAny]
     pagination_class = CoursesPagination
 
     def get_queryset(self):
-        queryset = Course.objects.with_scores().prefetch_related("distribs")
-        return queryset
+        return CourseSearchRowSerializer.project(Course.objects.with_scores())
 
     def _filter(self, queryset):
-        """filter courses and filter by score."""
+        """filter courses, by facets and by score."""
         queryset = self._filter_courses(queryset)
+        queryset = self._filter_by_facets(queryset)
         queryset = self._filter_by_score(queryset)
         return queryset
 
+    def _filter_by_facets(self, queryset):
+        """Helper function to filter by the facet index."""
+        selections = facets.selections(self.request.query_params)
+        if not selections:
+            return queryset
+        index = facets.get_index()
+        return queryset.filter(id__in=index.course_ids(index.match(selections)))
+
     def _filter_courses(self, queryset):
         """Helper function to apply all filters to courses queryset."""
         department = self.request.query_params.get("department")
         code = self.request.query_params.get("code")
+        offered_in = self.request.query_params.get("offered_in")
         if department:
             queryset = queryset.filter(department__iexact=department)
         if code:
             queryset = queryset.filter(course_code__icontains=code)
+        if offered_in:
+            terms = {term.strip().upper() for term in offered_in.split(",")}
+            queryset = queryset.filter(
+                id__in=OfferedCourse.objects.filter(term__in=terms).values("course_id")
+            )
         return queryset
 
     def _filter_by_score(self, queryset):
@@ -144,11 +205,20 @@ class CoursesListAPI(generics.GenericAPIView, mixins.ListModelMixin):
         sort_order = self.request.query_params.get("sort_order", "asc")
         sort_prefix = "-" if sort_order.lower() == "desc" else ""
 
-        allowed_sort_fields = ["course_code", "review_count"]
+        allowed_sort_fields = ["course_code", "review_count", "offered", "last_offered"]
         if self.request.user.is_authenticated:
             allowed_sort_fields.extend(["quality_score", "difficulty_score"])
 
         sort_field = sort_by if sort_by in allowed_sort_fields else "course_code"
+        # Columns kept up to date by Course.objects.refresh_offered.
+        if sort_field == "offered":
+            return queryset.order_by(
+                f"{sort_prefix}is_offered_current_term", "course_code"
+            )
+        if sort_field == "last_offered":
+            return queryset.order_by(
+                f"{sort_prefix}last_offered_ordinal", "course_code"
+            )
         return queryset.order_by(f"{sort_prefix}{sort_field}")
 
     def filter_queryset(self, queryset):
@@ -157,47 +227,114 @@ class CoursesListAPI(generics.GenericAPIView, mixins.ListModelMixin):
         queryset = self._sort(queryset)
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        names = request.query_params.get("facets")
+        if names:
+            response.data["facets"] = facets.get_index().counts(
+                facets.selections(request.query_params),
+                [name for name in facets.FACETS if name in names.split(",")],
+            )
+        return response
+
     def get(self, request, *args, **kwargs):
         return self.list(request, *args, **kwargs)
 
 
+@method_decorator(conditional(course_scopes, vary_on_user=True), name="get")
 class CoursesDetailAPI(generics.GenericAPIView, mixins.RetrieveModelMixin):
     """
     Retrieve details for a specific course.
     GET
     Input:
         - URL parameter: course_id (integer, required)
+        - Query parameters:
+            - fields, omit, expand (comma-separated field names): Choose the
+              fields returned (see SparseFieldsMixin); e.g. `?expand=` returns
+              only the fields that need no extra queries
 
     Output:
         - CourseSerializer object
             - Authenticated: Full details
             - Non-authenticated: without scores, votes, and vote counts
+
+    Served from the course's pre-rendered document (see apps.web.read_model).
     """
 
     serializer_class = CourseSerializer
     permission_classes = [AllowAny]
-    lookup_field = "id"
-    lookup_url_kwarg = "course_id"
-
-    def get_queryset(self):
-        queryset = Course.objects.with_scores_vote_counts()
-
-        # Prefetch reviews with votes if authenticated
-        request = self.request
-        if request and request.user.is_authenticated:
-            queryset = queryset.prefetch_related(
-                Prefetch(
-                    "review_set",
-                    queryset=Review.objects.with_votes(vote_user=request.user),
-                )
-            )
 
-        return queryset
+    def retrieve(self, request, *args, **kwargs):
+        course_id = int(self.kwargs["course_id"])
+        courses = read_model.courses_for_request([course_id], request)
+        if course_id not in courses:
+            raise Http404("No Course matches the given query.")
+        return Response(courses[course_id])
 
     def get(self, request, *args, **kwargs):
         return self.retrieve(request, *args, **kwargs)
 
 
+def _batch_course_ids(request):
+    """
+    The distinct course ids in `?ids=`, in request order, or a
+    `(None, error)` pair if the parameter is missing or malformed.
+    """
+    raw = [value.strip() for value in request.GET.get("ids", "").split(",")]
+    if not any(raw):
+        return None, "ids is required"
+    if not all(value.isdigit() for value in raw):
+        return None, "ids must be comma-separated course ids"
+    ids = list(dict.fromkeys(int(value) for value in raw))
+    limit = settings.WEB["COURSE"]["BATCH_SIZE"]
+    if len(ids) > limit:
+        return None, f"At most {limit} ids can be requested at once"
+    return ids, None
+
+
+def batch_scopes(request, *args, **kwargs):
+    ids, _ = _batch_course_ids(request)
+    return [course_scope(course_id) for course_id in ids or []]
+
+
+@conditional(batch_scopes, vary_on_user=True)
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def courses_batch_api(request):
+    """
+    Retrieve several courses at once, e.g. to compare them.
+    GET
+    Input:
+        - Query parameters:
+            - ids (string, required): Comma-separated course ids, at most
+              WEB.COURSE.BATCH_SIZE of them
+            - fields, omit, expand: As for the course detail API
+
+    Output:
+        Success (200):
+        {
+            "results": [CourseSerializer objects, in the order of ids],
+            "not_found": [ids without a course]
+        }
+        Error (400): {"detail": "string"}
+    """
+    ids, error = _batch_course_ids(request)
+    if error:
+        return Response({"detail": error}, status=status.HTTP_400_BAD_REQUEST)
+
+    # The same documents and user overlay as the detail API, for all the
+    # courses in one go.
+    courses = read_model.courses_for_request(ids, request)
+    return Response(
+        {
+            "results": [
+                courses[course_id] for course_id in ids if course_id in courses
+            ],
+            "not_found": [course_id for course_id in ids if course_id not in courses],
+        }
+    )
+
+
 class CoursesReviewsAPI(
     generics.GenericAPIView, mixins.ListModelMixin, mixins.CreateModelMixin
 ):
@@ -226,10 +363,13 @@ class CoursesReviewsAPI(
         Error (400): Validation errors
         Error (403): {"detail": "User cannot write review"}
         Error (404): {"detail": "Course not found"}
+        Error (429): {"detail": "Request was throttled. ..."}
     """
 
     serializer_class = ReviewSerializer
     permission_classes = [IsAuthenticated]
+    throttle_classes = [RouteRateThrottle]
+    throttle_scope = "review_create"
 
     def get_queryset(self):
         course_id = self.kwargs.get("course_id")
@@ -251,7 +391,7 @@ class CoursesReviewsAPI(
         # Handle search query
         query = request.query_params.get("q", "").strip()
         if query:
-            queryset = queryset.order_by("-term").filter(
+            queryset = queryset.order_by("-term_ordinal").filter(
                 Q(comments__icontains=query) | Q(professor__icontains=query)
             )
 
@@ -366,6 +506,7 @@ class UserReviewsAPI(
         return self.destroy(request, *args, **kwargs)
 
 
+@conditional(catalog_scopes)
 @api_view(["GET"])
 @permission_classes([AllowAny])
 def departments_api(request):
@@ -400,6 +541,7 @@ def departments_api(request):
     return Response(departments_data)
 
 
+@conditional(course_scopes)
 @api_view(["GET"])
 @permission_classes([AllowAny])
 def medians(request, course_id):
@@ -408,7 +550,9 @@ def medians(request, course_id):
     """
     # retrieve course medians for term, and group by term for averaging
     medians_by_term = {}
-    for course_median in CourseMedian.objects.filter(course=course_id):
+    for course_median in CourseMedian.objects.filter(course=course_id).order_by(
+        "-term_ordinal", "section"
+    ):
         if course_median.term not in medians_by_term:
             medians_by_term[course_median.term] = []
 
@@ -423,21 +567,16 @@ def medians(request, course_id):
 
     return Response(
         {
-            "medians": sorted(
-                [
-                    {
-                        "term": term,
-                        "avg_numeric_value": sum(
-                            m["numeric_value"] for m in term_medians
-                        )
-                        / len(term_medians),
-                        "courses": term_medians,
-                    }
-                    for term, term_medians in medians_by_term.items()
-                ],
-                key=lambda x: numeric_value_of_term(x["term"]),
-                reverse=True,
-            )
+            # Latest term first, in the order of the query.
+            "medians": [
+                {
+                    "term": term,
+                    "avg_numeric_value": sum(m["numeric_value"] for m in term_medians)
+                    / len(term_medians),
+                    "courses": term_medians,
+                }
+                for term, term_medians in medians_by_term.items()
+            ]
         },
         status=200,
     )
@@ -489,6 +628,7 @@ def course_instructors(request, course_id):
 
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
+@rate_limit("course_vote")
 def course_vote_api(request, course_id):
     """
     Vote on course quality or difficulty.
@@ -514,6 +654,7 @@ def course_vote_api(request, course_id):
         {
             "detail": "Validation error with input fields"
         }
+        Error (429): {"detail": "Request was throttled. ..."}
     """
     serializer = CourseVoteSerializer(data=request.data)
     if not serializer.is_valid():
@@ -538,6 +679,7 @@ def course_vote_api(request, course_id):
 
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
+@rate_limit("review_vote")
 def review_vote_api(request, review_id):
     """
     Vote on reviews (kudos/dislike).
@@ -561,6 +703,7 @@ def review_vote_api(request, review_id):
         {
             "detail": "Validation error with input fields"
         }
+        Error (429): {"detail": "Request was throttled. ..."}
     """
     serializer = ReviewVoteSerializer(data=request.data)
     if not serializer.is_valid():
@@ -584,3 +727,45 @@ def review_vote_api(request, review_id):
             "user_vote": user_vote,
         }
     )
+
+
+def _metrics_allowed(request):
+    token = settings.METRICS["TOKEN"]
+    if token:
+        return hmac.compare_digest(
+            request.headers.get("Authorization", ""), f"Bearer {token}"
+        )
+    address = client_ip(request)
+    if "HTTP_X_FORWARDED_FOR" in request.META and address == request.META.get(
+        "REMOTE_ADDR"
+    ):
+        # Relayed by a proxy that is not trusted: the local address is the
+        # proxy's, not the caller's.
+        return False
+    return address in settings.METRICS["ALLOWED_IPS"]
+
+
+def metrics_view(request):
+    """
+    Prometheus metrics of this process (/metrics).
+
+    Input:
+        - GET request with "Authorization: Bearer <METRICS.TOKEN>" or, when
+          no token is configured, from an address in METRICS.ALLOWED_IPS
+
+    Output:
+        Success (200): Prometheus text exposition format
+        Error (403): Client not allowed
+    """
+    if not _metrics_allowed(request):
+        return HttpResponse(status=403)
+
+    try:
+        rejects = reject_counts()
+    except redis.RedisError:
+        logger.exception("Could not read rate limiter reject counts")
+        rejects = None
+    return HttpResponse(
+        metrics.render(http_client.latency_histograms(), rejects),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
@@ -0,0 +1,120 @@
+"""
+Read-replica routing with read-your-writes stickiness.
+
+The replicas configured in `DATABASE.REPLICA_URLS` become the `replica_<n>`
+aliases listed in `settings.DATABASE_REPLICAS`. `ReplicaRouter` sends reads
+to a replica only for requests that `ReplicaRoutingMiddleware` marked as
+safe: GET/HEAD/OPTIONS requests from a client that has not written
+recently. Everything else - writes, reads in unsafe requests, and all
+queries outside a request (Celery tasks, management commands) - uses the
+primary, so code that reads what it just wrote keeps working.
+
+A request that writes to the database gets a short-lived cookie
+(`DATABASE.STICKY_SECONDS`); while it is present, that client's reads stay
+on the primary too, so a user sees their own vote or review even if the
+replicas lag behind. A write in the middle of a safe request moves the
+rest of that request to the primary as well.
+
+Each routed request reads from one randomly chosen replica, so it sees a
+single, consistent copy of the data.
+"""
+
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+PRIMARY = "default"
+STICKY_COOKIE = "use_primary"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# The replica the current request reads from, or None for the primary.
+_replica = ContextVar("db_replica", default=None)
+# Whether the current request has written to the primary.
+_wrote = ContextVar("db_wrote", default=False)
+
+
+def use_primary():
+    """Send the rest of the current request's reads to the primary."""
+    _replica.set(None)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _replica.get() or PRIMARY
+
+    def db_for_write(self, model, **hints):
+        if _replica.get() is not None:
+            _replica.set(None)
+        _wrote.set(True)
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {PRIMARY, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication.
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        tokens = self._route(request)
+        try:
+            return self._stick(self.get_response(request))
+        finally:
+            self._reset(tokens)
+
+    async def __acall__(self, request):
+        # The context variables carry over into the awaited view.
+        tokens = self._route(request)
+        try:
+            return self._stick(await self.get_response(request))
+        finally:
+            self._reset(tokens)
+
+    def _route(self, request):
+        replicas = settings.DATABASE_REPLICAS
+        use_replica = (
+            replicas
+            and request.method in SAFE_METHODS
+            and STICKY_COOKIE not in request.COOKIES
+        )
+        return (
+            _replica.set(random.choice(replicas) if use_replica else None),
+            _wrote.set(False),
+        )
+
+    def _stick(self, response):
+        if settings.DATABASE_REPLICAS and _wrote.get():
+            response.set_cookie(
+                STICKY_COOKIE,
+                "1",
+                max_age=settings.DATABASE_STICKY_SECONDS,
+                secure=settings.SESSION_COOKIE_SECURE,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+    def _reset(self, tokens):
+        replica_token, wrote_token = tokens
+        _replica.reset(replica_token)
+        _wrote.reset(wrote_token)
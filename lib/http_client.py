@@ -0,0 +1,151 @@
+"""
+Shared outbound HTTP client.
+
+Outbound calls (Cloudflare Turnstile, the WJ questionnaire API) go through
+one pooled `httpx.AsyncClient` per host and event loop, so connections are
+kept alive and reused instead of paying a TCP+TLS handshake per call. Each
+host gets its own connection limits and timeouts from the `HTTP_CLIENT`
+setting, and HTTP/2 is used when enabled and the `h2` package is installed.
+
+Sync callers (the WSGI auth views) run their coroutines with `run`, which
+submits them to one long-lived background event loop per process; opening
+a fresh loop per request with `asyncio.run` would also throw away the pool.
+
+Every request's latency is recorded in a per-host histogram, available from
+`latency_histograms()`.
+"""
+
+import asyncio
+import bisect
+import importlib.util
+import logging
+import os
+import threading
+import time
+import weakref
+from urllib.parse import urlsplit
+
+import httpx
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the latency histogram buckets; the last one is +Inf.
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_clients = weakref.WeakKeyDictionary()  # event loop -> {host: client}
+
+_background = {"loop": None, "pid": None}
+_background_lock = threading.Lock()
+
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+
+def host_settings(host):
+    """Client settings for `host`: the defaults overlaid with its entry."""
+    client_settings = settings.HTTP_CLIENT
+    overrides = client_settings.get("HOSTS", {}).get(host, {})
+    return {
+        key: overrides.get(key, value)
+        for key, value in client_settings.items()
+        if key != "HOSTS"
+    }
+
+
+def _http2_enabled(options):
+    if not options["HTTP2"]:
+        return False
+    if importlib.util.find_spec("h2") is None:
+        logger.warning("HTTP/2 requested but the h2 package is missing; using 1.1")
+        return False
+    return True
+
+
+def _build_client(host):
+    options = host_settings(host)
+    return httpx.AsyncClient(
+        http2=_http2_enabled(options),
+        limits=httpx.Limits(
+            max_connections=options["MAX_CONNECTIONS"],
+            max_keepalive_connections=options["MAX_KEEPALIVE_CONNECTIONS"],
+            keepalive_expiry=options["KEEPALIVE_EXPIRY"],
+        ),
+        timeout=httpx.Timeout(options["TIMEOUT"], connect=options["CONNECT_TIMEOUT"]),
+    )
+
+
+def get_async_client(host):
+    """Pooled client for `host`, shared by everything on the running loop."""
+    loop = asyncio.get_running_loop()
+    clients = _clients.setdefault(loop, {})
+    client = clients.get(host)
+    if client is None:
+        client = clients[host] = _build_client(host)
+    return client
+
+
+async def request(method, url, **kwargs):
+    """Send a request through the pooled client for the URL's host."""
+    host = urlsplit(str(url)).hostname
+    started = time.perf_counter()
+    try:
+        return await get_async_client(host).request(method, url, **kwargs)
+    finally:
+        record_latency(host, (time.perf_counter() - started) * 1000)
+
+
+def _background_loop():
+    with _background_lock:
+        loop = _background["loop"]
+        # A forked worker inherits the parent's loop object but not its thread.
+        if loop is None or _background["pid"] != os.getpid():
+            loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=loop.run_forever, name="http-client-loop", daemon=True
+            ).start()
+            _background.update(loop=loop, pid=os.getpid())
+        return loop
+
+
+def run(coro, timeout=None):
+    """Run a coroutine on the background loop from sync code and wait for it."""
+    return asyncio.run_coroutine_threadsafe(coro, _background_loop()).result(timeout)
+
+
+def record_latency(host, elapsed_ms):
+    index = bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)
+    with _histograms_lock:
+        histogram = _histograms.get(host)
+        if histogram is None:
+            histogram = _histograms[host] = {
+                "count": 0,
+                "sum_ms": 0.0,
+                "buckets": [0] * (len(LATENCY_BUCKETS_MS) + 1),
+            }
+        histogram["count"] += 1
+        histogram["sum_ms"] += elapsed_ms
+        histogram["buckets"][index] += 1
+
+
+def latency_histograms():
+    """
+    Per-host latency histograms since process start.
+
+    Returns `{host: {"count", "sum_ms", "buckets"}}` where `buckets` maps
+    each upper bound in ms ("+Inf" for the last) to a cumulative count.
+    """
+    bounds = [str(bound) for bound in LATENCY_BUCKETS_MS] + ["+Inf"]
+    with _histograms_lock:
+        snapshot = {}
+        for host, histogram in _histograms.items():
+            cumulative, total = {}, 0
+            for bound, count in zip(bounds, histogram["buckets"]):
+                total += count
+                cumulative[bound] = total
+            snapshot[host] = {
+                "count": histogram["count"],
+                "sum_ms": round(histogram["sum_ms"], 3),
+                "buckets": cumulative,
+            }
+        return snapshot
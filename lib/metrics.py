@@ -0,0 +1,165 @@
+"""
+In-process request metrics in the Prometheus text format.
+
+`lib.middleware.PerformanceMiddleware` records every request here: its
+latency into a per-view histogram and, for sampled requests, the cost
+breakdown (DB queries and time, Redis calls, cache hits, serializer time)
+into per-view counters. `render()` formats them - together with the
+outbound HTTP latency histograms of `lib.http_client` and the rate limiter
+reject counters - for the `/metrics` endpoint.
+
+Like the HTTP client histograms, the numbers are per process; scrape every
+worker, or aggregate with the `instance` label.
+"""
+
+import bisect
+import threading
+
+from lib.http_client import LATENCY_BUCKETS_MS
+
+PREFIX = "coursereview"
+
+# Counters accumulated from sampled requests: (key, metric, help, scale).
+BREAKDOWN_COUNTERS = (
+    ("db_queries", "db_queries_total", "Database queries", 1),
+    ("db_ms", "db_query_seconds_total", "Time spent in database queries", 1000),
+    ("redis_calls", "redis_calls_total", "Redis round trips", 1),
+    ("cache_hits", "cache_hits_total", "Cache lookups that hit", 1),
+    ("cache_misses", "cache_misses_total", "Cache lookups that missed", 1),
+    ("serializer_ms", "serializer_seconds_total", "Time spent serializing", 1000),
+)
+
+_views = {}
+_views_lock = threading.Lock()
+
+
+def _new_view():
+    view = {
+        "requests": 0,
+        "errors": 0,
+        "sampled": 0,
+        "sum_ms": 0.0,
+        "buckets": [0] * (len(LATENCY_BUCKETS_MS) + 1),
+    }
+    view.update((key, 0) for key, *_ in BREAKDOWN_COUNTERS)
+    return view
+
+
+def record_request(view_name, status_code, elapsed_ms, breakdown=None):
+    """Record one request; `breakdown` is the cost of a sampled request."""
+    index = bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)
+    with _views_lock:
+        view = _views.get(view_name)
+        if view is None:
+            view = _views[view_name] = _new_view()
+        view["requests"] += 1
+        view["errors"] += status_code >= 500
+        view["sum_ms"] += elapsed_ms
+        view["buckets"][index] += 1
+        if breakdown is not None:
+            view["sampled"] += 1
+            for key, *_ in BREAKDOWN_COUNTERS:
+                view[key] += breakdown[key]
+
+
+def view_metrics():
+    """A snapshot of the per-view metrics, `{view: {...}}`."""
+    with _views_lock:
+        return {
+            name: dict(view, buckets=list(view["buckets"]))
+            for name, view in _views.items()
+        }
+
+
+def _labels(**labels):
+    pairs = ",".join(
+        '{}="{}"'.format(key, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for key, value in labels.items()
+    )
+    return "{" + pairs + "}"
+
+
+def _seconds(ms):
+    return f"{ms / 1000:g}"
+
+
+def _histogram(lines, name, help_text, series):
+    """`series` yields (labels, cumulative {bound_ms|"+Inf": n}, sum_ms, count)."""
+    lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for labels, buckets, sum_ms, count in series:
+        for bound, total in buckets.items():
+            le = bound if bound == "+Inf" else _seconds(float(bound))
+            lines.append(f"{name}_bucket{_labels(**labels, le=le)} {total}")
+        lines.append(f"{name}_sum{_labels(**labels)} {_seconds(sum_ms)}")
+        lines.append(f"{name}_count{_labels(**labels)} {count}")
+
+
+def _counter(lines, name, help_text, values):
+    lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+    lines += [f"{name}{_labels(**labels)} {value:g}" for labels, value in values]
+
+
+def _cumulative(buckets):
+    bounds = [str(bound) for bound in LATENCY_BUCKETS_MS] + ["+Inf"]
+    cumulative, total = {}, 0
+    for bound, count in zip(bounds, buckets):
+        total += count
+        cumulative[bound] = total
+    return cumulative
+
+
+def render(http_client_histograms=None, rate_limit_rejects=None):
+    """The metrics in the Prometheus text exposition format."""
+    views = sorted(view_metrics().items())
+    lines = []
+    _histogram(
+        lines,
+        f"{PREFIX}_request_duration_seconds",
+        "Request latency by view",
+        (
+            (
+                {"view": name},
+                _cumulative(view["buckets"]),
+                view["sum_ms"],
+                view["requests"],
+            )
+            for name, view in views
+        ),
+    )
+    _counter(
+        lines,
+        f"{PREFIX}_request_errors_total",
+        "Requests answered with a 5xx status",
+        (({"view": name}, view["errors"]) for name, view in views),
+    )
+    _counter(
+        lines,
+        f"{PREFIX}_sampled_requests_total",
+        "Requests whose cost breakdown was recorded",
+        (({"view": name}, view["sampled"]) for name, view in views),
+    )
+    for key, metric, help_text, scale in BREAKDOWN_COUNTERS:
+        _counter(
+            lines,
+            f"{PREFIX}_{metric}",
+            f"{help_text} (sampled requests)",
+            (({"view": name}, view[key] / scale) for name, view in views),
+        )
+    if http_client_histograms is not None:
+        _histogram(
+            lines,
+            f"{PREFIX}_http_client_duration_seconds",
+            "Outbound HTTP latency by host",
+            (
+                ({"host": host}, hist["buckets"], hist["sum_ms"], hist["count"])
+                for host, hist in sorted(http_client_histograms.items())
+            ),
+        )
+    if rate_limit_rejects is not None:
+        _counter(
+            lines,
+            f"{PREFIX}_rate_limit_rejects_total",
+            "Requests rejected by the rate limiter",
+            (({"route": route}, n) for route, n in sorted(rate_limit_rejects.items())),
+        )
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,315 @@
+"""
+Per-request performance instrumentation.
+
+`PerformanceMiddleware` times every request and records it by view in
+`lib.metrics`. A sampled share of requests (`METRICS.SAMPLE_RATE`) also gets
+a cost breakdown:
+
+- DB queries and their time, through `connection.execute_wrapper`;
+- Redis round trips, counted where redis-py writes a command to a socket;
+- cache hits and misses of the default cache's `get`/`get_many`;
+- time spent building DRF serializer `.data`.
+
+Sampled requests answer with a `Server-Timing` header when
+`METRICS.SERVER_TIMING` is on, so the breakdown shows up in the browser's
+network panel. Requests slower than `METRICS.SLOW_REQUEST_MS` are logged
+with their breakdown whether sampled or not - an unsampled one just lacks
+the detail.
+
+Both middlewares run natively in sync and async stacks, so they don't force
+a thread switch in front of async views under ASGI. Redis, cache and
+serializer hooks are installed once per process and do nothing outside a
+sampled request. The DB wrapper only sees queries run on the request's
+thread, so the queries of async views are not counted.
+
+`NPlusOneMiddleware`, enabled in development, groups a request's queries by
+shape - the SQL with literals and `IN` lists collapsed - and warns about any
+shape run `METRICS.N_PLUS_ONE_THRESHOLD` times or more: the signature of a
+query per row. `QueryShapeCounter` does the grouping and is also used by
+the query budget tests.
+"""
+
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from redis.connection import AbstractConnection
+from rest_framework.serializers import BaseSerializer
+
+from lib import metrics
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar("request_cost", default=None)
+
+_install_lock = threading.Lock()
+_installed = {"hooks": False}
+_missing = object()
+
+_IN_LIST_RE = re.compile(r"\bIN \((?:[^()]|\([^()]*\))*\)", re.IGNORECASE)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_SPACE_RE = re.compile(r"\s+")
+
+
+class RequestCost:
+    def __init__(self):
+        self.db_queries = 0
+        self.db_ms = 0.0
+        self.redis_calls = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.serializer_ms = 0.0
+        self._serializer_depth = 0
+
+    def as_dict(self):
+        return {key: getattr(self, key) for key, *_ in metrics.BREAKDOWN_COUNTERS}
+
+    def server_timing(self, total_ms):
+        return ", ".join(
+            [
+                f"total;dur={total_ms:.1f}",
+                f'db;dur={self.db_ms:.1f};desc="{self.db_queries} queries"',
+                f'redis;desc="{self.redis_calls} calls"',
+                f'cache;desc="{self.cache_hits} hits, {self.cache_misses} misses"',
+                f"serialize;dur={self.serializer_ms:.1f}",
+            ]
+        )
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook.
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_queries += 1
+            self.db_ms += (time.perf_counter() - started) * 1000
+
+
+def _install_redis_hook():
+    send = AbstractConnection.send_packed_command
+
+    def send_packed_command(self, *args, **kwargs):
+        cost = _current.get()
+        if cost is not None:
+            cost.redis_calls += 1
+        return send(self, *args, **kwargs)
+
+    AbstractConnection.send_packed_command = send_packed_command
+
+
+def _install_serializer_hook():
+    data = BaseSerializer.data.fget
+
+    def timed_data(self):
+        cost = _current.get()
+        if cost is None:
+            return data(self)
+        # Only the outermost .data is timed; nested serializers run inside it.
+        cost._serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return data(self)
+        finally:
+            cost._serializer_depth -= 1
+            if not cost._serializer_depth:
+                cost.serializer_ms += (time.perf_counter() - started) * 1000
+
+    BaseSerializer.data = property(timed_data)
+
+
+def _instrument_cache(cache):
+    """Count hits and misses of a (per-thread) cache instance, once."""
+    if getattr(cache, "_counts_hits", False):
+        return
+    get, get_many = cache.get, cache.get_many
+
+    def counted_get(key, default=None, version=None, **kwargs):
+        value = get(key, _missing, version=version, **kwargs)
+        cost = _current.get()
+        if cost is not None:
+            if value is _missing:
+                cost.cache_misses += 1
+            else:
+                cost.cache_hits += 1
+        return default if value is _missing else value
+
+    def counted_get_many(keys, version=None, **kwargs):
+        keys = list(keys)
+        found = get_many(keys, version=version, **kwargs)
+        cost = _current.get()
+        if cost is not None:
+            cost.cache_hits += len(found)
+            cost.cache_misses += len(keys) - len(found)
+        return found
+
+    cache.get, cache.get_many = counted_get, counted_get_many
+    cache._counts_hits = True
+
+
+def install_hooks():
+    with _install_lock:
+        if not _installed["hooks"]:
+            _install_redis_hook()
+            _install_serializer_hook()
+            _installed["hooks"] = True
+
+
+def _view_name(request):
+    match = getattr(request, "resolver_match", None)
+    return match._func_path if match is not None else "unresolved"
+
+
+class PerformanceMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        install_hooks()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not settings.METRICS["ENABLED"]:
+            return self.get_response(request)
+
+        with self._measure() as measured:
+            response = self.get_response(request)
+        return self._record(request, response, measured)
+
+    async def __acall__(self, request):
+        if not settings.METRICS["ENABLED"]:
+            return await self.get_response(request)
+
+        with self._measure() as measured:
+            response = await self.get_response(request)
+        return self._record(request, response, measured)
+
+    @contextmanager
+    def _measure(self):
+        """Time the block, with a cost breakdown for a sampled share of requests."""
+        sampled = random.random() < settings.METRICS["SAMPLE_RATE"]
+        measured = {"cost": RequestCost() if sampled else None}
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            if sampled:
+                _instrument_cache(caches["default"])
+                token = _current.set(measured["cost"])
+                stack.callback(_current.reset, token)
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(measured["cost"]))
+            yield measured
+        measured["elapsed_ms"] = (time.perf_counter() - started) * 1000
+
+    def _record(self, request, response, measured):
+        options = settings.METRICS
+        cost, elapsed_ms = measured["cost"], measured["elapsed_ms"]
+        view_name = _view_name(request)
+        metrics.record_request(
+            view_name,
+            response.status_code,
+            elapsed_ms,
+            cost.as_dict() if cost is not None else None,
+        )
+        if cost is not None and options["SERVER_TIMING"]:
+            response["Server-Timing"] = cost.server_timing(elapsed_ms)
+        if elapsed_ms >= options["SLOW_REQUEST_MS"]:
+            logger.warning(
+                "Slow request %s %s (%s): %.1fms %s",
+                request.method,
+                request.path,
+                view_name,
+                elapsed_ms,
+                cost.as_dict() if cost is not None else "(not sampled)",
+            )
+        return response
+
+
+def sql_shape(sql):
+    """`sql` with literals, placeholders and IN lists collapsed."""
+    sql = _SPACE_RE.sub(" ", sql).strip()
+    sql = _STRING_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = sql.replace("%s", "?")
+    return _IN_LIST_RE.sub("IN (...)", sql)
+
+
+class QueryShapeCounter:
+    """An `execute_wrapper` counting the queries run per SQL shape."""
+
+    def __init__(self):
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.shapes[sql_shape(sql)] += 1
+        return execute(sql, params, many, context)
+
+    @property
+    def total(self):
+        return sum(self.shapes.values())
+
+    def repeated(self, threshold):
+        """`[(shape, count)]` of the shapes run at least `threshold` times."""
+        return [
+            (shape, count)
+            for shape, count in self.shapes.most_common()
+            if count >= threshold
+        ]
+
+
+@contextmanager
+def count_query_shapes():
+    counter = QueryShapeCounter()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(counter))
+        yield counter
+
+
+class NPlusOneMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with count_query_shapes() as counter:
+            response = self.get_response(request)
+        self._warn(request, counter)
+        return response
+
+    async def __acall__(self, request):
+        with count_query_shapes() as counter:
+            response = await self.get_response(request)
+        self._warn(request, counter)
+        return response
+
+    def _warn(self, request, counter):
+        for shape, count in counter.repeated(settings.METRICS["N_PLUS_ONE_THRESHOLD"]):
+            logger.warning(
+                "Possible N+1 in %s %s (%s): %d queries of shape %s",
+                request.method,
+                request.path,
+                _view_name(request),
+                count,
+                shape,
+            )
@@ -0,0 +1,295 @@
+"""
+Redis-backed rate limiting for write endpoints.
+
+Limits are sliding-window counters: each (route, client) pair keeps one
+counter per fixed window, and a request is admitted while
+
+    previous window count * (unelapsed share of the window) + current count
+
+stays under the route's limit. That smooths the burst a plain fixed window
+allows at its boundary, at the cost of two integers per client. The whole
+check - read both counters, admit or reject, count the request or the
+rejection - is one Lua call, so it is atomic and one round trip.
+
+Routes are configured under the `RATE_LIMIT` setting; entries in `ROUTES`
+override the top-level defaults:
+
+    RATE    "<count>/<period>", period being s, min, hour or day (None: no limit)
+    KEY     "user" (falling back to the IP for anonymous clients) or "ip"
+    METHODS HTTP methods to limit (None: all)
+
+Clients are identified by `REMOTE_ADDR`. Forwarded addresses are only
+believed when the request comes from one of `RATE_LIMIT.TRUSTED_PROXIES`
+(addresses or networks); the client is then the right-most untrusted hop of
+`X-Forwarded-For`, since every hop left of it may have been sent by the
+client itself. With no trusted proxies configured, a deployment behind a
+proxy keys every client by the proxy's address; the first forwarded request
+logs a warning. `turnstile_ip` picks the address passed on to Turnstile and
+never passes a proxy's.
+
+Function views use the `rate_limit(route)` decorator; DRF class-based views
+list `RouteRateThrottle` in `throttle_classes` and name their route in
+`throttle_scope`. Rejections are counted per route in one Redis hash, read
+back with `reject_counts()`. If Redis is unavailable the limiter fails open.
+"""
+
+import functools
+import inspect
+import ipaddress
+import logging
+import time
+from collections import namedtuple
+
+import redis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+from django_redis import get_redis_connection
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+# Top-level RATE_LIMIT settings that are not per-route options.
+GLOBAL_SETTINGS = ("ROUTES", "TRUSTED_PROXIES")
+
+REJECTS_KEY = "ratelimit:rejects"
+KEY_FMT = "ratelimit:{route}:{identity}:{window}"
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+# Misconfigurations already logged by this process.
+_warned = {"forwarding": False}
+
+# KEYS: current window, previous window, rejects hash.
+# ARGV: limit, window length (s), seconds elapsed in the window, route.
+# Returns {admitted (0/1), seconds until a request would be admitted}.
+SLIDING_WINDOW_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local elapsed = tonumber(ARGV[3])
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+if previous * (window - elapsed) / window + current + 1 <= limit then
+    redis.call('INCR', KEYS[1])
+    redis.call('EXPIRE', KEYS[1], window * 2)
+    return {1, 0}
+end
+redis.call('HINCRBY', KEYS[3], ARGV[4], 1)
+local wait = window - elapsed
+if current + 1 > limit and current > 0 then
+    -- Wait for this window to become the previous one and decay enough.
+    wait = window - elapsed + window * (1 - (limit - 1) / current)
+elseif previous > 0 then
+    -- Wait for the previous window's weight to decay enough.
+    wait = (previous * (window - elapsed) / window + current + 1 - limit)
+        * window / previous
+end
+-- A request never counts against more than two windows.
+wait = math.min(math.max(wait, 1), 2 * window)
+return {0, math.ceil(wait)}
+"""
+
+Decision = namedtuple("Decision", ["allowed", "retry_after"])
+ALLOWED = Decision(True, 0)
+
+
+def parse_rate(rate):
+    """`"10/min"` -> `(10, 60)`."""
+    count, period = rate.split("/")
+    return int(count), PERIODS[period.strip()[0]]
+
+
+def route_settings(route):
+    """Limiter settings for `route`: the defaults overlaid with its entry."""
+    limit_settings = settings.RATE_LIMIT
+    overrides = limit_settings.get("ROUTES", {}).get(route, {})
+    return {
+        key: overrides.get(key, value)
+        for key, value in limit_settings.items()
+        if key not in GLOBAL_SETTINGS
+    }
+
+
+def check(route, identity, rate, now=None):
+    """Count one request of `identity` against `route` limited to `rate`."""
+    limit, window = parse_rate(rate)
+    if limit <= 0:
+        # Nothing is ever admitted; no window arithmetic needed.
+        _count_reject(route)
+        return Decision(False, window)
+    now = time.time() if now is None else now
+    index, elapsed = divmod(now, window)
+    keys = [
+        KEY_FMT.format(route=route, identity=identity, window=int(index)),
+        KEY_FMT.format(route=route, identity=identity, window=int(index) - 1),
+        REJECTS_KEY,
+    ]
+    try:
+        script = get_redis_connection("default").register_script(SLIDING_WINDOW_SCRIPT)
+        allowed, retry_after = script(keys=keys, args=[limit, window, elapsed, route])
+    except redis.RedisError:
+        logger.exception(
+            "Rate limiter unavailable, admitting %s on %s", identity, route
+        )
+        return ALLOWED
+    if not allowed:
+        logger.warning("Rate limited %s on %s", identity, route)
+    return Decision(bool(allowed), int(retry_after))
+
+
+def _count_reject(route):
+    try:
+        get_redis_connection("default").hincrby(REJECTS_KEY, route, 1)
+    except redis.RedisError:
+        logger.exception("Rate limiter unavailable, not counting a rejection")
+
+
+def reject_counts():
+    """`{route: rejected requests}` since the counters were last reset."""
+    counts = get_redis_connection("default").hgetall(REJECTS_KEY)
+    return {route.decode(): int(count) for route, count in counts.items()}
+
+
+def _is_trusted(address, proxies):
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in proxy for proxy in proxies)
+
+
+def _trusted_proxies():
+    return [
+        ipaddress.ip_network(proxy, strict=False)
+        for proxy in settings.RATE_LIMIT.get("TRUSTED_PROXIES") or ()
+    ]
+
+
+def _warn_untrusted_forwarding(request, proxies):
+    if proxies or _warned["forwarding"]:
+        return
+    if request.META.get("HTTP_X_FORWARDED_FOR"):
+        _warned["forwarding"] = True
+        logger.warning(
+            "Got X-Forwarded-For from %s but RATE_LIMIT.TRUSTED_PROXIES is "
+            "empty: all clients behind it share one rate limit",
+            request.META.get("REMOTE_ADDR"),
+        )
+
+
+def client_ip(request):
+    """The client's address, taking forwarded hops from trusted proxies only."""
+    remote = request.META.get("REMOTE_ADDR")
+    proxies = _trusted_proxies()
+    if not remote or not _is_trusted(remote, proxies):
+        _warn_untrusted_forwarding(request, proxies)
+        return remote
+    hops = [
+        hop.strip()
+        for hop in request.META.get("HTTP_X_FORWARDED_FOR", "").split(",")
+        if hop.strip()
+    ]
+    for hop in reversed(hops):
+        if not _is_trusted(hop, proxies):
+            return hop
+    # Every hop is a trusted proxy: the left-most one is the origin.
+    return hops[0] if hops else remote
+
+
+def turnstile_ip(request):
+    """
+    The visitor's address for Turnstile's `remoteip`, or None when it can't
+    be told apart from a proxy's (Turnstile then goes by the token alone).
+    """
+    proxies = _trusted_proxies()
+    if _is_trusted(request.META.get("REMOTE_ADDR"), proxies):
+        address = request.META.get("HTTP_CF_CONNECTING_IP") or client_ip(request)
+        return None if _is_trusted(address, proxies) else address
+    if "HTTP_X_FORWARDED_FOR" in request.META:
+        # Probably an untrusted proxy: its address is not the visitor's.
+        return None
+    return request.META.get("REMOTE_ADDR")
+
+
+def _applies(options, request):
+    if not options["ENABLED"] or not options["RATE"]:
+        return False
+    methods = options["METHODS"]
+    return methods is None or request.method in methods
+
+
+def _identity(request, user):
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    return f"ip:{client_ip(request)}"
+
+
+def check_request(route, request):
+    options = route_settings(route)
+    if not _applies(options, request):
+        return ALLOWED
+    user = request.user if options["KEY"] == "user" else None
+    identity = _identity(request, user)
+    return check(route, identity, options["RATE"])
+
+
+async def acheck_request(route, request):
+    options = route_settings(route)
+    if not _applies(options, request):
+        return ALLOWED
+    user = await request.auser() if options["KEY"] == "user" else None
+    identity = _identity(request, user)
+    return await sync_to_async(check)(route, identity, options["RATE"])
+
+
+def throttled_response(decision):
+    response = JsonResponse(
+        {
+            "detail": "Request was throttled. Expected available in "
+            f"{decision.retry_after} seconds."
+        },
+        status=429,
+    )
+    response["Retry-After"] = str(decision.retry_after)
+    return response
+
+
+def rate_limit(route):
+    """Limit a (sync or async) function view with the settings of `route`."""
+
+    def decorator(view):
+        if inspect.iscoroutinefunction(view):
+
+            @functools.wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                decision = await acheck_request(route, request)
+                if not decision.allowed:
+                    return throttled_response(decision)
+                return await view(request, *args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            decision = check_request(route, request)
+            if not decision.allowed:
+                return throttled_response(decision)
+            return view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class RouteRateThrottle(BaseThrottle):
+    """DRF throttle limiting a view with the settings of its `throttle_scope`."""
+
+    def allow_request(self, request, view):
+        route = getattr(view, "throttle_scope", None)
+        if route is None:
+            return True
+        self.decision = check_request(route, request)
+        return self.decision.allowed
+
+    def wait(self):
+        return self.decision.retry_after
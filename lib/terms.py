@@ -1,5 +1,7 @@
 import re
 
+from django.db import models
+
 from lib import constants
 
 term_regex = re.compile(r"^(?P<year>[0-9]{2})(?P<term>[WSXFwsxf])$")
@@ -10,10 +12,36 @@ def numeric_value_of_term(term):
     if term_data and term_data.group("year") and term_data.group("term"):
         year = int(term_data.group("year"))
         term = term_data.group("term")
-        return year * 10 + {"s": 2, "x": 3, "f": 4}[term.lower()]
+        return year * 10 + {"w": 1, "s": 2, "x": 3, "f": 4}[term.lower()]
     return 0
 
 
+class TermOrdinalField(models.PositiveIntegerField):
+    """
+    `numeric_value_of_term` of the model's `term_field`, so terms can be
+    ordered and compared in the database. Set whenever the row is saved,
+    including by `bulk_create` and `update_or_create`; `QuerySet.update()`
+    of the term has to set it too.
+    """
+
+    def __init__(self, *args, term_field="term", **kwargs):
+        self.term_field = term_field
+        kwargs.setdefault("default", 0)
+        kwargs.setdefault("editable", False)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.term_field != "term":
+            kwargs["term_field"] = self.term_field
+        return name, path, args, kwargs
+
+    def pre_save(self, model_instance, add):
+        value = numeric_value_of_term(getattr(model_instance, self.term_field) or "")
+        setattr(model_instance, self.attname, value)
+        return value
+
+
 def is_valid_term(term):
     if not isinstance(term, str) or len(term) != 3:
         return False
@@ -17,6 +17,18 @@ app.conf.beat_schedule = {
         "task": "apps.analytics.tasks.send_analytics_email_update",
         "schedule": crontab(minute=0, hour=0, day_of_week=1),  # Mon, 12AM
     },
+    "rollup_daily_activity": {
+        "task": "apps.analytics.tasks.rollup_daily_activity",
+        "schedule": crontab(minute=10, hour=0),  # 12:10AM
+    },
+    "train_sentiment_classifier": {
+        "task": "apps.analytics.tasks.train_sentiment_classifier",
+        "schedule": crontab(minute=30, hour=1, day_of_week=0),  # Sun, 1:30AM
+    },
+    "score_review_sentiments": {
+        "task": "apps.analytics.tasks.score_review_sentiments",
+        "schedule": crontab(minute=20),  # hourly
+    },
     "course_description_similarity": {
         "task": (
             "apps.recommendations.tasks."
@@ -36,6 +48,26 @@ app.conf.beat_schedule = {
         "task": "apps.spider.tasks.crawl_medians",
         "schedule": crontab(minute=0, hour=2),  # 2AM
     },
+    "reconcile_statistics": {
+        "task": "apps.web.tasks.reconcile_statistics",
+        "schedule": crontab(minute="*/15"),  # every 15 minutes
+    },
+    "rebuild_facets": {
+        "task": "apps.web.tasks.rebuild_facets",
+        "schedule": crontab(minute=45),  # hourly
+    },
+    "roll_over_current_term": {
+        "task": "apps.web.tasks.roll_over_current_term",
+        "schedule": crontab(minute=5, hour=0),  # 12:05AM
+    },
+    "process_course_changes": {
+        "task": "apps.web.tasks.process_course_changes",
+        "schedule": crontab(),  # every minute
+    },
+    "check_course_documents": {
+        "task": "apps.web.tasks.check_course_documents",
+        "schedule": crontab(minute=30, hour=3),  # 3:30AM
+    },
     "request_term_change": {
         "task": "apps.analytics.tasks.possibly_request_term_update",
         "schedule": crontab(minute=0, hour=3),  # 3AM
@@ -16,10 +16,22 @@ DEFAULTS = {
     "CORS_ALLOWED_ORIGINS": ["http://localhost:5173", "http://127.0.0.1:5173"],
     "SESSION": {
         "COOKIE_AGE": 2592000,  # 30 days
-        "SAVE_EVERY_REQUEST": True,
+        "SAVE_EVERY_REQUEST": False,
+        # "cache" (Redis only) or "cached_db" (Redis backed by the database).
+        "ENGINE": "cache",
+        # Unmodified sessions get their expiry refreshed at most this often.
+        "TOUCH_INTERVAL": 86400,
     },
     "WEB": {
-        "COURSE": {"PAGE_SIZE": 10},
+        # BATCH_SIZE: most courses one /api/courses/batch/ request may fetch.
+        # DOCUMENT_CHUNK_SIZE / DOCUMENT_WORKERS: courses rendered at a time,
+        # and threads used, when rebuilding and checking course documents.
+        "COURSE": {
+            "PAGE_SIZE": 10,
+            "BATCH_SIZE": 20,
+            "DOCUMENT_CHUNK_SIZE": 200,
+            "DOCUMENT_WORKERS": 4,
+        },
         "REVIEW": {"PAGE_SIZE": 10, "COMMENT_MIN_LENGTH": 30},
     },
     "AUTH": {
@@ -31,10 +43,61 @@ DEFAULTS = {
         "PASSWORD_LENGTH_MAX": 32,
         "EMAIL_DOMAIN_NAME": "sjtu.edu.cn",
         "ACTION_LIST": ["signup", "login", "reset_password"],
+        # Serve init/verify/login with native async views (ASGI deployments).
+        "ASYNC_VIEWS": False,
+    },
+    # REPLICA_URLS: read replicas (lib.db_router); a client that wrote reads
+    # from the primary for STICKY_SECONDS afterwards.
+    "DATABASE": {
+        "URL": "sqlite:///db.sqlite3",
+        "REPLICA_URLS": [],
+        "STICKY_SECONDS": 10,
     },
-    "DATABASE": {"URL": "sqlite:///db.sqlite3"},
     "REDIS": {"URL": "redis://localhost:6379/0", "MAX_CONNECTIONS": 100},
     "TURNSTILE_SECRET_KEY": None,
+    # Outbound HTTP (lib.http_client); HOSTS entries override per host.
+    "HTTP_CLIENT": {
+        "HTTP2": False,
+        "TIMEOUT": 30,
+        "CONNECT_TIMEOUT": 5,
+        "MAX_CONNECTIONS": 50,
+        "MAX_KEEPALIVE_CONNECTIONS": 10,
+        "KEEPALIVE_EXPIRY": 60,
+        "HOSTS": {
+            "challenges.cloudflare.com": {"TIMEOUT": 10},
+            "wj.sjtu.edu.cn": {"TIMEOUT": 20},
+        },
+    },
+    # Write-path rate limits (lib.rate_limit); ROUTES entries override defaults.
+    "RATE_LIMIT": {
+        "ENABLED": True,
+        "RATE": None,
+        "KEY": "user",
+        "METHODS": None,
+        # Proxies (addresses or networks) whose X-Forwarded-For is believed.
+        "TRUSTED_PROXIES": [],
+        "ROUTES": {
+            "auth_login": {"RATE": "10/min", "KEY": "ip"},
+            "course_vote": {"RATE": "30/min"},
+            "review_vote": {"RATE": "60/min"},
+            "review_create": {"RATE": "10/hour", "METHODS": ["POST"]},
+        },
+    },
+    # Request instrumentation (lib.middleware) and the /metrics endpoint.
+    "METRICS": {
+        "ENABLED": True,
+        # Share of requests that get the DB/Redis/cache/serializer breakdown.
+        "SAMPLE_RATE": 0.1,
+        "SLOW_REQUEST_MS": 1000,
+        # Send the breakdown of sampled requests in a Server-Timing header.
+        "SERVER_TIMING": False,
+        # /metrics: with TOKEN set, scrapers send "Authorization: Bearer <TOKEN>";
+        # without it, only unproxied requests from ALLOWED_IPS are served.
+        "TOKEN": None,
+        "ALLOWED_IPS": ["127.0.0.1", "::1"],
+        # DEBUG only: warn when one query shape runs this often in a request.
+        "N_PLUS_ONE_THRESHOLD": 10,
+    },
     "QUEST": {
         "BASE_URL": "https://wj.sjtu.edu.cn/api/v1/public/export",
         "SIGNUP": {
@@ -71,6 +134,16 @@ CORS_ALLOWED_ORIGINS = config.get("CORS_ALLOWED_ORIGINS", cast=list)
 
 # --- Infrastructure ---
 DATABASES = {"default": dj_database_url.parse(config.get("DATABASE.URL"))}
+for index, url in enumerate(
+    url for url in config.get("DATABASE.REPLICA_URLS", cast=list) if url
+):
+    DATABASES[f"replica_{index}"] = {
+        **dj_database_url.parse(url),
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_STICKY_SECONDS = config.get("DATABASE.STICKY_SECONDS", cast=int)
+DATABASE_ROUTERS = ["lib.db_router.ReplicaRouter"]
 CACHES = {
     "default": {
         "BACKEND": "django_redis.cache.RedisCache",
@@ -88,12 +161,26 @@ CACHES = {
 # --- Session Management ---
 SESSION_COOKIE_AGE = config.get("SESSION.COOKIE_AGE", cast=int)
 SESSION_SAVE_EVERY_REQUEST = config.get("SESSION.SAVE_EVERY_REQUEST", cast=bool)
+SESSION_ENGINE = f"apps.auth.sessions.{config.get('SESSION.ENGINE')}"
+SESSION_TOUCH_INTERVAL = config.get("SESSION.TOUCH_INTERVAL", cast=int)
 SESSION_COOKIE_SECURE = not DEBUG
 
 # --- Application-Specific Settings ---
 AUTH = config.get("AUTH")
+AUTH["ASYNC_VIEWS"] = config.get("AUTH.ASYNC_VIEWS", cast=bool)
 WEB = config.get("WEB")
 TURNSTILE_SECRET_KEY = config.get("TURNSTILE_SECRET_KEY")
+HTTP_CLIENT = config.get("HTTP_CLIENT")
+RATE_LIMIT = config.get("RATE_LIMIT")
+RATE_LIMIT["ENABLED"] = config.get("RATE_LIMIT.ENABLED", cast=bool)
+RATE_LIMIT["TRUSTED_PROXIES"] = config.get("RATE_LIMIT.TRUSTED_PROXIES", cast=list)
+METRICS = config.get("METRICS")
+METRICS["ENABLED"] = config.get("METRICS.ENABLED", cast=bool)
+METRICS["SAMPLE_RATE"] = config.get("METRICS.SAMPLE_RATE", cast=float)
+METRICS["SLOW_REQUEST_MS"] = config.get("METRICS.SLOW_REQUEST_MS", cast=float)
+METRICS["SERVER_TIMING"] = config.get("METRICS.SERVER_TIMING", cast=bool)
+METRICS["ALLOWED_IPS"] = config.get("METRICS.ALLOWED_IPS", cast=list)
+METRICS["N_PLUS_ONE_THRESHOLD"] = config.get("METRICS.N_PLUS_ONE_THRESHOLD", cast=int)
 AUTO_IMPORT_CRAWLED_DATA = config.get("AUTO_IMPORT_CRAWLED_DATA", cast=bool)
 
 QUEST = config.get("QUEST")
@@ -114,15 +201,17 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.humanize",
-    "debug_toolbar",
     "rest_framework",
     "corsheaders",
     "apps.spider",
     "apps.web",
     "apps.auth",
+    "apps.analytics",
 ]
 
 MIDDLEWARE = [
+    "lib.middleware.PerformanceMiddleware",
+    "lib.db_router.ReplicaRoutingMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -131,9 +220,13 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
-    "debug_toolbar.middleware.DebugToolbarMiddleware",
 ]
 
+if DEBUG:
+    INSTALLED_APPS.append("debug_toolbar")
+    MIDDLEWARE.append("debug_toolbar.middleware.DebugToolbarMiddleware")
+    MIDDLEWARE.append("lib.middleware.NPlusOneMiddleware")
+
 ROOT_URLCONF = "website.urls"
 WSGI_APPLICATION = "website.wsgi.application"
 TEMPLATES = [
@@ -160,7 +253,6 @@ TIME_ZONE = "Asia/Shanghai"
 USE_I18N = True
 USE_TZ = True
 
-SESSION_ENGINE = "django.contrib.sessions.backends.cache"
 SESSION_CACHE_ALIAS = "default"
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -1,12 +1,17 @@
 from django.contrib import admin
 from django.urls import include, re_path
 
+from apps.web.views import metrics_view
+
 urlpatterns = [
     # administrative
     re_path(r"^admin/", admin.site.urls),
     # API routes
     re_path(r"^api/auth/", include("apps.auth.urls")),
+    re_path(r"^api/analytics/", include("apps.analytics.urls")),
     re_path(r"^api/", include("apps.web.urls")),
     # Spider routes
     re_path(r"^spider/", include("apps.spider.urls")),
+    # Prometheus scrape target
+    re_path(r"^metrics$", metrics_view, name="metrics"),
 ]